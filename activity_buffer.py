@@ -0,0 +1,186 @@
+"""
+Recent activity buffer
+A fixed-capacity ring of the most recent activities for the real-time
+views, with per-session and per-file indexes so "last N for X" lookups
+never scan the whole buffer. Slots are addressed by sequence number, so
+"everything after N" is a slice rather than a search.
+"""
+
+import sys
+import threading
+from collections import deque
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
+
+ACTIVITY_FIELDS = ('timestamp', 'session_id', 'activity', 'file_name', 'ip_address',
+                   'user_agent', 'additional_info')
+
+
+class RecentActivity:
+    """One buffered activity; __slots__ keeps it to a fixed handful of pointers"""
+    __slots__ = ('seq', 'size') + ACTIVITY_FIELDS
+
+    def __init__(self, seq: int, activity: Dict):
+        self.seq = seq
+        for field in ACTIVITY_FIELDS:
+            setattr(self, field, activity.get(field))
+        self.size = _estimate_size(self)
+
+    def to_dict(self) -> Dict:
+        activity = {field: getattr(self, field) for field in ACTIVITY_FIELDS}
+        activity['seq'] = self.seq
+        return activity
+
+
+def _estimate_size(record: RecentActivity) -> int:
+    """Approximate bytes held by a record, its strings and its additional_info"""
+    size = sys.getsizeof(record)
+    for field in ACTIVITY_FIELDS:
+        value = getattr(record, field)
+        size += sys.getsizeof(value)
+        if isinstance(value, dict):
+            size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    return size
+
+
+class RecentActivityBuffer:
+    """Ring buffer of the last ``capacity`` activities.
+
+    The oldest entries are also evicted while the estimated size is above
+    ``max_bytes`` (if set). Reads return plain dicts, oldest first.
+    Activities carrying a 'seq' keep it (numbers must increase); others
+    are numbered by the buffer.
+    """
+
+    def __init__(self, capacity: int = 10000, max_bytes: Optional[int] = None):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self._slots = [None] * capacity
+        self._first = 0  # sequence number of the oldest buffered record
+        self._next = 0   # sequence number the next record gets
+        self._bytes = 0
+        self._by_session = {}
+        self._by_file = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._next - self._first
+
+    @property
+    def high_water(self) -> int:
+        """Sequence number of the newest buffered activity (-1 before the first)"""
+        return self._next - 1
+
+    def append(self, activity: Dict) -> int:
+        """Buffer an activity, evicting the oldest as needed; returns its sequence number"""
+        with self._lock:
+            seq = activity.get('seq')
+            if seq is None:
+                seq = self._next
+            elif seq < self._next:
+                raise ValueError(f"sequence number {seq} is not after {self._next - 1}")
+            elif seq - self._next >= self.capacity or self._first == self._next:
+                # Nothing buffered would survive the gap: start over at seq
+                while len(self):
+                    self._evict_oldest()
+                self._first = self._next = seq
+            else:
+                # Numbers skipped by the producer become empty slots
+                while self._next < seq:
+                    if self._next - self._first == self.capacity:
+                        self._evict_oldest()
+                    self._slots[self._next % self.capacity] = None
+                    self._next += 1
+            record = RecentActivity(seq, activity)
+            if self._next - self._first == self.capacity:
+                self._evict_oldest()
+            self._slots[seq % self.capacity] = record
+            self._next += 1
+            self._bytes += record.size
+            self._by_session.setdefault(record.session_id, deque()).append(seq)
+            self._by_file.setdefault(record.file_name, deque()).append(seq)
+            while self.max_bytes is not None and self._bytes > self.max_bytes and len(self) > 1:
+                self._evict_oldest()
+            return seq
+
+    def _evict_oldest(self):
+        record = self._slots[self._first % self.capacity]
+        self._slots[self._first % self.capacity] = None
+        self._first += 1
+        if record is None:
+            return
+        self._bytes -= record.size
+        # The evicted record is the oldest, so it is at the left of its index deques
+        for index, key in ((self._by_session, record.session_id), (self._by_file, record.file_name)):
+            seqs = index[key]
+            seqs.popleft()
+            if not seqs:
+                del index[key]
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict]:
+        """The newest ``limit`` activities (all if None), oldest first"""
+        with self._lock:
+            start = self._first if limit is None else max(self._first, self._next - limit)
+            return self._records(range(start, self._next))
+
+    def since(self, seq: int, limit: Optional[int] = None, session_id: str = None,
+              file_name: str = None) -> Dict:
+        """Activities numbered above ``seq``, oldest first, and the new high-water mark.
+
+        ``truncated`` means some newer activities were already evicted;
+        ``reset`` means ``seq`` is ahead of the buffer (e.g. it came from
+        before a restart). Either way the caller should reload in full.
+        """
+        with self._lock:
+            high_water = self._next - 1
+            truncated = seq < self._first - 1
+            start = max(seq + 1, self._first)
+            if session_id or file_name:
+                index, key = (self._by_session, session_id) if session_id else (self._by_file, file_name)
+                seqs = [s for s in index.get(key, ()) if s >= start]
+                if file_name and session_id:
+                    seqs = [s for s in seqs if self._slots[s % self.capacity].file_name == file_name]
+            else:
+                seqs = range(start, self._next)
+            if limit is not None and len(seqs) > limit:
+                seqs = seqs[:limit]
+                high_water = seqs[-1]
+            return {
+                'activities': self._records(seqs),
+                'high_water': high_water,
+                'truncated': truncated,
+                'reset': seq > self._next - 1
+            }
+
+    def _records(self, seqs: Iterable[int]) -> List[Dict]:
+        records = (self._slots[seq % self.capacity] for seq in seqs)
+        return [record.to_dict() for record in records if record is not None]
+
+    def for_session(self, session_id: str, limit: int = 100) -> List[Dict]:
+        """The newest ``limit`` activities of one session, oldest first"""
+        return self._lookup(self._by_session, session_id, limit)
+
+    def for_file(self, file_name: str, limit: int = 100) -> List[Dict]:
+        """The newest ``limit`` activities on one file, oldest first"""
+        return self._lookup(self._by_file, file_name, limit)
+
+    def _lookup(self, index: Dict, key: str, limit: int) -> List[Dict]:
+        with self._lock:
+            newest = list(islice(reversed(index.get(key, ())), limit))
+            return self._records(reversed(newest))
+
+    def stats(self) -> Dict:
+        """Capacity, fill level and estimated memory use"""
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'size': self._next - self._first,
+                'appended': self._next,
+                'evicted': self._first,
+                'max_bytes': self.max_bytes,
+                'estimated_bytes': self._bytes + sys.getsizeof(self._slots),
+                'indexed_sessions': len(self._by_session),
+                'indexed_files': len(self._by_file),
+            }
@@ -0,0 +1,153 @@
+"""
+Coalescing of repetitive activity events
+Periodic client-monitor events (heartbeats, security checks, focus and
+visibility changes) arrive every few seconds per open viewer and say the
+same thing each time. Events of a configured type are grouped per session,
+address, file, type and threat level - plus any fields the rule names as
+distinguishing. The first event of a group is written at once and opens a
+window; repeats inside the window are only counted, and when it closes
+one summary event says how many there were and when the last was seen.
+
+HIGH threats are never held. Only repeats are held, and only in memory
+until their window closes, so a crash loses at most one window's count of
+them; configure only types whose repeats carry no signal beyond it.
+"""
+
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+# Activity type -> (window in seconds, additional_info fields that keep events apart),
+# fields as dotted paths, e.g. 'event_data.hidden'
+Rules = Dict[str, Tuple[float, Tuple[str, ...]]]
+
+
+def _field(info: Dict, path: str):
+    value = info
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+class ActivityCoalescer:
+    """Folds repeats of configured activity types into one summary per window.
+
+    The first matching event is passed through and opens a window of its
+    type's length; repeats inside it only bump the count. When the window
+    closes, the last repeat is emitted with ``coalesced_count`` (the
+    repeats it stands for), ``first_seen`` (the event that opened the
+    window) and ``last_seen`` added to its additional_info. A window
+    without repeats emits nothing. At most ``max_groups`` windows are open
+    at once; beyond that the oldest is closed early.
+    """
+
+    def __init__(self, rules: Rules, max_groups: int = 10000, tick_interval: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rules = {activity: (float(window), tuple(fields)) for activity, (window, fields) in rules.items()}
+        self.max_groups = max_groups
+        self.tick_interval = tick_interval
+        self._clock = clock
+        self._groups = {}  # key -> [opened at, first timestamp, repeats, last repeat]
+        self._lock = threading.Lock()
+        self._emit = None
+        self.coalesced = 0
+        self.emitted = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _key(self, event: Dict):
+        rule = self.rules.get(event.get('activity'))
+        if rule is None:
+            return None
+        info = event.get('additional_info')
+        info = info if isinstance(info, dict) else {}
+        threat_level = str(info.get('threat_level') or info.get('severity') or '').upper()
+        if threat_level == 'HIGH':
+            return None
+        distinct = tuple(json.dumps(_field(info, path), sort_keys=True, default=str) for path in rule[1])
+        return (event.get('session_id'), event.get('ip_address'), event.get('file_name'),
+                event.get('activity'), threat_level, distinct)
+
+    def offer(self, event: Dict) -> bool:
+        """Hold ``event`` if it repeats one in an open window; False means the caller writes it as usual"""
+        key = self._key(event)
+        if key is None:
+            return False
+        overflow = []
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None:
+                if len(self._groups) >= self.max_groups:
+                    oldest = next(iter(self._groups))
+                    overflow.append(self._groups.pop(oldest))
+                self._groups[key] = [self._clock(), event.get('timestamp'), 0, None]
+            else:
+                group[2] += 1
+                group[3] = event
+                self.coalesced += 1
+        self._write(overflow)
+        return group is not None
+
+    def flush_due(self) -> int:
+        """Close every window whose time is up; returns how many summaries were emitted"""
+        now = self._clock()
+        with self._lock:
+            due = [key for key, group in self._groups.items()
+                   if now - group[0] >= self.rules[key[3]][0]]
+            groups = [self._groups.pop(key) for key in due]
+        return self._write(groups)
+
+    def flush_all(self) -> int:
+        """Close every open window now"""
+        with self._lock:
+            groups = list(self._groups.values())
+            self._groups = {}
+        return self._write(groups)
+
+    def _write(self, groups: List[list]) -> int:
+        summaries = [group for group in groups if group[2]]
+        for _, first_seen, count, last in summaries:
+            event = dict(last)
+            event['additional_info'] = dict(last.get('additional_info') or {},
+                                            coalesced_count=count,
+                                            first_seen=first_seen,
+                                            last_seen=last.get('timestamp'))
+            try:
+                self._emit(event)
+            except Exception as e:
+                print(f"Error writing coalesced {event.get('activity')}: {e}")
+        with self._lock:
+            self.emitted += len(summaries)
+        return len(summaries)
+
+    def start(self, emit: Callable[[Dict], object]):
+        """Pass each window's summary to ``emit`` as the window closes"""
+        self._emit = emit
+
+        def run():
+            while not self._stop.wait(self.tick_interval):
+                self.flush_due()
+
+        self._thread = threading.Thread(target=run, name="activity-coalescer", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the timer and emit the summaries of the windows still open"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+        if self._emit is not None:
+            self.flush_all()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'coalesced': self.coalesced,
+                'emitted': self.emitted,
+                'open_windows': len(self._groups),
+                'rules': {activity: {'window_seconds': window, 'distinct_on': list(fields)}
+                          for activity, (window, fields) in self.rules.items()},
+            }
@@ -1,220 +1,1481 @@
 import sqlite3
+import base64
+import hashlib
+import html
 import json
 import os
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+import queue
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 import uuid
+
+from urllib.request import pathname2url
+
+from activity_journal import JournalReader
+from activity_partitions import (ARCHIVED, LIVE, PartitionCatalog, RetentionPolicy, month_id_base,
+                                 month_key)
+from activity_rollups import ActivityRollups, register_sketch_functions
 
-class ActivityDatabase:
-    def __init__(self, db_path: str = "activity_audit.db"):
-        self.db_path = db_path
+# SQLite tuning applied to every pooled connection
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',        # readers no longer block the writer
+    'synchronous': 'NORMAL',      # safe with WAL, avoids an fsync per commit
+    'cache_size': -20000,         # ~20 MB page cache per connection
+    'mmap_size': 268435456,       # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+}
+
+# With a shared sequence, a reservation this old is taken to belong to a
+# process that died before writing it, and no longer holds readers back
+SEQ_RESERVATION_TIMEOUT = 60
+
+# Columns of the activities view, i.e. the keys of every activity dict
+ACTIVITY_COLUMNS = ('id', 'timestamp', 'session_id', 'activity', 'file_name', 'ip_address',
+                    'user_agent', 'additional_info', 'created_date', 'created_time',
+                    'category', 'ts_us', 'seq')
+
+# Columns written to the activity_log fact table, in insert order
+ACTIVITY_LOG_COLUMNS = ('timestamp', 'ts_us', 'created_date', 'created_time', 'session_ref',
+                        'activity_ref', 'file_ref', 'ip_address', 'user_agent_ref',
+                        'additional_info', 'seq')
+
+_INSERT_ACTIVITY_LOG = (
+    f"INSERT INTO activity_log ({', '.join(ACTIVITY_LOG_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in ACTIVITY_LOG_COLUMNS)})"
+)
+
+# Repeated strings are stored once in a dimension table and referenced by id:
+# activity field -> (dimension table, activity_log column)
+DIMENSIONS = {
+    'session_id': ('dim_sessions', 'session_ref'),
+    'activity': ('dim_activity_types', 'activity_ref'),
+    'file_name': ('dim_files', 'file_ref'),
+    'user_agent': ('dim_user_agents', 'user_agent_ref'),
+}
+
+# Decodes activity_log back into the original flat row shape
+_ACTIVITIES_SELECT = '''
+    SELECT a.id, a.timestamp, s.value AS session_id, t.value AS activity,
+           f.value AS file_name, a.ip_address, u.value AS user_agent,
+           a.additional_info, a.created_date, a.created_time, t.category, a.ts_us, a.seq
+    FROM activity_log a
+    JOIN dim_sessions s ON s.id = a.session_ref
+    JOIN dim_activity_types t ON t.id = a.activity_ref
+    JOIN dim_files f ON f.id = a.file_ref
+    LEFT JOIN dim_user_agents u ON u.id = a.user_agent_ref
+'''
+
+# Activity categories, checked in order; the first matching keyword wins.
+# open/download/print keep the substring semantics the statistics always used.
+ACTIVITY_CATEGORY_RULES = (
+    ('open', ('OPENED',)),
+    ('download', ('DOWNLOAD',)),
+    ('print', ('PRINT',)),
+    ('error', ('_ERROR', 'NOT_FOUND')),
+    ('security', ('SECURITY', 'THREAT', 'UNAUTHORIZED', 'SUSPICIOUS', 'TAMPERING', 'INCIDENT')),
+    ('monitor', ('CLIENT_MONITOR_', 'MONITORING_')),
+    ('system', ('SYSTEM',)),
+)
+ACTIVITY_CATEGORIES = tuple(name for name, _ in ACTIVITY_CATEGORY_RULES) + ('other',)
+
+
+def classify_activity(activity: str) -> str:
+    """Map an activity name to its category"""
+    name = (activity or '').upper()
+    for category, keywords in ACTIVITY_CATEGORY_RULES:
+        if any(keyword in name for keyword in keywords):
+            return category
+    return 'other'
+
+# ISO-8601 timestamps as produced by datetime.isoformat() and JavaScript toISOString()
+_ISO_TIMESTAMP_RE = re.compile(
+    r'(\d{4})-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])[T ]'
+    r'([01]\d|2[0-3]):([0-5]\d):([0-5]\d)(?:\.(\d{1,6}))?'
+    r'(Z|[+-]\d{2}:\d{2})?'
+)
+
+_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Widest UTC offsets in use, for turning a local calendar date into an epoch range
+_MAX_UTC_OFFSET_US = 14 * 3600 * 1000000
+
+
+@lru_cache(maxsize=4096)
+def _local_utc_offset(year: int, month: int, day: int, hour: int) -> int:
+    """Server-local UTC offset in seconds for a naive wall-clock hour"""
+    return int(datetime(year, month, day, hour).astimezone().utcoffset().total_seconds())
+
+
+def parse_timestamps(timestamps: List[str]) -> List[Tuple[str, str, int]]:
+    """Parse a batch of ISO timestamps into (created_date, created_time, ts_us).
+
+    ``ts_us`` is microseconds since the Unix epoch. Naive timestamps are taken
+    as server-local time, which is what datetime.now().isoformat() produces.
+    Well-formed timestamps go through one compiled regex and integer
+    arithmetic; anything else falls back to datetime.fromisoformat and raises
+    ValueError if invalid.
+    """
+    match = _ISO_TIMESTAMP_RE.fullmatch
+    results = []
+    for timestamp in timestamps:
+        m = match(timestamp) if isinstance(timestamp, str) else None
+        if m:
+            year, month, day, hh, mm, ss, fraction, tz = m.groups()
+            year, month, day = int(year), int(month), int(day)
+            hours, minutes, seconds = int(hh), int(mm), int(ss)
+            micros = int(fraction.ljust(6, '0')) if fraction else 0
+            time_part = f"{hh}:{mm}:{ss}"
+            if micros:
+                time_part += f".{micros:06d}"
+
+            if tz is None:
+                offset = _local_utc_offset(year, month, day, hours)
+            elif tz == 'Z':
+                offset = 0
+            else:
+                sign = -1 if tz[0] == '-' else 1
+                offset = sign * (int(tz[1:3]) * 3600 + int(tz[4:6]) * 60)
+
+            days = date(year, month, day).toordinal() - _EPOCH_ORDINAL
+            seconds_since_epoch = days * 86400 + hours * 3600 + minutes * 60 + seconds - offset
+            results.append((f"{year:04d}-{month:02d}-{day:02d}", time_part,
+                            seconds_since_epoch * 1000000 + micros))
+            continue
+        if not isinstance(timestamp, str):
+            raise ValueError(f"Invalid activity timestamp: {timestamp!r}")
+        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        aware = dt if dt.tzinfo else dt.astimezone()
+        results.append((dt.date().isoformat(), dt.time().isoformat(),
+                        (aware - _EPOCH) // timedelta(microseconds=1)))
+    return results
+
+
+def date_to_ts_us_range(start_date: str = None, end_date: str = None) -> Tuple[Optional[int], Optional[int]]:
+    """Epoch-microsecond bounds that contain every timestamp whose own
+    calendar date falls in [start_date, end_date], whatever its UTC offset"""
+    low = high = None
+    if start_date:
+        start = datetime.fromisoformat(start_date[:10]).replace(tzinfo=timezone.utc)
+        low = (start - _EPOCH) // timedelta(microseconds=1) - _MAX_UTC_OFFSET_US
+    if end_date:
+        end = datetime.fromisoformat(end_date[:10]).replace(tzinfo=timezone.utc) + timedelta(days=1)
+        high = (end - _EPOCH) // timedelta(microseconds=1) + _MAX_UTC_OFFSET_US
+    return low, high
+
+
+def iter_json_array(path: str, start_offset: int = 0,
+                    chunk_size: int = 65536) -> Iterator[Tuple[Dict, int]]:
+    """Stream the elements of a top-level JSON array without loading the file.
+
+    Yields ``(element, end_offset)`` where ``end_offset`` is the byte offset
+    just past the element, so a reader can later resume from that point.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'rb') as f:
+        f.seek(start_offset)
+        offset = start_offset
+        buffer = ''
+        raw = b''
+        started = start_offset > 0
+
+        while True:
+            # Skip whitespace, the opening bracket and separators
+            stripped = buffer.lstrip(' \t\r\n,' if started else ' \t\r\n')
+            offset += len(buffer[:len(buffer) - len(stripped)].encode('utf-8'))
+            buffer = stripped
+            if not started and buffer:
+                if buffer[0] != '[':
+                    raise ValueError(f"{path} does not contain a JSON array")
+                buffer = buffer[1:]
+                offset += 1
+                started = True
+                continue
+            if buffer.startswith(']'):
+                return
+
+            if buffer:
+                try:
+                    element, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    end = None
+                if end is not None:
+                    offset += len(buffer[:end].encode('utf-8'))
+                    buffer = buffer[end:]
+                    yield element, offset
+                    continue
+
+            chunk = f.read(chunk_size)
+            if not chunk:
+                if buffer.strip():
+                    raise ValueError(f"{path} ends with an incomplete JSON element")
+                return
+            raw += chunk
+            try:
+                buffer += raw.decode('utf-8')
+                raw = b''
+            except UnicodeDecodeError:
+                # Chunk boundary split a multi-byte character; wait for more bytes
+                continue
+
+
+# Flattened scalar values of an additional_info JSON blob, for full-text search
+_FLATTEN_INFO_SQL = (
+    "CASE WHEN json_valid({col}) THEN "
+    "(SELECT group_concat(value, ' ') FROM json_tree({col}) WHERE atom IS NOT NULL) END"
+)
+SEARCH_COLUMNS = ('file_name', 'activity', 'session_id', 'ip_address', 'user_agent', 'details')
+
+# Snippet markers that cannot occur in logged text; swapped for <mark> after escaping
+_MARK_OPEN, _MARK_CLOSE = '\ue000', '\ue001'
+
+_SEARCH_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def build_search_query(text: str) -> str:
+    """Turn user search text into a safe FTS5 query.
+
+    Quoted text is a phrase, a trailing * is a prefix match, and every other
+    word must appear. FTS5 operators in the input are treated as plain text.
+    """
+    terms = []
+    for phrase, word in _SEARCH_TERM_RE.findall(text or ''):
+        if phrase.strip():
+            terms.append('"' + phrase.replace('"', '""') + '"')
+        elif word:
+            prefix = word.endswith('*')
+            word = word.rstrip('*').replace('"', '')
+            if word:
+                terms.append('"' + word + '"' + ('*' if prefix else ''))
+    if not terms:
+        raise ValueError("Search query is empty")
+    return ' '.join(terms)
+
+
+def encode_cursor(ts_us: int, row_id: int, direction: str) -> str:
+    """Opaque keyset cursor for a position in the (ts_us, id) ordering"""
+    payload = json.dumps([direction, ts_us, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int, int]:
+    """Return (direction, ts_us, id) from a cursor, or raise ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, ts_us, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+    if direction not in ('next', 'prev') or not isinstance(ts_us, int) or not isinstance(row_id, int):
+        raise ValueError("Invalid pagination cursor")
+    return direction, ts_us, row_id
+
+
+def _is_valid_log(log) -> bool:
+    """True if a logged activity can be imported"""
+    if not isinstance(log, dict) or not all(
+            log.get(field) for field in ('timestamp', 'session_id', 'activity', 'file_name')):
+        return False
+    try:
+        parse_timestamps([log['timestamp']])
+    except ValueError:
+        return False
+    return True
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def register_activity_functions(conn):
+    """SQL functions the activity schema relies on (triggers and rollups)"""
+    register_sketch_functions(conn)
+    conn.create_function('activity_category', 1, classify_activity, deterministic=True)
+
+
+class ConnectionPool:
+    """Thread-safe pool of reusable SQLite connections.
+
+    A thread keeps the same connection for as long as it holds it, so nested
+    calls on one thread share a connection instead of exhausting the pool.
+    """
+
+    def __init__(self, db_path: str, max_connections: int = 8,
+                 busy_timeout_ms: int = 5000, pragmas: Dict = None, on_connect=None,
+                 read_only: bool = False):
+        self.db_path = db_path
+        self.on_connect = on_connect
+        self.read_only = read_only
+        self.max_connections = max_connections
+        self.busy_timeout_ms = busy_timeout_ms
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def after_commit(self, callback):
+        """Run ``callback`` once this thread's open transaction commits.
+
+        Callbacks are dropped if it rolls back. With no transaction open on
+        this thread the callback runs immediately.
+        """
+        if getattr(self._local, 'conn', None) is None:
+            callback()
+        else:
+            self._local.after_commit.append(callback)
+
+    def _open(self) -> sqlite3.Connection:
+        """Open a new connection and apply the tuning pragmas"""
+        if self.read_only:
+            # Unpacked archives never change, so they are opened without locking
+            uri = f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro&immutable=1"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_path,
+                                   timeout=self.busy_timeout_ms / 1000.0,
+                                   check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        for name, value in self.pragmas.items():
+            if self.read_only and name == 'journal_mode':
+                continue
+            conn.execute(f"PRAGMA {name} = {value}")
+        if self.on_connect:
+            self.on_connect(conn)
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._all) < self.max_connections:
+                conn = self._open()
+                self._all.append(conn)
+                return conn
+
+        # Pool exhausted - wait for another thread to hand one back
+        try:
+            return self._idle.get(timeout=self.busy_timeout_ms / 1000.0)
+        except queue.Empty:
+            raise sqlite3.OperationalError("activity database connection pool exhausted")
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commit on success, roll back on error"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            # Re-entrant use on the same thread shares the open transaction
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        self._local.after_commit = []
+        committed = False
+        try:
+            yield conn
+            conn.commit()
+            committed = True
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            callbacks = self._local.after_commit
+            self._local.conn = None
+            self._local.depth = 0
+            self._local.after_commit = []
+            self._idle.put(conn)
+        if committed:
+            for callback in callbacks:
+                callback()
+
+    def close_all(self):
+        """Close every connection owned by the pool"""
+        with self._lock:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._all = []
+            self._idle = queue.LifoQueue()
+
+
+class InternCache:
+    """Write-path cache of dimension value -> id for one dimension table.
+
+    Misses are interned with INSERT OR IGNORE inside the caller's
+    transaction, and only cached once that transaction commits, so a
+    rollback never leaves an id in the cache that is not in the database.
+    """
+
+    def __init__(self, table: str, max_entries: int = 100000, categorize=None):
+        self.table = table
+        self.max_entries = max_entries
+        self.categorize = categorize
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, value):
+        return value in self._ids
+
+    def resolve(self, conn, values: Iterable[str], pool: ConnectionPool) -> Dict[str, int]:
+        """Map each distinct value to its id, interning values not seen before"""
+        ids = {}
+        missing = []
+        with self._lock:
+            for value in values:
+                value_id = self._ids.get(value)
+                if value_id is None:
+                    missing.append(value)
+                else:
+                    ids[value] = value_id
+        if not missing:
+            return ids
+
+        if self.categorize:
+            conn.executemany(f"INSERT OR IGNORE INTO {self.table} (value, category) VALUES (?, ?)",
+                             [(value, self.categorize(value)) for value in missing])
+        else:
+            conn.executemany(f"INSERT OR IGNORE INTO {self.table} (value) VALUES (?)",
+                             [(value,) for value in missing])
+        interned = {}
+        for chunk in _chunked(missing, 500):
+            interned.update(conn.execute(
+                f"SELECT value, id FROM {self.table} WHERE value IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ))
+        pool.after_commit(lambda: self._publish(interned))
+        ids.update(interned)
+        return ids
+
+    def _publish(self, interned: Dict[str, int]):
+        with self._lock:
+            self._ids.update(interned)
+            # Evict the oldest entries once over budget
+            while len(self._ids) > self.max_entries:
+                del self._ids[next(iter(self._ids))]
+
+
+class ActivityPartition:
+    """One month of activities, stored in its own SQLite file"""
+
+    def __init__(self, month: str, path: str, read_only: bool = False, **pool_options):
+        self.month = month
+        self.path = path
+        self.read_only = read_only
+        self.pool = ConnectionPool(path, read_only=read_only,
+                                   on_connect=register_activity_functions, **pool_options)
+        self.interned = {
+            field: InternCache(table, categorize=classify_activity if field == 'activity' else None)
+            for field, (table, _) in DIMENSIONS.items()
+        }
+
+    def close(self):
+        self.pool.close_all()
+
+
+class ActivityDatabase:
+    """Activity store split into monthly partition files.
+
+    The main database holds download tokens, migration checkpoints, the
+    partition catalog and the rollups. Each month's activities live in a
+    file of their own, so cold months can be archived or dropped whole.
+    """
+
+    def __init__(self, db_path: str = "activity_audit.db", max_connections: int = 8,
+                 busy_timeout_ms: int = 5000, pragmas: Dict = None,
+                 retention: RetentionPolicy = None, shared_sequence: bool = False):
+        self.db_path = db_path
+        self._pool_options = {'max_connections': max_connections,
+                              'busy_timeout_ms': busy_timeout_ms, 'pragmas': pragmas}
+        self.pool = ConnectionPool(db_path, on_connect=register_activity_functions,
+                                   **self._pool_options)
+        self.catalog = PartitionCatalog(self.pool, db_path)
+        self.retention = retention or RetentionPolicy()
+        self.rollups = ActivityRollups(self.pool, self._rollup_sources)
+        self._partitions = {}
+        self._partitions_lock = threading.RLock()
+        # Sequence numbers: the last one handed out, and those reserved but not yet written.
+        # A shared sequence keeps both in the main database instead, for several processes
+        self.shared_sequence = shared_sequence
+        self._seq_owner = uuid.uuid4().hex
+        self._seq_lock = threading.Lock()
+        self._last_seq = 0
+        self._unwritten = deque()
+        self._released = set()
+        # Bumped when retention archives or deletes partitions
+        self._generation = 0
         self.init_database()
+
+    def close(self):
+        """Close all pooled connections, including those of open partitions"""
+        with self._partitions_lock:
+            for partition in self._partitions.values():
+                partition.close()
+            self._partitions = {}
+        self.pool.close_all()
     
     def init_database(self):
         """Initialize the database with required tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create activities table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS activities (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                session_id TEXT NOT NULL,
-                activity TEXT NOT NULL,
-                file_name TEXT NOT NULL,
-                ip_address TEXT,
-                user_agent TEXT,
-                additional_info TEXT,
-                created_date DATE NOT NULL,
-                created_time TIME NOT NULL
-            )
-        ''')
-        
-        # Create index for faster queries
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_name ON activities(file_name)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_activity ON activities(activity)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_created_date ON activities(created_date)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_session_id ON activities(session_id)')
-
-        # Table for download tokens
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS download_tokens (
-                token TEXT PRIMARY KEY,
-                file_name TEXT NOT NULL,
-                allowed_email TEXT,
-                expires_at TEXT NOT NULL
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+
+            # Which monthly partitions exist and what they hold
+            self.catalog.init_table(cursor)
+
+            # Table for download tokens
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS download_tokens (
+                    token TEXT PRIMARY KEY,
+                    file_name TEXT NOT NULL,
+                    allowed_email TEXT,
+                    expires_at TEXT NOT NULL
+                )
+            ''')
+
+            # Progress of JSON log migrations, so restarts resume instead of re-importing
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS migration_checkpoints (
+                    source TEXT PRIMARY KEY,
+                    byte_offset INTEGER NOT NULL,
+                    prefix_sha1 TEXT NOT NULL,
+                    records INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            ''')
+
+            # How far each activity journal has been written to the database
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS journal_checkpoints (
+                    journal TEXT PRIMARY KEY,
+                    segment TEXT NOT NULL,
+                    byte_offset INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            ''')
+
+            # Sequence counter and open reservations, used when the sequence is shared
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS activity_sequence (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    last_seq INTEGER NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS activity_seq_reservations (
+                    first_seq INTEGER PRIMARY KEY,
+                    last_seq INTEGER NOT NULL,
+                    owner TEXT NOT NULL,
+                    reserved_at REAL NOT NULL
+                )
+            ''')
+
+            # Hourly/daily rollups across all partitions
+            self.rollups.init_tables(cursor)
+
+            legacy = cursor.execute("SELECT type FROM sqlite_master WHERE name = 'activities'").fetchone()
+
+        if legacy:
+            self._split_legacy_activities(legacy[0])
+
+        # Bring catalog ranges and rollups up to date with every live partition
+        for partition in self.live_partitions():
+            self._sync_partition(partition)
+        self._advance_seq(self.catalog.max_seq())
+
+    def _init_partition(self, partition: ActivityPartition):
+        """Create the activity schema inside one partition file"""
+        with partition.pool.connection() as conn:
+            cursor = conn.cursor()
+
+            # Dimension tables holding each distinct string once
+            for table, _ in DIMENSIONS.values():
+                category = ", category TEXT NOT NULL" if table == 'dim_activity_types' else ""
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        id INTEGER PRIMARY KEY,
+                        value TEXT NOT NULL UNIQUE{category}
+                    )
+                ''')
+
+            # Create activity_log table, referencing the dimensions by id
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS activity_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    ts_us INTEGER NOT NULL,
+                    created_date DATE NOT NULL,
+                    created_time TIME NOT NULL,
+                    session_ref INTEGER NOT NULL REFERENCES dim_sessions(id),
+                    activity_ref INTEGER NOT NULL REFERENCES dim_activity_types(id),
+                    file_ref INTEGER NOT NULL REFERENCES dim_files(id),
+                    ip_address TEXT,
+                    user_agent_ref INTEGER REFERENCES dim_user_agents(id),
+                    additional_info TEXT,
+                    seq INTEGER
+                )
+            ''')
+            activity_log_columns = {row[1] for row in cursor.execute("PRAGMA table_info(activity_log)")}
+            if 'seq' not in activity_log_columns:
+                # Rows written before sequence numbers existed keep a NULL seq
+                cursor.execute("ALTER TABLE activity_log ADD COLUMN seq INTEGER")
+            # Ids continue from the month's base, keeping them unique across partitions
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) SELECT 'activity_log', ? "
+                "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'activity_log')",
+                (month_id_base(partition.month),)
             )
+            
+            # Create index for faster queries. The (x, ts_us) indexes serve
+            # "filter on x, newest first" and also DISTINCT x lookups.
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_ts ON activity_log(ts_us)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_ts ON activity_log(file_ref, ts_us)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_activity_ts ON activity_log(activity_ref, ts_us)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_session_ts ON activity_log(session_ref, ts_us)')
+            # Covers get_statistics so it never touches the table itself
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_stats_cover '
+                           'ON activity_log(created_date, activity_ref, session_ref)')
+            # Serves "everything after sequence number N" for the polling views
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_seq ON activity_log(seq)')
+
+            # The activities view keeps the original row shape for readers and raw SQL.
+            # A view from before the seq column is replaced (with its triggers).
+            view_columns = {row[1] for row in cursor.execute("PRAGMA table_info(activities)")}
+            if view_columns and 'seq' not in view_columns:
+                cursor.execute("DROP VIEW activities")
+            cursor.execute(f"CREATE VIEW IF NOT EXISTS activities AS {_ACTIVITIES_SELECT}")
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS activities_insert INSTEAD OF INSERT ON activities
+                BEGIN
+                    INSERT OR IGNORE INTO dim_sessions (value) VALUES (NEW.session_id);
+                    INSERT OR IGNORE INTO dim_activity_types (value, category)
+                        VALUES (NEW.activity, activity_category(NEW.activity));
+                    INSERT OR IGNORE INTO dim_files (value) VALUES (NEW.file_name);
+                    INSERT OR IGNORE INTO dim_user_agents (value)
+                        SELECT NEW.user_agent WHERE NEW.user_agent IS NOT NULL;
+                    INSERT INTO activity_log (id, timestamp, ts_us, created_date, created_time,
+                                              session_ref, activity_ref, file_ref, ip_address,
+                                              user_agent_ref, additional_info, seq)
+                    VALUES (NEW.id, NEW.timestamp, NEW.ts_us, NEW.created_date, NEW.created_time,
+                            (SELECT id FROM dim_sessions WHERE value = NEW.session_id),
+                            (SELECT id FROM dim_activity_types WHERE value = NEW.activity),
+                            (SELECT id FROM dim_files WHERE value = NEW.file_name),
+                            NEW.ip_address,
+                            (SELECT id FROM dim_user_agents WHERE value = NEW.user_agent),
+                            NEW.additional_info, NEW.seq);
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS activities_delete INSTEAD OF DELETE ON activities
+                BEGIN
+                    DELETE FROM activity_log WHERE id = OLD.id;
+                END
+            ''')
+
+            # How far each import (JSON log, journal) has been written into this partition.
+            # Saved in the transaction that writes the rows, so a replay can tell what is here
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS import_progress (
+                    source TEXT PRIMARY KEY,
+                    segment TEXT NOT NULL,
+                    byte_offset INTEGER NOT NULL
+                )
+            ''')
+
+            self._init_search_index(cursor)
+
+    def _split_legacy_activities(self, kind: str):
+        """Move activities an older version kept in the main database into partitions.
+
+        Partitions left behind by an interrupted run are discarded and the
+        rollups rebuilt, so the copy always starts over; the legacy tables
+        are only dropped once every row has been copied.
+        """
+        print("📦 Moving activities into monthly partitions...")
+        for entry in self.catalog.entries(include_archived=True):
+            with self._partitions_lock:
+                self._close_partition(entry['month'])
+                self.catalog.delete(entry['month'])
+        with self.pool.connection() as conn:
+            self.rollups.reset(conn)
+            if kind == 'table':
+                self._migrate_activities(conn.cursor())
+
+        columns = ('id', 'timestamp', 'session_id', 'activity', 'file_name', 'ip_address',
+                   'user_agent', 'additional_info', 'created_date', 'created_time', 'ts_us')
+        last_id = 0
+        moved = 0
+        while True:
+            with self.pool.connection() as conn:
+                rows = conn.execute(
+                    f"SELECT {', '.join(columns)} FROM activities WHERE id > ? ORDER BY id LIMIT 10000",
+                    (last_id,)
+                ).fetchall()
+            if not rows:
+                break
+            by_month = {}
+            for row in rows:
+                activity = dict(zip(columns, row))
+                if activity['additional_info']:
+                    activity['additional_info'] = json.loads(activity['additional_info'])
+                parsed = (activity['created_date'], activity['created_time'], activity['ts_us'])
+                by_month.setdefault(month_key(activity['created_date']), []).append((activity, parsed))
+            for month, items in sorted(by_month.items()):
+                self._write_partition(month, items)
+            last_id = rows[-1][0]
+            moved += len(rows)
+
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DROP VIEW IF EXISTS activities_search_source")
+            conn.execute("DROP TABLE IF EXISTS activities_fts")
+            conn.execute(f"DROP {'VIEW' if kind == 'view' else 'TABLE'} activities")
+            for table in ('activity_log',) + tuple(table for table, _ in DIMENSIONS.values()):
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+        print(f"✅ Moved {moved} activities into {len(self.catalog.entries())} partitions")
+
+    def _migrate_activities(self, cursor):
+        """Bring an activities table created by an older version up to date"""
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(activities)")}
+
+        if 'ts_us' not in columns:
+            cursor.execute("ALTER TABLE activities ADD COLUMN ts_us INTEGER")
+        while True:
+            cursor.execute("SELECT id, timestamp FROM activities WHERE ts_us IS NULL LIMIT 10000")
+            pending = cursor.fetchall()
+            if not pending:
+                break
+            updates = []
+            for row_id, timestamp in pending:
+                try:
+                    ts_us = parse_timestamps([timestamp])[0][2]
+                except ValueError:
+                    ts_us = 0  # unparseable legacy value; sorts as oldest
+                updates.append((ts_us, row_id))
+            cursor.executemany("UPDATE activities SET ts_us = ? WHERE id = ?", updates)
+    
+    def _init_search_index(self, cursor):
+        """Create the FTS5 index over activities and the triggers that sync it"""
+        flattened_info = _FLATTEN_INFO_SQL.format(col='additional_info')
+        cursor.execute(f'''
+            CREATE VIEW IF NOT EXISTS activities_search_source AS
+            SELECT id, file_name, activity, session_id, ip_address, user_agent,
+                   {flattened_info} AS details
+            FROM activities
         ''')
 
-        conn.commit()
-        conn.close()
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'activities_fts'"
+        ).fetchone()
+        if not exists:
+            # External content: the index stores only tokens, text comes from the view
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE activities_fts USING fts5(
+                    {', '.join(SEARCH_COLUMNS)},
+                    content='activities_search_source', content_rowid='id',
+                    prefix='2 3'
+                )
+            ''')
+            # Index existing rows ('rebuild' cannot read json_tree through the view)
+            columns = ', '.join(('rowid',) + SEARCH_COLUMNS)
+            cursor.execute(f"INSERT INTO activities_fts({columns}) "
+                           f"SELECT id, {', '.join(SEARCH_COLUMNS)} FROM activities_search_source")
+
+        def values(ref):
+            exprs = [f"{ref}.id"]
+            for column in SEARCH_COLUMNS:
+                if column in DIMENSIONS:
+                    table, ref_column = DIMENSIONS[column]
+                    exprs.append(f"(SELECT value FROM {table} WHERE id = {ref}.{ref_column})")
+                elif column == 'details':
+                    exprs.append(_FLATTEN_INFO_SQL.format(col=f"{ref}.additional_info"))
+                else:
+                    exprs.append(f"{ref}.{column}")
+            return ', '.join(exprs)
+
+        columns = ', '.join(('rowid',) + SEARCH_COLUMNS)
+        delete_old = (f"INSERT INTO activities_fts(activities_fts, {columns}) "
+                      f"VALUES ('delete', {values('old')});")
+        insert_new = f"INSERT INTO activities_fts({columns}) VALUES ({values('new')});"
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS activities_fts_insert AFTER INSERT ON activity_log "
+                       f"BEGIN {insert_new} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS activities_fts_delete AFTER DELETE ON activity_log "
+                       f"BEGIN {delete_old} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS activities_fts_update AFTER UPDATE OF "
+                       f"session_ref, activity_ref, file_ref, ip_address, user_agent_ref, additional_info "
+                       f"ON activity_log BEGIN {delete_old} {insert_new} END")
     
+    def partition(self, month: str, writable: bool = False) -> Optional[ActivityPartition]:
+        """The partition holding ``month`` ('YYYY-MM'), opened on first use.
+
+        An archived month is unpacked read-only, or restored to a live
+        partition when ``writable`` is set. A month with no partition yet
+        returns None, unless ``writable`` is set, which creates it.
+        """
+        with self._partitions_lock:
+            partition = self._partitions.get(month)
+            if partition is not None and not (writable and partition.read_only):
+                return partition
+
+            entry = self.catalog.get(month)
+            if entry is None and not writable:
+                return None
+            if entry is not None and entry['state'] == ARCHIVED:
+                if not writable:
+                    partition = ActivityPartition(month, self.catalog.extract(month), read_only=True,
+                                                  **self._pool_options)
+                    self._partitions[month] = partition
+                    return partition
+                # A late write into an archived month brings it back to life
+                print(f"📦 Restoring archived activity partition {month}")
+                self._close_partition(month)
+                self.catalog.restore(month)
+
+            partition = ActivityPartition(month, self.catalog.live_path(month), **self._pool_options)
+            self._init_partition(partition)
+            if entry is None:
+                self.catalog.register(month)
+            self._partitions[month] = partition
+            return partition
+
+    def live_partitions(self) -> List[ActivityPartition]:
+        """Every live (not archived) partition, newest first"""
+        partitions = (self.partition(entry['month']) for entry in self.catalog.entries())
+        return [partition for partition in partitions if partition is not None]
+
+    def _close_partition(self, month: str):
+        partition = self._partitions.pop(month, None)
+        if partition is not None:
+            partition.close()
+
+    def _rollup_sources(self):
+        return [(partition.month, partition.pool) for partition in self.live_partitions()]
+
+    def _sync_partition(self, partition: ActivityPartition):
+        """Record a partition's time range and fold its new rows into the rollups.
+
+        A failure here only leaves the rollups behind; they catch up from
+        their high-water mark on the next write or summary.
+        """
+        try:
+            with partition.pool.connection() as conn:
+                low, high, max_seq = conn.execute(
+                    "SELECT (SELECT MIN(ts_us) FROM activity_log), (SELECT MAX(ts_us) FROM activity_log), "
+                    "(SELECT MAX(seq) FROM activity_log)"
+                ).fetchone()
+            with self.pool.connection():
+                if low is not None:
+                    self.catalog.set_range(partition.month, low, high, max_seq)
+                self.rollups.fold(partition.month, partition.pool)
+        except sqlite3.Error as e:
+            print(f"⚠️  Could not update rollups for activity partition {partition.month}: {e}")
+
+    def apply_retention(self, today: date = None) -> Dict[str, List[str]]:
+        """Archive and delete partitions as the retention policy says.
+
+        Returns the months archived and deleted. Meant for quiet moments
+        such as startup: a partition being archived is closed under any
+        reader still using it.
+        """
+        archive_before = self.retention.archive_before(today)
+        delete_before = self.retention.delete_before(today)
+        archived, deleted = [], []
+        for entry in self.catalog.entries(include_archived=True):
+            month = entry['month']
+            if delete_before and month < delete_before:
+                with self._partitions_lock:
+                    self._close_partition(month)
+                    self.catalog.delete(month)
+                self.rollups.forget(month)
+                deleted.append(month)
+            elif archive_before and month < archive_before and entry['state'] == LIVE:
+                self._archive_partition(month)
+                archived.append(month)
+        if archived or deleted:
+            self._generation += 1
+        return {'archived': archived, 'deleted': deleted}
+
+    def _archive_partition(self, month: str):
+        """Compact a live partition and replace it with a compressed archive"""
+        with self._partitions_lock:
+            partition = self.partition(month)
+            # Rollups outlive the raw rows, so they must hold every row first
+            self.rollups.fold(month, partition.pool)
+            with partition.pool.connection() as conn:
+                conn.execute("VACUUM")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._close_partition(month)
+            self.catalog.archive(month, self.retention.compression_preset)
+    
     def add_activity(self, timestamp: str, session_id: str, activity: str, 
                     file_name: str, ip_address: str = None, user_agent: str = None, 
                     additional_info: Dict = None):
         """Add a new activity to the database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Parse timestamp to get date and time
-        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-        created_date = dt.date().isoformat()
-        created_time = dt.time().isoformat()
-        
-        cursor.execute('''
-            INSERT INTO activities 
-            (timestamp, session_id, activity, file_name, ip_address, user_agent, additional_info, created_date, created_time)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            timestamp, session_id, activity, file_name, ip_address, user_agent,
-            json.dumps(additional_info) if additional_info else None,
-            created_date, created_time
-        ))
-        
-        conn.commit()
-        conn.close()
+        self.add_activities([{
+            'timestamp': timestamp,
+            'session_id': session_id,
+            'activity': activity,
+            'file_name': file_name,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'additional_info': additional_info
+        }])
+
+    def add_activities(self, activities: Iterable[Dict], chunk_size: int = 1000,
+                       progress: Tuple[str, Tuple[str, int]] = None, written: List[Dict] = None) -> int:
+        """Bulk insert activity dicts, one executemany transaction per chunk and month.
+
+        Activities carrying a 'seq' (reserved with allocate_seq, or replayed
+        from the journal) keep it; the others are numbered here. With
+        ``progress`` (source, (segment, byte offset)) the activities are one
+        chunk, and every month's transaction also records that position in
+        the partition's import_progress. With ``written``, each activity is
+        appended to it once its month has committed, so after a failure the
+        caller can tell which ones still need writing.
+        """
+        if progress is not None:
+            activities = list(activities)
+            chunk_size = max(len(activities), 1)
+        total = 0
+        for chunk in _chunked(activities, chunk_size):
+            parsed = parse_timestamps([a.get('timestamp') for a in chunk])
+            given = [a['seq'] for a in chunk if a.get('seq') is not None]
+            if given:
+                self._advance_seq(max(given))
+            allocated = self.allocate_seqs(len(chunk) - len(given))
+            numbers = iter(allocated)
+            by_month = {}
+            for activity, values in zip(chunk, parsed):
+                numbered = activity if activity.get('seq') is not None else dict(activity, seq=next(numbers))
+                by_month.setdefault(month_key(values[0]), []).append((numbered, values, activity))
+            try:
+                for month, items in sorted(by_month.items()):
+                    self._write_partition(month, [(numbered, values) for numbered, values, _ in items], progress)
+                    # Reserved numbers are released month by month, so those of a
+                    # month that committed are not left pending if a later one fails
+                    self.release_seqs([activity['seq'] for _, _, activity in items
+                                       if activity.get('seq') is not None])
+                    if written is not None:
+                        written.extend(activity for _, _, activity in items)
+            finally:
+                # Numbers handed out here are written or abandoned now; reserved ones
+                # stay pending on failure, so the caller can still retry them
+                self.release_seqs(allocated)
+            total += len(chunk)
+        return total
+
+    def allocate_seq(self) -> int:
+        """Reserve the next sequence number for an activity about to be written.
+
+        Numbers increase across restarts. Readers only see activities up to
+        high_water, so a reserved number must be passed to add_activities
+        or given up with release_seqs.
+        """
+        return self.allocate_seqs(1)[0]
+
+    def allocate_seqs(self, count: int) -> List[int]:
+        """Reserve ``count`` consecutive sequence numbers, as allocate_seq does.
+
+        With a shared sequence the block is one reservation row in the main
+        database, so every process writing to it draws from one sequence;
+        such a block is released as a whole.
+        """
+        if count < 1:
+            return []
+        if self.shared_sequence:
+            now = time.time()
+            with self.pool.connection() as conn:
+                conn.execute("DELETE FROM activity_seq_reservations WHERE reserved_at <= ?",
+                             (now - SEQ_RESERVATION_TIMEOUT,))
+                conn.execute("UPDATE activity_sequence SET last_seq = last_seq + ? WHERE id = 1", (count,))
+                last = conn.execute("SELECT last_seq FROM activity_sequence WHERE id = 1").fetchone()[0]
+                conn.execute("INSERT INTO activity_seq_reservations (first_seq, last_seq, owner, reserved_at) "
+                             "VALUES (?, ?, ?, ?)", (last - count + 1, last, self._seq_owner, now))
+            return list(range(last - count + 1, last + 1))
+        with self._seq_lock:
+            seqs = list(range(self._last_seq + 1, self._last_seq + count + 1))
+            self._last_seq += count
+            self._unwritten.extend(seqs)
+            return seqs
+
+    def release_seqs(self, seqs: Iterable[int]):
+        """Mark reserved sequence numbers as written or abandoned"""
+        if self.shared_sequence:
+            seqs = list(seqs)
+            if seqs:
+                with self.pool.connection() as conn:
+                    conn.execute("DELETE FROM activity_seq_reservations "
+                                 "WHERE owner = ? AND first_seq >= ? AND last_seq <= ?",
+                                 (self._seq_owner, min(seqs), max(seqs)))
+            return
+        with self._seq_lock:
+            for seq in seqs:
+                if self._unwritten and seq >= self._unwritten[0]:
+                    self._released.add(seq)
+            while self._unwritten and self._unwritten[0] in self._released:
+                self._released.discard(self._unwritten.popleft())
+
+    def _advance_seq(self, seq: int):
+        """Make sure numbering continues after ``seq`` (written with a number of its own)"""
+        if self.shared_sequence:
+            with self.pool.connection() as conn:
+                conn.execute("INSERT INTO activity_sequence (id, last_seq) VALUES (1, ?) "
+                             "ON CONFLICT (id) DO UPDATE SET last_seq = MAX(last_seq, excluded.last_seq)",
+                             (seq,))
+            return
+        with self._seq_lock:
+            self._last_seq = max(self._last_seq, seq)
+
+    @property
+    def high_water(self) -> int:
+        """Sequence number up to which every activity is written and readable"""
+        if self.shared_sequence:
+            with self.pool.connection() as conn:
+                row = conn.execute(
+                    "SELECT last_seq, (SELECT MIN(first_seq) FROM activity_seq_reservations "
+                    "WHERE reserved_at > ?) FROM activity_sequence WHERE id = 1",
+                    (time.time() - SEQ_RESERVATION_TIMEOUT,)).fetchone()
+            if row is None:
+                return 0
+            return row[1] - 1 if row[1] is not None else row[0]
+        with self._seq_lock:
+            return self._unwritten[0] - 1 if self._unwritten else self._last_seq
+
+    @property
+    def data_version(self) -> Tuple[int, int]:
+        """Changes whenever the activities readers can see do, without querying them"""
+        return self.high_water, self._generation
+
+    def _write_partition(self, month: str, items: List[Tuple[Dict, Tuple[str, str, int]]],
+                         progress: Tuple[str, Tuple[str, int]] = None):
+        """Insert (activity, parsed timestamp) pairs into one month's partition"""
+        partition = self.partition(month, writable=True)
+        with partition.pool.connection() as conn:
+            conn.executemany(_INSERT_ACTIVITY_LOG, self._activity_rows(partition, conn, items))
+            if progress is not None:
+                source, (segment, offset) = progress
+                conn.execute("INSERT OR REPLACE INTO import_progress (source, segment, byte_offset) "
+                             "VALUES (?, ?, ?)", (source, segment, offset))
+            # Catalog and rollups follow once the rows are committed, and
+            # never if an enclosing partition transaction rolls back
+            partition.pool.after_commit(lambda: self._sync_partition(partition))
+
+    def _activity_rows(self, partition: ActivityPartition, conn,
+                       items: List[Tuple[Dict, Tuple[str, str, int]]]) -> List[Tuple]:
+        """Build activity_log rows, interning dimension values in the partition"""
+        ids = {
+            field: cache.resolve(conn, {a.get(field) for a, _ in items} - {None}, partition.pool)
+            for field, cache in partition.interned.items()
+        }
+        sessions, activity_types, files, user_agents = (
+            ids['session_id'], ids['activity'], ids['file_name'], ids['user_agent'])
+        rows = []
+        for a, (created_date, created_time, ts_us) in items:
+            additional_info = a.get('additional_info')
+            rows.append((
+                a['timestamp'], ts_us, created_date, created_time,
+                sessions[a['session_id']], activity_types[a['activity']], files[a['file_name']],
+                a.get('ip_address'), user_agents.get(a.get('user_agent')),
+                json.dumps(additional_info) if additional_info else None,
+                a.get('seq')
+            ))
+        return rows
     
     def get_activities(self, file_name: str = None, start_date: str = None, 
                       end_date: str = None, activity_type: str = None, 
-                      session_id: str = None, limit: int = 1000) -> List[Dict]:
-        """Get activities with optional filters"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        query = "SELECT * FROM activities WHERE 1=1"
-        params = []
-        
-        if file_name:
-            query += " AND file_name LIKE ?"
-            params.append(f"%{file_name}%")
-        
-        if start_date:
-            query += " AND created_date >= ?"
-            params.append(start_date)
-        
-        if end_date:
-            query += " AND created_date <= ?"
-            params.append(end_date)
-        
-        if activity_type:
-            query += " AND activity LIKE ?"
-            params.append(f"%{activity_type}%")
-        
-        if session_id:
-            query += " AND session_id = ?"
-            params.append(session_id)
-        
-        query += " ORDER BY timestamp DESC LIMIT ?"
+                      session_id: str = None, limit: int = 1000,
+                      exact_match: bool = False, activity_prefix: str = None) -> List[Dict]:
+        """Get activities with optional filters, newest first.
+
+        ``file_name`` and ``activity_type`` are substring matches unless
+        ``exact_match`` is set, which lets them use the (x, ts_us) indexes.
+        Archived months are only read when ``start_date`` reaches into them.
+        """
+        query, params = self._activities_query(file_name, start_date, end_date, activity_type,
+                                               session_id, exact_match, activity_prefix)
+        query += " ORDER BY a.ts_us DESC, a.id DESC LIMIT ?"
         params.append(limit)
-        
-        cursor.execute(query, params)
-        columns = [description[0] for description in cursor.description]
+        return self._collect_activities(self._read_entries(start_date, end_date), query, params, limit)
+
+    def get_activities_page(self, file_name: str = None, start_date: str = None,
+                            end_date: str = None, activity_type: str = None,
+                            session_id: str = None, page_size: int = 100,
+                            cursor: str = None, exact_match: bool = False,
+                            activity_prefix: str = None) -> Dict:
+        """Get one page of activities using keyset pagination on (ts_us, id).
+
+        Pass back ``next_cursor`` (older rows) or ``prev_cursor`` (newer rows)
+        with the same filters to move through the results. Each page is an
+        index seek, so deep pages cost the same as the first one.
+        """
+        direction = 'next'
+        query, params = self._activities_query(file_name, start_date, end_date, activity_type,
+                                               session_id, exact_match, activity_prefix)
+        if cursor:
+            direction, ts_us, row_id = decode_cursor(cursor)
+            if direction == 'next':
+                query += " AND a.ts_us <= ? AND (a.ts_us < ? OR a.id < ?)"
+            else:
+                query += " AND a.ts_us >= ? AND (a.ts_us > ? OR a.id > ?)"
+            params.extend([ts_us, ts_us, row_id])
+
+        order = "DESC" if direction == 'next' else "ASC"
+        query += f" ORDER BY a.ts_us {order}, a.id {order} LIMIT ?"
+        params.append(page_size + 1)
+
+        activities = self._collect_activities(self._read_entries(start_date, end_date), query, params,
+                                              page_size + 1, newest_first=direction == 'next')
+        has_more = len(activities) > page_size
+        activities = activities[:page_size]
+        if direction == 'prev':
+            activities.reverse()
+
+        # Paging forward, newer rows exist only if we came from a cursor;
+        # paging back, older rows always exist (the page we came from)
+        if direction == 'next':
+            older_exist, newer_exist = has_more, cursor is not None
+        else:
+            older_exist, newer_exist = True, has_more
+
+        next_cursor = prev_cursor = None
+        if activities:
+            first, last = activities[0], activities[-1]
+            if older_exist:
+                next_cursor = encode_cursor(last['ts_us'], last['id'], 'next')
+            if newer_exist:
+                prev_cursor = encode_cursor(first['ts_us'], first['id'], 'prev')
+
+        return {
+            'activities': activities,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor
+        }
+
+    def get_activities_since(self, since_seq: int, file_name: str = None, start_date: str = None,
+                             end_date: str = None, activity_type: str = None,
+                             session_id: str = None, limit: int = 1000,
+                             exact_match: bool = False, activity_prefix: str = None) -> Dict:
+        """Activities with a sequence number above ``since_seq``, oldest first.
+
+        Returns them with the new ``high_water`` to pass back as
+        ``since_seq`` next time; it only moves past activities that are
+        already readable, so polling this way never skips one. ``reset``
+        is set when ``since_seq`` is ahead of this database.
+        """
+        high_water = self.high_water
+        query, params = self._activities_query(file_name, start_date, end_date, activity_type,
+                                               session_id, exact_match, activity_prefix)
+        query += " AND a.seq > ? AND a.seq <= ? ORDER BY a.seq LIMIT ?"
+        params.extend([since_seq, high_water, limit])
+
+        activities = []
+        if since_seq < high_water:
+            for entry in self.catalog.entries(include_archived=True):
+                # Archived months only hold new rows if a late write restored them
+                if entry['state'] == ARCHIVED and (entry['max_seq'] or 0) <= since_seq:
+                    continue
+                partition = self.partition(entry['month'])
+                if partition is not None:
+                    activities.extend(self._fetch_activities(partition.pool, query, params))
+            activities.sort(key=lambda activity: activity['seq'])
+            del activities[limit:]
+        if len(activities) == limit:
+            high_water = activities[-1]['seq']
+
+        return {
+            'activities': activities,
+            'high_water': high_water,
+            'reset': since_seq > high_water
+        }
+
+    def _read_entries(self, start_date: str = None, end_date: str = None) -> List[Dict]:
+        """Catalog entries of the partitions a date-filtered read has to visit.
+
+        Archived months are included only when ``start_date`` reaches back
+        into them, so the default views never unpack an archive.
+        """
+        entries = self.catalog.entries(month_key(start_date) if start_date else None,
+                                       month_key(end_date) if end_date else None,
+                                       include_archived=bool(start_date))
+        return [entry for entry in entries if entry['max_ts_us'] is not None]
+
+    def _collect_activities(self, entries: List[Dict], query: str, params: List, limit: int,
+                            newest_first: bool = True) -> List[Dict]:
+        """Run a (ts_us, id)-ordered query per partition and merge the results.
+
+        Partitions are visited in time order, stopping once the next one
+        cannot hold any of the first ``limit`` rows.
+        """
+        if newest_first:
+            entries = sorted(entries, key=lambda entry: entry['max_ts_us'], reverse=True)
+        else:
+            entries = sorted(entries, key=lambda entry: entry['min_ts_us'])
+
+        def order(activity):
+            return activity['ts_us'], activity['id']
+
+        activities = []
+        for entry in entries:
+            if len(activities) >= limit:
+                activities.sort(key=order, reverse=newest_first)
+                del activities[limit:]
+                edge = activities[-1]['ts_us']
+                if (entry['max_ts_us'] < edge) if newest_first else (entry['min_ts_us'] > edge):
+                    break
+            partition = self.partition(entry['month'])
+            if partition is not None:
+                activities.extend(self._fetch_activities(partition.pool, query, params))
+        activities.sort(key=order, reverse=newest_first)
+        return activities[:limit]
+
+    def _fetch_activities(self, pool: ConnectionPool, query: str, params: List) -> List[Dict]:
+        """Run an activities SELECT on one partition and decode each row into a dict"""
+        with pool.connection() as conn:
+            cursor = conn.execute(query, params)
+            columns = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
         
         activities = []
-        for row in cursor.fetchall():
+        for row in rows:
             activity = dict(zip(columns, row))
             if activity['additional_info']:
                 activity['additional_info'] = json.loads(activity['additional_info'])
             activities.append(activity)
         
-        conn.close()
         return activities
+    
+    def _activities_query(self, file_name=None, start_date=None, end_date=None,
+                          activity_type=None, session_id=None, exact_match=False,
+                          activity_prefix=None):
+        """Build the SELECT and parameters for get_activities filters.
+
+        Filters on interned fields are resolved against the small dimension
+        tables first. Substring and prefix matches become an id set checked
+        per row (the unary + keeps the planner on the ts_us order).
+        """
+        query = f"{_ACTIVITIES_SELECT} WHERE 1=1"
+        params = []
+        
+        if file_name:
+            if exact_match:
+                query += " AND a.file_ref = (SELECT id FROM dim_files WHERE value = ?)"
+                params.append(file_name)
+            else:
+                query += " AND +a.file_ref IN (SELECT id FROM dim_files WHERE value LIKE ?)"
+                params.append(f"%{file_name}%")
+        
+        # Seek on ts_us, then apply the exact calendar-date check per row.
+        # The unary + keeps the planner off idx_stats_cover, which would
+        # force a temp B-tree sort for the ORDER BY.
+        low, high = date_to_ts_us_range(start_date, end_date)
+        if start_date:
+            query += " AND a.ts_us >= ? AND +a.created_date >= ?"
+            params.extend([low, start_date])
+        
+        if end_date:
+            query += " AND a.ts_us < ? AND +a.created_date <= ?"
+            params.extend([high, end_date])
+        
+        if activity_type:
+            if exact_match:
+                query += " AND a.activity_ref = (SELECT id FROM dim_activity_types WHERE value = ?)"
+                params.append(activity_type)
+            else:
+                query += " AND +a.activity_ref IN (SELECT id FROM dim_activity_types WHERE value LIKE ?)"
+                params.append(f"%{activity_type}%")
+
+        if activity_prefix:
+            query += (" AND +a.activity_ref IN "
+                      "(SELECT id FROM dim_activity_types WHERE substr(value, 1, ?) = ?)")
+            params.extend([len(activity_prefix), activity_prefix])
+        
+        if session_id:
+            query += " AND a.session_ref = (SELECT id FROM dim_sessions WHERE value = ?)"
+            params.append(session_id)
+
+        return query, params
     
+    def search_activities(self, text: str, limit: int = 50, file_name: str = None,
+                          start_date: str = None, end_date: str = None) -> List[Dict]:
+        """Full-text search over activities, best matches first.
+
+        Each result carries a ``snippet`` with matches wrapped in <mark> and
+        all other text HTML-escaped. Every partition in range is searched
+        and the hits are merged by rank.
+        """
+        match = build_search_query(text)
+        query = '''
+            SELECT a.*, snippet(activities_fts, -1, ?, ?, '…', 16) AS snippet,
+                   activities_fts.rank AS search_rank
+            FROM activities_fts
+            JOIN activities a ON a.id = activities_fts.rowid
+            WHERE activities_fts MATCH ?
+        '''
+        params = [_MARK_OPEN, _MARK_CLOSE, match]
+        if file_name:
+            query += " AND a.file_name = ?"
+            params.append(file_name)
+        if start_date:
+            query += " AND a.created_date >= ?"
+            params.append(start_date)
+        if end_date:
+            query += " AND a.created_date <= ?"
+            params.append(end_date)
+        query += " ORDER BY activities_fts.rank LIMIT ?"
+        params.append(limit)
+
+        results = []
+        for entry in self._read_entries(start_date, end_date):
+            partition = self.partition(entry['month'])
+            if partition is not None:
+                results.extend(self._fetch_activities(partition.pool, query, params))
+        results.sort(key=lambda result: result['search_rank'])
+        results = results[:limit]
+        for result in results:
+            del result['search_rank']
+            result['snippet'] = html.escape(result['snippet'] or '') \
+                .replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>')
+        return results
+
     def get_file_names(self) -> List[str]:
         """Get unique file names from the database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT DISTINCT file_name FROM activities ORDER BY file_name")
-        file_names = [row[0] for row in cursor.fetchall()]
-        
-        conn.close()
-        return file_names
+        return self._dimension_values('file_name')
     
     def get_activity_types(self) -> List[str]:
         """Get unique activity types from the database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT DISTINCT activity FROM activities ORDER BY activity")
-        activities = [row[0] for row in cursor.fetchall()]
-        
-        conn.close()
-        return activities
+        return self._dimension_values('activity')
+
+    def _dimension_values(self, field: str) -> List[str]:
+        """Sorted values of a dimension still referenced by a live activity"""
+        table, ref_column = DIMENSIONS[field]
+        values = set()
+        for partition in self.live_partitions():
+            with partition.pool.connection() as conn:
+                values.update(row[0] for row in conn.execute(f'''
+                    SELECT d.value FROM {table} d
+                    WHERE EXISTS (SELECT 1 FROM activity_log WHERE {ref_column} = d.id)
+                '''))
+        return sorted(values)
     
-    def get_statistics(self, start_date: str = None, end_date: str = None) -> Dict:
-        """Get activity statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+    def get_statistics(self, start_date: str = None, end_date: str = None,
+                       use_rollups: bool = True) -> Dict:
+        """Get activity statistics.
+
+        Whole-day ranges are answered from the daily rollups, where
+        unique_sessions is a sketch estimate (exact for small counts).
+        """
+        if use_rollups and all(d is None or _DATE_RE.fullmatch(d) for d in (start_date, end_date)):
+            return self._statistics_from_rollups(start_date, end_date)
+
         date_filter = ""
         params = []
         
         if start_date:
-            date_filter += " AND created_date >= ?"
+            date_filter += " AND a.created_date >= ?"
             params.append(start_date)
         
         if end_date:
-            date_filter += " AND created_date <= ?"
+            date_filter += " AND a.created_date <= ?"
             params.append(end_date)
         
-        # Total activities
-        cursor.execute(f"SELECT COUNT(*) FROM activities WHERE 1=1{date_filter}", params)
-        total_activities = cursor.fetchone()[0]
-        
-        # Unique sessions
-        cursor.execute(f"SELECT COUNT(DISTINCT session_id) FROM activities WHERE 1=1{date_filter}", params)
-        unique_sessions = cursor.fetchone()[0]
-        
-        # File opens
-        cursor.execute(f"SELECT COUNT(*) FROM activities WHERE activity LIKE '%OPENED%'{date_filter}", params)
-        file_opens = cursor.fetchone()[0]
-        
-        # Downloads
-        cursor.execute(f"SELECT COUNT(*) FROM activities WHERE activity LIKE '%DOWNLOAD%'{date_filter}", params)
-        downloads = cursor.fetchone()[0]
-        
-        # Prints
-        cursor.execute(f"SELECT COUNT(*) FROM activities WHERE activity LIKE '%PRINT%'{date_filter}", params)
-        prints = cursor.fetchone()[0]
-        
-        conn.close()
+        # Every counter from the covering idx_stats_cover index of each
+        # partition; categories come from the handful of activity type rows
+        totals = [0, 0, 0, 0]
+        sessions = set()
+        for entry in self._read_entries(start_date, end_date):
+            partition = self.partition(entry['month'])
+            if partition is None:
+                continue
+            with partition.pool.connection() as conn:
+                row = conn.execute(f'''
+                    SELECT COUNT(*),
+                           COALESCE(SUM(t.category = 'open'), 0),
+                           COALESCE(SUM(t.category = 'download'), 0),
+                           COALESCE(SUM(t.category = 'print'), 0)
+                    FROM activity_log a INDEXED BY idx_stats_cover
+                    JOIN dim_activity_types t ON t.id = a.activity_ref
+                    WHERE 1=1{date_filter}
+                ''', params).fetchone()
+                # Session ids differ per partition, so the values are unioned
+                sessions.update(value for value, in conn.execute(f'''
+                    SELECT value FROM dim_sessions WHERE id IN (
+                        SELECT a.session_ref FROM activity_log a INDEXED BY idx_stats_cover
+                        WHERE 1=1{date_filter})
+                ''', params))
+            totals = [total + count for total, count in zip(totals, row)]
+        total_activities, file_opens, downloads, prints = totals
         
         return {
             'total_activities': total_activities,
-            'unique_sessions': unique_sessions,
+            'unique_sessions': len(sessions),
             'file_opens': file_opens,
             'downloads': downloads,
             'prints': prints
         }
 
+    def _statistics_from_rollups(self, start_date: str = None, end_date: str = None) -> Dict:
+        by_category = {
+            row['category']: row['events']
+            for row in self.rollups.summarize('day', start_date, end_date, group_by=('category',))
+        }
+        overall = self.rollups.summarize('day', start_date, end_date)[0]
+        return {
+            'total_activities': overall['events'],
+            'unique_sessions': overall['unique_sessions'],
+            'file_opens': by_category.get('open', 0),
+            'downloads': by_category.get('download', 0),
+            'prints': by_category.get('print', 0)
+        }
+
     def create_download_token(self, file_name: str, allowed_email: str = None,
                                expire_minutes: int = 10) -> str:
         """Create a download token with expiration"""
         token = uuid.uuid4().hex
         expires_at = (datetime.now() + timedelta(minutes=expire_minutes)).isoformat()
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO download_tokens (token, file_name, allowed_email, expires_at) VALUES (?, ?, ?, ?)",
-            (token, file_name, allowed_email, expires_at)
-        )
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT INTO download_tokens (token, file_name, allowed_email, expires_at) VALUES (?, ?, ?, ?)",
+                (token, file_name, allowed_email, expires_at)
+            )
         return token
 
     def validate_download_token(self, token: str, file_name: str,
                                 user_email: str = None) -> bool:
         """Validate token against database and expiration"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT allowed_email, expires_at FROM download_tokens WHERE token = ? AND file_name = ?",
-            (token, file_name)
-        )
-        row = cursor.fetchone()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "SELECT allowed_email, expires_at FROM download_tokens WHERE token = ? AND file_name = ?",
+                (token, file_name)
+            )
+            row = cursor.fetchone()
         if not row:
             return False
         allowed_email, expires_at = row
@@ -227,30 +1488,204 @@ class ActivityDatabase:
 
     def revoke_download_token(self, token: str):
         """Revoke a token after use"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM download_tokens WHERE token = ?", (token,))
-        conn.commit()
-        conn.close()
-
-    def migrate_json_logs(self, json_file_path: str):
-        """Migrate existing JSON logs to database"""
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM download_tokens WHERE token = ?", (token,))
+
+    def migrate_json_logs(self, json_file_path: str, chunk_size: int = 1000) -> int:
+        """Migrate existing JSON logs to database.
+
+        ``json_file_path`` is an activity journal directory or a legacy JSON
+        array file. Either is streamed, and a checkpoint is saved with each
+        chunk so a restart resumes after the last migrated record. A JSON
+        file's checkpoint is discarded if its migrated part has changed.
+        """
+        if os.path.isdir(json_file_path):
+            return self._migrate_journal(json_file_path, chunk_size)
         if not os.path.exists(json_file_path):
-            return
-        
+            return 0
+
+        source = os.path.abspath(json_file_path)
+        migrated = 0
+        skipped = 0
         try:
-            with open(json_file_path, 'r') as f:
-                logs = json.load(f)
-            
-            for log in logs:
-                self.add_activity(
-                    timestamp=log.get('timestamp'),
-                    session_id=log.get('session_id'),
-                    activity=log.get('activity'),
-                    file_name=log.get('file_name'),
-                    ip_address=log.get('ip_address'),
-                    user_agent=log.get('user_agent'),
-                    additional_info=log.get('additional_info')
-                )
+            checkpoint = self._load_checkpoint(source)
+            if checkpoint is None:
+                # A new file: progress partitions recorded for an earlier one does not apply
+                self._clear_import_progress(source)
+                checkpoint = (0, 0, hashlib.sha1())
+                self._save_checkpoint(source, 0, checkpoint[2], 0)
+            offset, records, prefix_hash = checkpoint
+            written = self._import_progress(source, ('', offset))
+
+            batch = []
+            positions = []
+            end_offset = offset
+            for log, end_offset in iter_json_array(json_file_path, start_offset=offset):
+                if not _is_valid_log(log):
+                    skipped += 1
+                    continue
+                batch.append(log)
+                positions.append(('', end_offset))
+                if len(batch) >= chunk_size:
+                    prefix_hash = self._migrate_chunk(source, json_file_path, batch, positions, written,
+                                                      prefix_hash, offset, end_offset,
+                                                      records + migrated + len(batch))
+                    migrated += len(batch)
+                    offset = end_offset
+                    batch = []
+                    positions = []
+
+            if batch or end_offset != offset:
+                self._migrate_chunk(source, json_file_path, batch, positions, written, prefix_hash,
+                                    offset, end_offset, records + migrated + len(batch))
+                migrated += len(batch)
         except Exception as e:
             print(f"Error migrating logs: {e}")
+
+        if skipped:
+            print(f"Skipped {skipped} malformed log records during migration")
+        return migrated
+
+    def _migrate_chunk(self, source, json_file_path, batch, positions, written, prefix_hash, start, end, records):
+        """Insert one chunk, then advance the file's checkpoint.
+
+        Each partition records the chunk's end in the transaction that
+        writes its rows. A crash before the checkpoint moves therefore
+        replays the chunk, but records a partition already holds are
+        skipped, so none are written twice.
+        """
+        prefix_hash = self._extend_prefix_hash(json_file_path, prefix_hash, start, end)
+        self.add_activities(self._not_yet_written(batch, positions, written), progress=(source, ('', end)))
+        self._save_checkpoint(source, end, prefix_hash, records)
+        return prefix_hash
+
+    def _save_checkpoint(self, source: str, offset: int, prefix_hash, records: int):
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO migration_checkpoints "
+                "(source, byte_offset, prefix_sha1, records, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (source, offset, prefix_hash.hexdigest(), records, datetime.now().isoformat())
+            )
+
+    def _import_progress(self, source: str, after: Tuple[str, int]) -> Dict[str, Tuple[str, int]]:
+        """Month -> position of each live partition that holds ``source`` past ``after``.
+
+        A partition is only ahead of the checkpoint ``after`` when a crash
+        came between writing a chunk and saving the checkpoint.
+        """
+        written = {}
+        for partition in self.live_partitions():
+            with partition.pool.connection() as conn:
+                row = conn.execute("SELECT segment, byte_offset FROM import_progress WHERE source = ?",
+                                   (source,)).fetchone()
+            if row is not None and tuple(row) > after:
+                written[partition.month] = tuple(row)
+        return written
+
+    def _clear_import_progress(self, source: str):
+        for partition in self.live_partitions():
+            with partition.pool.connection() as conn:
+                conn.execute("DELETE FROM import_progress WHERE source = ?", (source,))
+
+    @staticmethod
+    def _not_yet_written(batch: List[Dict], positions: List[Tuple[str, int]],
+                         written: Dict[str, Tuple[str, int]]) -> List[Dict]:
+        """The records of a chunk whose month's partition has not recorded their position"""
+        if not written or not batch:
+            return batch
+        dates = parse_timestamps([log.get('timestamp') for log in batch])
+        return [log for log, position, (created_date, _, _) in zip(batch, positions, dates)
+                if position > written.get(month_key(created_date), ('', -1))]
+
+    def _migrate_journal(self, directory: str, chunk_size: int = 1000) -> int:
+        """Replay journaled events the database has not seen yet"""
+        reader = JournalReader(directory)
+        source = os.path.abspath(directory)
+        checkpoint = self.journal_checkpoint(directory)
+        written = self._import_progress(source, checkpoint or ('', -1))
+        migrated = 0
+        skipped = 0
+        batch = []
+        positions = []
+        position = None
+        try:
+            for log, position in reader.replay(checkpoint):
+                if not _is_valid_log(log):
+                    skipped += 1
+                    continue
+                batch.append(log)
+                positions.append(position)
+                if len(batch) >= chunk_size:
+                    self._migrate_journal_chunk(directory, batch, positions, written, position)
+                    migrated += len(batch)
+                    batch = []
+                    positions = []
+            if position is not None:
+                self._migrate_journal_chunk(directory, batch, positions, written, position)
+                migrated += len(batch)
+        except Exception as e:
+            print(f"Error migrating journal: {e}")
+
+        skipped += reader.skipped
+        if skipped:
+            print(f"Skipped {skipped} malformed journal records during migration")
+        return migrated
+
+    def _migrate_journal_chunk(self, directory: str, batch: List[Dict], positions, written, position):
+        """Insert one chunk, then advance the journal checkpoint; replays skip what partitions hold"""
+        self.add_activities(self._not_yet_written(batch, positions, written),
+                            progress=(os.path.abspath(directory), tuple(position)))
+        self.save_journal_checkpoint(directory, position)
+
+    def journal_checkpoint(self, directory: str):
+        """Journal position up to which events are in the database, or None"""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT segment, byte_offset FROM journal_checkpoints WHERE journal = ?",
+                (os.path.abspath(directory),)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def save_journal_checkpoint(self, directory: str, position):
+        """Record that every journaled event up to ``position`` is in the database"""
+        segment, offset = position
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO journal_checkpoints (journal, segment, byte_offset, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (os.path.abspath(directory), segment, offset, datetime.now().isoformat())
+            )
+
+    def _load_checkpoint(self, source: str):
+        """Return (byte offset, record count, prefix hash) to resume from, or None to start over"""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT byte_offset, prefix_sha1, records FROM migration_checkpoints WHERE source = ?",
+                (source,)
+            ).fetchone()
+        if row:
+            offset, prefix_sha1, records = row
+            if os.path.getsize(source) >= offset:
+                prefix_hash = self._hash_prefix(source, offset)
+                if prefix_hash.hexdigest() == prefix_sha1:
+                    return offset, records, prefix_hash
+        # No checkpoint, or the file was replaced or truncated - start over
+        return None
+
+    @staticmethod
+    def _hash_prefix(path: str, length: int):
+        return ActivityDatabase._extend_prefix_hash(path, hashlib.sha1(), 0, length)
+
+    @staticmethod
+    def _extend_prefix_hash(path: str, prefix_hash, start: int, end: int):
+        """Feed bytes [start, end) of the file into a running SHA-1"""
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                block = f.read(min(remaining, 1 << 20))
+                if not block:
+                    break
+                prefix_hash.update(block)
+                remaining -= len(block)
+        return prefix_hash
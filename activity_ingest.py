@@ -0,0 +1,371 @@
+"""
+Write-behind ingestion pipeline for activity events
+Request threads number an event and hand it over; nothing on the request
+path touches a file or the database unless the event asks to wait. A sink
+thread appends events to the journal (one fsync per group under the
+'always' policy) and passes them to the listeners in sequence order, and a
+writer thread groups them into one database transaction per batch. The
+journal position is checkpointed once a batch is written, so a restart
+replays only what never reached the database.
+
+Each event is submitted with a durability: 'async' returns at once,
+'journal' waits until the event is in the journal (or, if the journal
+fails to take it, in the database) and 'commit' until its database
+transaction has committed.
+
+An optional ActivityCoalescer sits in front of numbering: repeats of
+chosen periodic events are held and submitted as one event per window.
+
+With several server processes, each has its own queue and journal; the
+database numbers events as they are written, and an ActivityTailer feeds
+every process's listeners from the shared sequence instead.
+"""
+
+import atexit
+import collections
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from activity_database import parse_timestamps
+
+_STOP = object()
+
+DURABILITY_ASYNC, DURABILITY_JOURNAL, DURABILITY_COMMIT = 'async', 'journal', 'commit'
+
+
+class ActivityIngestQueue:
+    def __init__(self, db, batch_size: int = 500, flush_interval_ms: int = 50,
+                 max_queue_size: int = 10000, journal=None, number_events: bool = True,
+                 durability: str = DURABILITY_ASYNC, durability_by_type: Dict[str, str] = None,
+                 wait_timeout: float = 5.0, coalescer=None):
+        for level in [durability] + list((durability_by_type or {}).values()):
+            if level not in (DURABILITY_ASYNC, DURABILITY_JOURNAL, DURABILITY_COMMIT):
+                raise ValueError(f"Unknown durability: {level}")
+        self.db = db
+        self.journal = journal
+        # Off when the database numbers events at write time (a shared sequence)
+        self.number_events = number_events
+        # What submit() waits for, by default and per activity type
+        self.durability = durability
+        self.durability_by_type = dict(durability_by_type or {})
+        self.wait_timeout = wait_timeout
+        # Holds repeats of periodic events and hands back one per window
+        self.coalescer = coalescer
+        # Held while numbering and queueing, so both share one order
+        self._submit_lock = threading.Lock()
+        self._listeners = []
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        # Submitted events wait in the inbox for the sink, then in the queue for the writer
+        self._inbox = queue.Queue(maxsize=max_queue_size)
+        self._queue = queue.Queue(maxsize=max_queue_size)
+
+        # Events submitted, past the journal and written so far; an event's ticket
+        # is its place in that order, so waiting for it means waiting for a count
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._journal_settled = 0
+        self._written = 0
+        # Of the events past the journal, how many are in it and which ticket
+        # ranges are not (kept for the submitters waiting on them)
+        self._journaled = 0
+        self._unjournaled = collections.deque(maxlen=1000)
+        self.journal_failures = 0
+        self.failed = 0
+        self.batches = 0
+        self.wait_timeouts = 0
+
+        self._closed = False
+        self._sink_thread = threading.Thread(target=self._run_sink, name="activity-sink", daemon=True)
+        self._thread = threading.Thread(target=self._run, name="activity-ingest", daemon=True)
+        self._sink_thread.start()
+        self._thread.start()
+        if coalescer is not None:
+            coalescer.start(self._enqueue)
+        atexit.register(self.close)
+
+    def add_listener(self, callback: Callable[[Dict], None]):
+        """Call ``callback(event)`` for every accepted event, in sequence order.
+
+        Callbacks run on the sink thread once the event is journaled; a
+        slow one delays the others and the database writer.
+        """
+        self._listeners.append(callback)
+
+    def submit(self, timestamp: str, session_id: str, activity: str, file_name: str,
+               ip_address: str = None, user_agent: str = None,
+               additional_info: Dict = None, timeout: float = None,
+               durability: str = None) -> Optional[int]:
+        """Hand an activity to the pipeline and return its sequence number.
+
+        Blocks when the queue is full (backpressure) and returns None if it
+        stays full for longer than ``timeout`` seconds. Then waits as the
+        event's durability says (given, else by activity type, else the
+        default), for at most wait_timeout seconds; a 'journal' event the
+        journal failed to take waits for its database commit instead.
+        Without number_events the number is only known once written, and 0
+        is returned instead, as it is for an asynchronous repeat the
+        coalescer holds back.
+        Raises ValueError if ``timestamp`` is not an ISO timestamp, so a
+        bad event never reaches (and fails) a writer batch.
+        """
+        if self._closed:
+            raise RuntimeError("activity ingest queue is closed")
+        parse_timestamps([timestamp])
+        durability = durability or self.durability_by_type.get(activity, self.durability)
+
+        event = {
+            'timestamp': timestamp,
+            'session_id': session_id,
+            'activity': activity,
+            'file_name': file_name,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'additional_info': additional_info
+        }
+        if durability == DURABILITY_ASYNC and self.coalescer is not None and self.coalescer.offer(event):
+            return 0
+
+        ticket = self._enqueue(event, timeout)
+        if ticket is None:
+            return None
+        if durability != DURABILITY_ASYNC:
+            deadline = time.monotonic() + self.wait_timeout
+            reached = self._wait('_journal_settled' if durability == DURABILITY_JOURNAL else '_written',
+                                 ticket, self.wait_timeout)
+            if reached and durability == DURABILITY_JOURNAL and self._journal_failed(ticket):
+                print(f"⚠️  {activity} could not be journaled; waiting for its database commit")
+                reached = self._wait('_written', ticket, max(0.0, deadline - time.monotonic()))
+            if not reached:
+                self.wait_timeouts += 1
+                print(f"⚠️  {activity} still queued after waiting {self.wait_timeout}s for {durability}")
+        return event.get('seq', 0)
+
+    def _enqueue(self, event: Dict, timeout: float = None) -> Optional[int]:
+        """Number ``event`` and put it in the inbox; returns its ticket, or None if the inbox stayed full"""
+        # Tickets follow queue order, so the counters below tell when this event is through
+        with self._submit_lock:
+            with self._cond:
+                self._submitted += 1
+                ticket = self._submitted
+            if self.number_events:
+                event['seq'] = self.db.allocate_seq()
+            try:
+                self._inbox.put(event, timeout=timeout)
+            except queue.Full:
+                if self.number_events:
+                    self.db.release_seqs([event['seq']])
+                with self._cond:
+                    self._submitted -= 1
+                    self._cond.notify_all()
+                return None
+        return ticket
+
+    def _journal_failed(self, ticket: int) -> bool:
+        with self._cond:
+            return any(first <= ticket <= last for first, last in self._unjournaled)
+
+    def _wait(self, counter: str, ticket: int, timeout: float = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while getattr(self, counter) < ticket:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def pending(self) -> int:
+        """Number of events accepted but not yet written"""
+        with self._cond:
+            return self._submitted - self._written
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until every event submitted so far has been written"""
+        with self._cond:
+            target = self._submitted
+        return self._wait('_written', target, timeout)
+
+    def close(self, timeout: float = 10.0):
+        """Flush outstanding events and stop the sink and writer threads"""
+        if self._closed:
+            return
+        self._closed = True
+        if self.coalescer is not None:
+            self.coalescer.close()
+        self._inbox.put(_STOP)
+        self._sink_thread.join(timeout)
+        self._thread.join(timeout)
+
+    def _run_sink(self):
+        while True:
+            events = [self._inbox.get()]
+            while events[-1] is not _STOP and len(events) < self.batch_size:
+                try:
+                    events.append(self._inbox.get_nowait())
+                except queue.Empty:
+                    break
+            stop = events[-1] is _STOP
+            if stop:
+                events.pop()
+            if events:
+                self._sink(events)
+            if stop:
+                self._queue.put(_STOP)
+                return
+
+    def _sink(self, events: List[Dict]):
+        """Journal a group of events, hand them to the listeners and queue them for the writer"""
+        positions = [None] * len(events)
+        journaled = True
+        if self.journal is not None:
+            try:
+                for i, event in enumerate(events):
+                    positions[i] = self.journal.append(event, wait=False)
+                self.journal.wait_durable()
+            except Exception as e:
+                # Still written to the database, but a crash before then loses them
+                journaled = False
+                print(f"Error journaling {len(events)} activities: {e}")
+        with self._cond:
+            first = self._journal_settled + 1
+            self._journal_settled += len(events)
+            if journaled:
+                self._journaled += len(events)
+            else:
+                self.journal_failures += len(events)
+                self._unjournaled.append((first, self._journal_settled))
+            self._cond.notify_all()
+
+        for event in events:
+            for listener in self._listeners:
+                try:
+                    listener(event)
+                except Exception as e:
+                    print(f"Error in activity listener: {e}")
+        for event, position in zip(events, positions):
+            self._queue.put((event, position))
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    event = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if event is _STOP:
+                    stop = True
+                    break
+                batch.append(event)
+
+            self._write_batch(batch)
+            if stop:
+                return
+
+    def _write_batch(self, batch):
+        events = [event for event, _ in batch]
+        written = []
+        try:
+            # One transaction per month the batch touches
+            self.db.add_activities(events, chunk_size=len(events), written=written)
+        except Exception as e:
+            print(f"Error writing activity batch of {len(events)}: {e}")
+            # Retry one by one so a single bad event does not drop the batch;
+            # months that committed before the failure are not written again
+            committed = {id(event) for event in written}
+            for event in events:
+                if id(event) in committed:
+                    continue
+                try:
+                    self.db.add_activities([event])
+                except Exception as event_error:
+                    self.failed += 1
+                    if event.get('seq') is not None:
+                        self.db.release_seqs([event['seq']])
+                    print(f"Dropped activity {event.get('activity')}: {event_error}")
+
+        position = batch[-1][1]
+        if position is not None:
+            try:
+                self.db.save_journal_checkpoint(self.journal.directory, position)
+            except Exception as e:
+                print(f"Error saving journal checkpoint: {e}")
+
+        with self._cond:
+            self.batches += 1
+            self._written += len(batch)
+            self._cond.notify_all()
+
+
+# Fields of a submitted event, i.e. what listeners receive
+EVENT_FIELDS = ('timestamp', 'session_id', 'activity', 'file_name', 'ip_address',
+                'user_agent', 'additional_info', 'seq')
+
+
+class ActivityTailer:
+    """Feeds listeners from the database's shared sequence.
+
+    Each server process only submits its own events, but every process's
+    recent buffer and stream should see all of them. The tailer polls for
+    activities above the high-water mark and passes them to the listeners
+    in sequence order, shaped like submitted events. It starts
+    ``backfill`` events back, so a new process's buffer is not empty.
+    """
+
+    def __init__(self, db, poll_interval_ms: int = 250, batch_size: int = 1000, backfill: int = 0):
+        self.db = db
+        self.poll_interval = poll_interval_ms / 1000.0
+        self.batch_size = batch_size
+        self.last_seq = max(0, db.high_water - backfill)
+        self.delivered = 0
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_listener(self, callback: Callable[[Dict], None]):
+        """Call ``callback(event)`` for every new activity, in sequence order"""
+        self._listeners.append(callback)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="activity-tailer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def poll(self) -> int:
+        """Deliver everything written since the last poll; returns how many"""
+        delivered = 0
+        while True:
+            delta = self.db.get_activities_since(self.last_seq, limit=self.batch_size)
+            for activity in delta['activities']:
+                event = {field: activity.get(field) for field in EVENT_FIELDS}
+                for listener in self._listeners:
+                    listener(event)
+            delivered += len(delta['activities'])
+            # reset: the database was replaced under us, so follow its numbering
+            self.last_seq = delta['high_water']
+            if len(delta['activities']) < self.batch_size:
+                break
+        self.delivered += delivered
+        return delivered
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error tailing activities: {e}")
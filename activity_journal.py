@@ -0,0 +1,220 @@
+"""
+Append-only activity journal
+Events are appended as JSON lines to size-rotated segment files, so logging
+an event costs one small write instead of rewriting the whole log. A reader
+replays or tails the segments from any saved position.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# fsync policies: every append waits for an fsync (grouped across threads),
+# a background fsync every fsync_interval_ms, or leave flushing to the OS
+FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_OS = 'always', 'interval', 'os'
+
+_SEGMENT_RE = re.compile(r'^activity-(\d{8})\.jsonl$')
+
+# (segment file name, byte offset) - where reading resumes
+JournalPosition = Tuple[str, int]
+
+
+def segment_name(sequence: int) -> str:
+    return f"activity-{sequence:08d}.jsonl"
+
+
+def list_segments(directory: str) -> List[str]:
+    """Segment file names in the journal directory, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if _SEGMENT_RE.match(name))
+
+
+class ActivityJournal:
+    """Writer for a directory of JSON-lines segments.
+
+    Every instance starts a fresh segment, so a line torn by a crash is
+    never appended to. Segments roll over once they reach segment_bytes.
+    """
+
+    def __init__(self, directory: str = "activity_journal", segment_bytes: int = 64 * 1024 * 1024,
+                 fsync: str = FSYNC_INTERVAL, fsync_interval_ms: int = 50):
+        if fsync not in (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_OS):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval_ms / 1000.0
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._appended = 0  # bytes appended by this instance, across segments
+        self._synced = 0
+        self.appends = 0
+        self.fsyncs = 0
+
+        existing = list_segments(directory)
+        self._sequence = int(_SEGMENT_RE.match(existing[-1]).group(1)) if existing else 0
+        self._file = None
+        self._size = 0
+        self._open_next_segment()
+
+        self._closed = False
+        self._flusher = None
+        if fsync == FSYNC_INTERVAL:
+            self._stop = threading.Event()
+            self._flusher = threading.Thread(target=self._flush_periodically,
+                                             name="activity-journal-fsync", daemon=True)
+            self._flusher.start()
+
+    @property
+    def segment(self) -> str:
+        """Name of the segment currently being written"""
+        return segment_name(self._sequence)
+
+    def append(self, event: Dict, wait: bool = True) -> JournalPosition:
+        """Append one event and return the position just after it.
+
+        With the 'always' policy this waits for the event to be fsynced,
+        unless ``wait`` is False and the caller calls wait_durable() later.
+        """
+        line = (json.dumps(event, separators=(',', ':'), default=str) + '\n').encode('utf-8')
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("activity journal is closed")
+            if self._size and self._size + len(line) > self.segment_bytes:
+                self._seal_segment()
+                self._open_next_segment()
+            view = memoryview(line)
+            while view:
+                view = view[self._file.write(view):]
+            self._size += len(line)
+            self._appended += len(line)
+            self.appends += 1
+            position = (self.segment, self._size)
+            target = self._appended
+
+        if wait and self.fsync == FSYNC_ALWAYS:
+            self._sync(target)
+        return position
+
+    def wait_durable(self):
+        """Under the 'always' policy, block until every append so far is fsynced"""
+        if self.fsync == FSYNC_ALWAYS:
+            self._sync(self._appended)
+
+    def _sync(self, target: int):
+        """fsync until at least ``target`` bytes are durable.
+
+        Threads arriving while an fsync runs wait for it and are usually
+        covered by it, so concurrent appends share one fsync.
+        """
+        with self._sync_lock:
+            if self._synced >= target:
+                return
+            with self._lock:
+                if self._file is None:
+                    return
+                fd = os.dup(self._file.fileno())
+                appended = self._appended
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._synced = appended
+            self.fsyncs += 1
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.fsync_interval):
+            if self._appended > self._synced:
+                self._sync(self._appended)
+
+    def _open_next_segment(self):
+        self._sequence += 1
+        self._file = open(os.path.join(self.directory, self.segment), 'ab', buffering=0)
+        self._size = 0
+
+    def _seal_segment(self):
+        if self.fsync != FSYNC_OS:
+            os.fsync(self._file.fileno())
+            self._synced = self._appended
+        self._file.close()
+        self._file = None
+
+    def prune(self, before_segment: str) -> int:
+        """Delete sealed segments older than ``before_segment``; returns how many"""
+        removed = 0
+        for name in list_segments(self.directory):
+            if name >= before_segment or name >= self.segment:
+                break
+            os.remove(os.path.join(self.directory, name))
+            removed += 1
+        return removed
+
+    def close(self):
+        """Make everything durable and close the current segment"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._flusher:
+            self._stop.set()
+            self._flusher.join()
+        with self._lock:
+            self._seal_segment()
+
+
+class JournalReader:
+    """Replays or tails the segments of an activity journal"""
+
+    def __init__(self, directory: str = "activity_journal"):
+        self.directory = directory
+        self.skipped = 0
+
+    def replay(self, position: Optional[JournalPosition] = None) -> Iterator[Tuple[Dict, JournalPosition]]:
+        """Yield (event, position after it) for every complete line after ``position``.
+
+        A position whose segment no longer exists, or is shorter than the
+        offset, belongs to a journal that was reset; replay starts over.
+        """
+        segments = list_segments(self.directory)
+        if position is not None:
+            segment, offset = position
+            path = os.path.join(self.directory, segment)
+            if segment not in segments or os.path.getsize(path) < offset:
+                position = None
+        start_segment, start_offset = position or (None, 0)
+
+        for index, segment in enumerate(segments):
+            if start_segment is not None and segment < start_segment:
+                continue
+            offset = start_offset if segment == start_segment else 0
+            is_last = index == len(segments) - 1
+            with open(os.path.join(self.directory, segment), 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # Torn by a crash, or still being written to
+                        if is_last:
+                            return
+                        self.skipped += 1
+                        break
+                    offset += len(line)
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        self.skipped += 1
+                        continue
+                    yield event, (segment, offset)
+
+    def tail(self, position: Optional[JournalPosition] = None, poll_interval: float = 0.2,
+             stop: threading.Event = None) -> Iterator[Tuple[Dict, JournalPosition]]:
+        """Replay from ``position``, then keep following new appends until ``stop`` is set"""
+        while stop is None or not stop.is_set():
+            for event, position in self.replay(position):
+                yield event, position
+            time.sleep(poll_interval)
@@ -0,0 +1,217 @@
+"""
+Monthly activity partitions
+Each calendar month of activities lives in its own SQLite file next to the
+main database. A catalog in the main database records which months exist,
+the time range each one holds and whether it has been archived. Cold months
+are compressed into read-only archives that are unpacked on demand.
+"""
+
+import lzma
+import os
+import shutil
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+# Partitions are named by the calendar month of created_date
+MONTH_FORMAT = '%Y-%m'
+
+# Row ids are <months since 1970-01> << ID_SHIFT | sequence within the month,
+# so every partition allocates its own ids without colliding with the others
+ID_SHIFT = 40
+
+LIVE, ARCHIVED = 'live', 'archived'
+
+
+def month_key(created_date: str) -> str:
+    """Partition key ('YYYY-MM') of a 'YYYY-MM-DD...' date"""
+    return created_date[:7]
+
+
+def month_id_base(month: str) -> int:
+    """Largest id below every row id of a month's partition"""
+    year, number = int(month[:4]), int(month[5:7])
+    return ((year - 1970) * 12 + number - 1) << ID_SHIFT
+
+
+def shift_month(month: str, delta: int) -> str:
+    """The month ``delta`` months after ``month`` (before, if negative)"""
+    index = int(month[:4]) * 12 + int(month[5:7]) - 1 + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+class RetentionPolicy:
+    """How long activity partitions stay live, archived and kept at all.
+
+    Months older than ``archive_after_months`` (counting back from the
+    current month) are compressed into read-only archives; archives older
+    than ``delete_after_months`` are removed. ``None`` disables that step.
+    Rollups are kept for deleted months.
+    """
+
+    def __init__(self, archive_after_months: Optional[int] = None,
+                 delete_after_months: Optional[int] = None, compression_preset: int = 6):
+        if (archive_after_months is not None and delete_after_months is not None
+                and delete_after_months < archive_after_months):
+            raise ValueError("delete_after_months must not be shorter than archive_after_months")
+        self.archive_after_months = archive_after_months
+        self.delete_after_months = delete_after_months
+        self.compression_preset = compression_preset
+
+    def archive_before(self, today: date = None) -> Optional[str]:
+        """Months before this one should be archived"""
+        if self.archive_after_months is None:
+            return None
+        return shift_month((today or date.today()).strftime(MONTH_FORMAT), -self.archive_after_months)
+
+    def delete_before(self, today: date = None) -> Optional[str]:
+        """Months before this one should be deleted"""
+        if self.delete_after_months is None:
+            return None
+        return shift_month((today or date.today()).strftime(MONTH_FORMAT), -self.delete_after_months)
+
+
+class PartitionCatalog:
+    """Catalog of monthly partition files, kept in the main database"""
+
+    def __init__(self, pool, db_path: str):
+        self.pool = pool
+        root, ext = os.path.splitext(os.path.abspath(db_path))
+        self.directory = os.path.dirname(root)
+        self._root, self._ext = os.path.basename(root), ext or '.db'
+        self.cache_directory = os.path.join(self.directory, f"{self._root}_archive_cache")
+
+    def init_table(self, cursor):
+        """Create the catalog of monthly partitions"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS activity_partitions (
+                month TEXT PRIMARY KEY,
+                file_name TEXT NOT NULL,
+                state TEXT NOT NULL,
+                min_ts_us INTEGER,
+                max_ts_us INTEGER,
+                archived_at TEXT,
+                max_seq INTEGER
+            )
+        ''')
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(activity_partitions)")}
+        if 'max_seq' not in columns:
+            cursor.execute("ALTER TABLE activity_partitions ADD COLUMN max_seq INTEGER")
+
+    def live_path(self, month: str) -> str:
+        return os.path.join(self.directory, f"{self._root}.{month}{self._ext}")
+
+    def archive_path(self, month: str) -> str:
+        return self.live_path(month) + '.xz'
+
+    def cache_path(self, month: str) -> str:
+        return os.path.join(self.cache_directory, os.path.basename(self.live_path(month)))
+
+    def get(self, month: str) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT month, file_name, state, min_ts_us, max_ts_us, max_seq "
+                "FROM activity_partitions WHERE month = ?",
+                (month,)
+            ).fetchone()
+        return self._entry(row) if row else None
+
+    def entries(self, start_month: str = None, end_month: str = None,
+                include_archived: bool = False) -> List[Dict]:
+        """Catalog entries overlapping [start_month, end_month], newest first"""
+        query = ("SELECT month, file_name, state, min_ts_us, max_ts_us, max_seq "
+                 "FROM activity_partitions WHERE 1=1")
+        params = []
+        if start_month:
+            query += " AND month >= ?"
+            params.append(start_month)
+        if end_month:
+            query += " AND month <= ?"
+            params.append(end_month)
+        if not include_archived:
+            query += " AND state = ?"
+            params.append(LIVE)
+        query += " ORDER BY month DESC"
+        with self.pool.connection() as conn:
+            return [self._entry(row) for row in conn.execute(query, params).fetchall()]
+
+    @staticmethod
+    def _entry(row) -> Dict:
+        month, file_name, state, min_ts_us, max_ts_us, max_seq = row
+        return {'month': month, 'file_name': file_name, 'state': state,
+                'min_ts_us': min_ts_us, 'max_ts_us': max_ts_us, 'max_seq': max_seq}
+
+    def max_seq(self) -> int:
+        """Highest sequence number any partition has recorded (0 if none)"""
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COALESCE(MAX(max_seq), 0) FROM activity_partitions").fetchone()[0]
+
+    def register(self, month: str):
+        """Record a new live partition"""
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO activity_partitions (month, file_name, state) VALUES (?, ?, ?)",
+                (month, os.path.basename(self.live_path(month)), LIVE)
+            )
+
+    def set_range(self, month: str, min_ts_us: int, max_ts_us: int, max_seq: int = None):
+        """Record the time range and highest sequence number of the rows a partition holds"""
+        with self.pool.connection() as conn:
+            conn.execute(
+                "UPDATE activity_partitions SET min_ts_us = ?, max_ts_us = ?, "
+                "max_seq = COALESCE(?, max_seq) WHERE month = ?",
+                (min_ts_us, max_ts_us, max_seq, month)
+            )
+
+    def archive(self, month: str, preset: int = 6):
+        """Compress a closed live partition into a read-only archive"""
+        live, archive = self.live_path(month), self.archive_path(month)
+        partial = archive + '.partial'
+        with open(live, 'rb') as src, lzma.open(partial, 'wb', preset=preset) as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        os.replace(partial, archive)
+        with self.pool.connection() as conn:
+            conn.execute(
+                "UPDATE activity_partitions SET state = ?, file_name = ?, archived_at = ? WHERE month = ?",
+                (ARCHIVED, os.path.basename(archive), datetime.now().isoformat(), month)
+            )
+        self._remove_database_files(live)
+
+    def extract(self, month: str) -> str:
+        """Unpack an archive into the cache directory and return its path"""
+        archive, target = self.archive_path(month), self.cache_path(month)
+        if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(archive):
+            return target
+        os.makedirs(self.cache_directory, exist_ok=True)
+        partial = target + '.partial'
+        with lzma.open(archive, 'rb') as src, open(partial, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        os.replace(partial, target)
+        return target
+
+    def restore(self, month: str):
+        """Turn an archived partition back into a live, writable one"""
+        archive, live = self.archive_path(month), self.live_path(month)
+        partial = live + '.partial'
+        with lzma.open(archive, 'rb') as src, open(partial, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        os.replace(partial, live)
+        with self.pool.connection() as conn:
+            conn.execute(
+                "UPDATE activity_partitions SET state = ?, file_name = ?, archived_at = NULL WHERE month = ?",
+                (LIVE, os.path.basename(live), month)
+            )
+        os.remove(archive)
+        self._remove_database_files(self.cache_path(month))
+
+    def delete(self, month: str):
+        """Drop a partition and its files"""
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM activity_partitions WHERE month = ?", (month,))
+        for path in (self.archive_path(month), self.live_path(month), self.cache_path(month)):
+            self._remove_database_files(path)
+
+    @staticmethod
+    def _remove_database_files(path: str):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
@@ -0,0 +1,271 @@
+"""
+Hourly and daily activity rollups
+Pre-aggregated counts keyed by (bucket, file_name, category, threat_level)
+with a mergeable distinct-session sketch, so dashboards read a few thousand
+rollup rows instead of millions of raw activities.
+"""
+
+import hashlib
+import math
+from typing import Dict, List, Optional, Sequence
+
+# Distinct-session sketch: exact hash set while small, HyperLogLog when large
+SKETCH_PRECISION = 10
+SKETCH_REGISTERS = 1 << SKETCH_PRECISION
+SPARSE_LIMIT = 128
+_SPARSE, _DENSE = b'S', b'D'
+
+ROLLUP_TABLES = {
+    'hour': ('activity_rollup_hourly', "created_date || 'T' || substr(created_time, 1, 2)"),
+    'day': ('activity_rollup_daily', "created_date"),
+}
+
+# Threat level recorded by the app (threat_level) or by incident sources (severity)
+_THREAT_LEVEL_SQL = (
+    "COALESCE(CASE WHEN json_valid(additional_info) THEN COALESCE("
+    "json_extract(additional_info, '$.threat_level'), "
+    "json_extract(additional_info, '$.severity')) END, 'NONE')"
+)
+
+# Fold at most this many new activities per statement during catch-up
+CATCH_UP_SLICE = 50000
+
+
+def _hash64(value) -> int:
+    digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def _dense_from_hashes(hashes) -> bytearray:
+    registers = bytearray(SKETCH_REGISTERS)
+    width = 64 - SKETCH_PRECISION
+    for h in hashes:
+        index = h >> width
+        rank = width - (h & ((1 << width) - 1)).bit_length() + 1
+        if rank > registers[index]:
+            registers[index] = rank
+    return registers
+
+
+def _decode(sketch: Optional[bytes]):
+    """Return ('sparse', set of hashes) or ('dense', registers)"""
+    if not sketch:
+        return 'sparse', set()
+    body = sketch[1:]
+    if sketch[:1] == _SPARSE:
+        return 'sparse', {int.from_bytes(body[i:i + 8], 'big') for i in range(0, len(body), 8)}
+    return 'dense', bytearray(body)
+
+
+def _encode_hashes(hashes) -> bytes:
+    if len(hashes) <= SPARSE_LIMIT:
+        return _SPARSE + b''.join(h.to_bytes(8, 'big') for h in sorted(hashes))
+    return _DENSE + bytes(_dense_from_hashes(hashes))
+
+
+def sketch_merge(a: Optional[bytes], b: Optional[bytes]) -> bytes:
+    """Union of two session sketches"""
+    kind_a, data_a = _decode(a)
+    kind_b, data_b = _decode(b)
+    if kind_a == 'sparse' and kind_b == 'sparse':
+        return _encode_hashes(data_a | data_b)
+    if kind_a == 'sparse':
+        data_a = _dense_from_hashes(data_a)
+    if kind_b == 'sparse':
+        data_b = _dense_from_hashes(data_b)
+    return _DENSE + bytes(max(x, y) for x, y in zip(data_a, data_b))
+
+
+def sketch_count(sketch: Optional[bytes]) -> int:
+    """Estimated number of distinct sessions in a sketch"""
+    kind, data = _decode(sketch)
+    if kind == 'sparse':
+        return len(data)
+    m = SKETCH_REGISTERS
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / sum(2.0 ** -r for r in data)
+    zeros = data.count(0)
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * math.log(m / zeros)  # linear counting for small ranges
+    return int(round(estimate))
+
+
+class _SketchAggregate:
+    """SQL aggregate hll_sketch(value): sketch of the distinct values"""
+
+    def __init__(self):
+        self.hashes = set()
+
+    def step(self, value):
+        if value is not None:
+            self.hashes.add(_hash64(value))
+
+    def finalize(self):
+        return _encode_hashes(self.hashes)
+
+
+class _UnionAggregate:
+    """SQL aggregate hll_union(sketch): union of sketches"""
+
+    def __init__(self):
+        self.sketch = None
+
+    def step(self, sketch):
+        if sketch is not None:
+            self.sketch = sketch_merge(self.sketch, sketch)
+
+    def finalize(self):
+        return self.sketch
+
+
+def register_sketch_functions(conn):
+    """Make the sketch SQL functions available on a connection"""
+    conn.create_aggregate('hll_sketch', 1, _SketchAggregate)
+    conn.create_aggregate('hll_union', 1, _UnionAggregate)
+    conn.create_function('hll_merge', 2, sketch_merge, deterministic=True)
+    conn.create_function('hll_count', 1, sketch_count, deterministic=True)
+
+
+class ActivityRollups:
+    """Rollups in the main database, folded in from every activity partition.
+
+    ``sources`` returns (name, pool) for each partition that can still
+    receive rows; rollup_state keeps a high-water mark per partition.
+    """
+
+    def __init__(self, pool, sources):
+        self.pool = pool
+        self.sources = sources
+        self.version = 0  # bumped whenever the rollups change, for cache validation
+
+    def init_tables(self, cursor):
+        """Create rollup tables and the high-water marks they are built up to"""
+        for table, _ in ROLLUP_TABLES.values():
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    bucket TEXT NOT NULL,
+                    file_name TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    threat_level TEXT NOT NULL,
+                    events INTEGER NOT NULL,
+                    sessions BLOB,
+                    PRIMARY KEY (bucket, file_name, category, threat_level)
+                ) WITHOUT ROWID
+            ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rollup_state (
+                name TEXT PRIMARY KEY,
+                high_water INTEGER NOT NULL
+            )
+        ''')
+
+    def reset(self, conn):
+        """Empty the rollups so they are rebuilt from the partitions"""
+        for table, _ in ROLLUP_TABLES.values():
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute("DELETE FROM rollup_state")
+        self.version += 1
+
+    def forget(self, name: str):
+        """Drop the high-water mark of a deleted partition; its rollups stay"""
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM rollup_state WHERE name = ?", (name,))
+
+    def fold(self, name: str, source_pool) -> int:
+        """Fold a partition's activities above its high-water mark into the rollups.
+
+        The main database's write lock is held from reading the mark to
+        advancing it, so concurrent folds never count a row twice. Returns
+        the number of activities folded.
+        """
+        folded = 0
+        with self.pool.connection() as conn:
+            # A write first, so the lock is taken before the mark is read
+            conn.execute("INSERT OR IGNORE INTO rollup_state (name, high_water) VALUES (?, 0)", (name,))
+            high_water = conn.execute(
+                "SELECT high_water FROM rollup_state WHERE name = ?", (name,)).fetchone()[0]
+            with source_pool.connection() as source:
+                latest = source.execute("SELECT COALESCE(MAX(id), 0) FROM activity_log").fetchone()[0]
+                while high_water < latest:
+                    row = source.execute(
+                        "SELECT id FROM activity_log WHERE id > ? ORDER BY id LIMIT 1 OFFSET ?",
+                        (high_water, CATCH_UP_SLICE - 1)
+                    ).fetchone()
+                    upper = row[0] if row else latest
+                    for table, bucket_sql in ROLLUP_TABLES.values():
+                        rows = source.execute(f'''
+                            SELECT {bucket_sql}, file_name, COALESCE(category, 'other'), {_THREAT_LEVEL_SQL},
+                                   COUNT(*), hll_sketch(session_id)
+                            FROM activities
+                            WHERE id > ? AND id <= ?
+                            GROUP BY 1, 2, 3, 4
+                        ''', (high_water, upper)).fetchall()
+                        conn.executemany(f'''
+                            INSERT INTO {table} (bucket, file_name, category, threat_level, events, sessions)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                            ON CONFLICT (bucket, file_name, category, threat_level) DO UPDATE SET
+                                events = events + excluded.events,
+                                sessions = hll_merge(sessions, excluded.sessions)
+                        ''', rows)
+                    folded += source.execute(
+                        "SELECT COUNT(*) FROM activity_log WHERE id > ? AND id <= ?", (high_water, upper)
+                    ).fetchone()[0]
+                    high_water = upper
+            conn.execute("UPDATE rollup_state SET high_water = ? WHERE name = ?", (high_water, name))
+        if folded:
+            self.version += 1
+        return folded
+
+    def catch_up(self) -> int:
+        """Fold every partition's new activities; returns how many were folded"""
+        return sum(self.fold(name, pool) for name, pool in self.sources())
+
+    def is_current(self) -> bool:
+        """True if every activity has been folded into the rollups"""
+        with self.pool.connection() as conn:
+            marks = dict(conn.execute("SELECT name, high_water FROM rollup_state").fetchall())
+        for name, pool in self.sources():
+            with pool.connection() as source:
+                latest = source.execute("SELECT COALESCE(MAX(id), 0) FROM activity_log").fetchone()[0]
+            if latest > marks.get(name, 0):
+                return False
+        return True
+
+    def summarize(self, granularity: str, start_bucket: str = None, end_bucket: str = None,
+                  group_by: Sequence[str] = (), category: str = None,
+                  threat_level: str = None) -> List[Dict]:
+        """Aggregate rollup rows between two inclusive buckets.
+
+        Buckets are 'YYYY-MM-DD' for granularity 'day' and 'YYYY-MM-DDTHH'
+        for 'hour'. Each result has the group_by columns plus events,
+        unique_sessions and last_bucket.
+        """
+        table = ROLLUP_TABLES[granularity][0]
+        allowed = ('bucket', 'file_name', 'category', 'threat_level')
+        for column in group_by:
+            if column not in allowed:
+                raise ValueError(f"Cannot group rollups by {column}")
+
+        if not self.is_current():
+            self.catch_up()
+
+        select = list(group_by) + ['COALESCE(SUM(events), 0)', 'hll_count(hll_union(sessions))', 'MAX(bucket)']
+        query = f"SELECT {', '.join(select)} FROM {table} WHERE 1=1"
+        params = []
+        for clause, value in (("bucket >= ?", start_bucket), ("bucket <= ?", end_bucket),
+                              ("category = ?", category), ("threat_level = ?", threat_level)):
+            if value is not None:
+                query += f" AND {clause}"
+                params.append(value)
+        if group_by:
+            query += f" GROUP BY {', '.join(group_by)}"
+
+        with self.pool.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        results = []
+        for row in rows:
+            result = dict(zip(group_by, row))
+            result['events'], result['unique_sessions'], result['last_bucket'] = row[len(group_by):]
+            results.append(result)
+        return results
@@ -0,0 +1,181 @@
+"""
+Activity event stream
+Fans activity events out to Server-Sent Events subscribers. Each subscriber
+has its own bounded buffer that drops its oldest events when a slow client
+falls behind, and an optional topic filter on file, session and severity.
+A reconnecting client resumes after its Last-Event-ID from a history source.
+"""
+
+import json
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def event_severity(event: Dict) -> str:
+    """Severity of an activity: its threat level or severity, else INFO"""
+    info = event.get('additional_info') or {}
+    if not isinstance(info, dict):
+        return 'INFO'
+    return str(info.get('threat_level') or info.get('severity') or 'INFO').upper()
+
+
+def format_sse(data, event: str = None, event_id=None) -> str:
+    """One Server-Sent Events message carrying ``data`` as JSON"""
+    message = ''
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    if event:
+        message += f"event: {event}\n"
+    return message + f"data: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+
+
+class TooManySubscribers(Exception):
+    """The broadcaster is at max_subscribers; the client should poll instead"""
+
+
+class TopicFilter:
+    """Which events a subscriber wants; an empty set of values matches everything"""
+
+    def __init__(self, files: Iterable[str] = None, sessions: Iterable[str] = None,
+                 severities: Iterable[str] = None):
+        self.files = frozenset(files or ())
+        self.sessions = frozenset(sessions or ())
+        self.severities = frozenset(severity.upper() for severity in severities or ())
+
+    def matches(self, event: Dict) -> bool:
+        if self.files and event.get('file_name') not in self.files:
+            return False
+        if self.sessions and event.get('session_id') not in self.sessions:
+            return False
+        if self.severities and event_severity(event) not in self.severities:
+            return False
+        return True
+
+
+class Subscription:
+    """One subscriber's view of the stream.
+
+    Live events wait in a buffer of ``buffer_size``; when it is full the
+    oldest is dropped and counted. Events resumed from history come first
+    and are never dropped.
+    """
+
+    def __init__(self, broadcaster, topics: TopicFilter, buffer_size: int,
+                 last_seq: Optional[int] = None):
+        self._broadcaster = broadcaster
+        self.topics = topics
+        self._backlog = deque()
+        self._events = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        self.last_seq = last_seq
+        self.reset = False  # history could not cover last_seq; the client should reload
+        self.dropped = 0
+        self.closed = False
+
+    def _offer(self, event: Dict):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout: float = None) -> Tuple[List[Dict], int]:
+        """Wait up to ``timeout`` seconds for events.
+
+        Returns the events in sequence order and how many were dropped
+        since the last call. Both are empty once the subscription is closed.
+        """
+        with self._cond:
+            if not (self._backlog or self._events or self.closed):
+                self._cond.wait(timeout)
+            if self.closed:
+                return [], 0
+            pending = list(self._backlog) + list(self._events)
+            self._backlog.clear()
+            self._events.clear()
+            dropped, self.dropped = self.dropped, 0
+
+        events = []
+        for event in pending:
+            seq = event.get('seq')
+            # History and live delivery overlap around the moment of subscribing
+            if seq is not None and self.last_seq is not None and seq <= self.last_seq:
+                continue
+            events.append(event)
+            if seq is not None:
+                self.last_seq = seq
+        return events, dropped
+
+    def close(self):
+        self._broadcaster._unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class ActivityBroadcaster:
+    """Fan-out of published activities to every matching subscription.
+
+    ``history(since_seq)`` returns the events after since_seq, oldest
+    first, or None if it no longer holds all of them; it is used to resume
+    a subscriber from its Last-Event-ID.
+    """
+
+    def __init__(self, buffer_size: int = 256, max_subscribers: int = 100,
+                 history: Callable[[int], Optional[List[Dict]]] = None):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.history = history
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def publish(self, event: Dict):
+        """Hand an event to every subscription whose topics match it"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for subscription in subscribers:
+            if subscription.topics.matches(event):
+                subscription._offer(event)
+
+    def subscribe(self, topics: TopicFilter = None, last_event_id: int = None) -> Subscription:
+        """Start a subscription, resuming after ``last_event_id`` if given"""
+        subscription = Subscription(self, topics or TopicFilter(), self.buffer_size, last_event_id)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers(f"{self.max_subscribers} stream subscribers already connected")
+            self._subscribers.append(subscription)
+
+        # Registered first, so nothing published while reading history is missed
+        if last_event_id is not None and self.history is not None:
+            backlog = self.history(last_event_id)
+            with subscription._cond:
+                if backlog is None:
+                    subscription.reset = True
+                    subscription.last_seq = None
+                else:
+                    subscription._backlog.extend(e for e in backlog if subscription.topics.matches(e))
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def close(self):
+        """End every subscription, e.g. at shutdown"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'max_subscribers': self.max_subscribers,
+                'buffer_size': self.buffer_size,
+                'published': self.published,
+            }
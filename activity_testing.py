@@ -0,0 +1,37 @@
+"""
+Activity Test Helpers
+Throwaway activity databases shared by the test modules
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from activity_database import ActivityDatabase
+
+
+def make_db(**kwargs):
+    """Create an ActivityDatabase in a fresh temporary directory"""
+    tmp = tempfile.mkdtemp(prefix="activity_test_")
+    db = ActivityDatabase(os.path.join(tmp, "activity_audit.db"), **kwargs)
+    db._test_dir = tmp
+    return db
+
+
+def drop_db(db):
+    db.close()
+    shutil.rmtree(db._test_dir, ignore_errors=True)
+
+
+def add_sample(db, activity="FILE_OPENED", file_name="employee_data.xlsx",
+               session_id="test_session", timestamp=None, **extra):
+    db.add_activity(
+        timestamp=timestamp or datetime.now().isoformat(),
+        session_id=session_id,
+        activity=activity,
+        file_name=file_name,
+        ip_address="127.0.0.1",
+        user_agent="pytest",
+        additional_info=extra or None
+    )
@@ -0,0 +1,143 @@
+"""
+Admission control for client-reported events
+Token buckets per session and per IP address, with a separate budget for
+each threat class, so one noisy tab cannot flood the activity pipeline.
+Classes without a budget (HIGH) are always admitted. Rejected events are
+not lost silently: they are counted and periodically summarized into
+"N events suppressed" records.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Threat class -> (events per second, burst size)
+Budgets = Dict[str, Tuple[float, float]]
+
+
+class TokenBucket:
+    """``burst`` tokens, refilled at ``rate`` per second"""
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def refill(self, now: float) -> float:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+
+class AdmissionController:
+    """Admits or sheds events by session and IP budgets per threat class.
+
+    An event is admitted only if both its session's and its IP's bucket
+    for its class hold a token; it then takes one from each. Idle buckets
+    are dropped once they would be full again, so memory follows the
+    number of active clients.
+    """
+
+    def __init__(self, session_budgets: Budgets, ip_budgets: Budgets,
+                 summary_interval: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.session_budgets = dict(session_budgets)
+        self.ip_budgets = dict(ip_budgets)
+        self.summary_interval = summary_interval
+        self._clock = clock
+        self._buckets = {}     # (scope, key, threat class) -> TokenBucket
+        self._suppressed = {}  # (session, ip, file, threat class) -> summary being built
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def admit(self, session_id: str, ip_address: str, threat_level: str, activity: str,
+              file_name: str = None) -> bool:
+        """Take a token for this event, or count it as suppressed and return False"""
+        threat_level = (threat_level or 'LOW').upper()
+        now = self._clock()
+        with self._lock:
+            buckets = [self._bucket(scope, key, threat_level, budgets, now)
+                       for scope, key, budgets in (('session', session_id, self.session_budgets),
+                                                   ('ip', ip_address, self.ip_budgets))]
+            buckets = [bucket for bucket in buckets if bucket is not None]
+            if all(bucket.refill(now) >= 1 for bucket in buckets):
+                for bucket in buckets:
+                    bucket.tokens -= 1
+                self.admitted += 1
+                return True
+
+            self.rejected += 1
+            stamp = datetime.now().isoformat()
+            summary = self._suppressed.setdefault((session_id, ip_address, file_name, threat_level), {
+                'session_id': session_id,
+                'ip_address': ip_address,
+                'file_name': file_name,
+                'threat_class': threat_level,
+                'suppressed': 0,
+                'event_types': {},
+                'first_suppressed': stamp,
+            })
+            summary['suppressed'] += 1
+            summary['event_types'][activity] = summary['event_types'].get(activity, 0) + 1
+            summary['last_suppressed'] = stamp
+            return False
+
+    def _bucket(self, scope: str, key: str, threat_level: str, budgets: Budgets,
+                now: float) -> Optional[TokenBucket]:
+        budget = budgets.get(threat_level)
+        if budget is None:
+            return None  # no budget: never shed
+        bucket = self._buckets.get((scope, key, threat_level))
+        if bucket is None:
+            bucket = self._buckets[(scope, key, threat_level)] = TokenBucket(*budget, now)
+        return bucket
+
+    def drain_suppressed(self) -> List[Dict]:
+        """Summaries of the events suppressed since the last drain, one per session, IP, file and class"""
+        now = self._clock()
+        with self._lock:
+            summaries = list(self._suppressed.values())
+            self._suppressed = {}
+            # Buckets that have refilled completely carry no state worth keeping
+            for key in [key for key, bucket in self._buckets.items() if bucket.refill(now) >= bucket.burst]:
+                del self._buckets[key]
+        return summaries
+
+    def start(self, on_summary: Callable[[Dict], None]):
+        """Every summary_interval seconds, pass each suppression summary to ``on_summary``"""
+        def run():
+            while not self._stop.wait(self.summary_interval):
+                self._emit(on_summary)
+            self._emit(on_summary)
+
+        self._thread = threading.Thread(target=run, name="admission-summaries", daemon=True)
+        self._thread.start()
+
+    def _emit(self, on_summary: Callable[[Dict], None]):
+        for summary in self.drain_suppressed():
+            try:
+                on_summary(summary)
+            except Exception as e:
+                print(f"Error recording suppressed events: {e}")
+
+    def close(self):
+        """Stop the summary thread after a last summary"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'active_buckets': len(self._buckets),
+                'pending_summaries': len(self._suppressed),
+                'session_budgets': self.session_budgets,
+                'ip_budgets': self.ip_budgets,
+            }
@@ -3,77 +3,309 @@ Secure Excel File Viewer with Activity Tracking
 This application serves Excel files through a web interface without allowing downloads
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file
+from flask import (Flask, Response, render_template, request, jsonify, session, redirect, url_for,
+                   send_file, stream_with_context)
 from flask_cors import CORS
-import pandas as pd
 import json
 import os
 from datetime import datetime, timedelta
 import uuid
 import hashlib
 import tempfile
-import openpyxl
-from cryptography.fernet import Fernet
 import base64
-from excel_protection import create_macro_protected_excel, create_encrypted_excel
-from activity_database import ActivityDatabase
+from activity_database import ActivityDatabase, parse_timestamps
+from activity_partitions import RetentionPolicy
+from activity_ingest import (DURABILITY_ASYNC, DURABILITY_COMMIT, ActivityIngestQueue,
+                             ActivityTailer)
+from activity_journal import FSYNC_INTERVAL, ActivityJournal
+from activity_buffer import RecentActivityBuffer
+from activity_coalescing import ActivityCoalescer
+from activity_stream import ActivityBroadcaster, TooManySubscribers, TopicFilter, format_sse
+from admission_control import AdmissionController
+from response_validation import ResponseValidator
 from file_monitoring import generate_monitoring_script
-from system_file_monitor import start_file_monitoring, stop_file_monitoring
+from process_lock import LeaderElection
+from file_catalog import FileCatalog
+from file_tracking import FileTrackingClient
+from jinja2.utils import htmlsafe_json_dumps
+from workbook_cache import WorkbookCache, read_sheet_head
+from workbook_metadata import WorkbookMetadataCache
+# pandas, openpyxl, excel_protection and system_file_monitor take seconds to
+# load, so the routes and functions that need them import them on first use
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-this'
 CORS(app)
 
-# Start system-level file monitoring
-print("🔍 Starting system-level file monitoring...")
-system_monitor = start_file_monitoring()
-print("✅ System file monitoring active")# Configuration
-EXCEL_FILES_DIR = 'secure_files'
-ACTIVITY_LOG_FILE = 'activity_logs.json'
+# Configuration
+EXCEL_FILES_DIR = 'secure_files'  # served workbooks, subdirectories included
+FILE_CATALOG_RECONCILE_SECONDS = 60  # full rescan behind the filesystem watcher
+ACTIVITY_LOG_FILE = 'activity_logs.json'  # legacy log, imported once at startup
+ACTIVITY_JOURNAL_DIR = 'activity_journal'
+ACTIVITY_JOURNAL_FSYNC = FSYNC_INTERVAL   # 'always', 'interval' or 'os'
+ACTIVITY_JOURNAL_FSYNC_INTERVAL_MS = 50
+# What a request waits for when it logs an activity: 'async' (nothing),
+# 'journal' (the journal append) or 'commit' (the database commit)
+ACTIVITY_DURABILITY = DURABILITY_ASYNC
+ACTIVITY_DURABILITY_BY_TYPE = {
+    'SECURE_DOWNLOAD': DURABILITY_COMMIT,
+    'DOWNLOAD_UNAUTHORIZED': DURABILITY_COMMIT,
+}
+ACTIVITY_COMMIT_TIMEOUT_SECONDS = 5
+ACTIVITY_CONSOLE_ECHO = True  # print each activity (from the background sink, not the request)
+# Admission control for client-reported events (/track, /api/file-monitoring):
+# (events per second, burst) per threat class, for each session and each IP.
+# A class without a budget (HIGH) is never shed
+ADMISSION_SESSION_BUDGETS = {'LOW': (2.0, 30), 'MEDIUM': (2.0, 30)}
+ADMISSION_IP_BUDGETS = {'LOW': (10.0, 150), 'MEDIUM': (10.0, 150)}
+ADMISSION_SUMMARY_INTERVAL_SECONDS = 60  # how often shed events are recorded as one summary
+# Periodic client-monitor events whose repeats within a window are stored as one summary row:
+# activity -> (window in seconds, event fields whose changes are kept as separate rows).
+# HIGH threats are never coalesced; an empty dict turns coalescing off
+ACTIVITY_COALESCE_RULES = {
+    'CLIENT_MONITOR_MONITORING_HEARTBEAT': (600, ()),
+    'CLIENT_MONITOR_SECURITY_CHECK': (300, ('event_data.checks.developerToolsOpen',
+                                            'event_data.checks.suspiciousExtensions.extensionsDetected')),
+    'CLIENT_MONITOR_WINDOW_FOCUS_LOST': (60, ()),
+    'CLIENT_MONITOR_VISIBILITY_CHANGE': (60, ('event_data.hidden',)),
+}
+# Parsed workbooks kept in memory for the viewer, print and sheet APIs,
+# by estimated DataFrame size (renderings of them count too); a single workbook
+# larger than this is kept on its own, outside the budget
+WORKBOOK_CACHE_MAX_BYTES = 512 * 1024 * 1024
+VIEWER_PAGE_ROWS = 100        # rows embedded in the viewer page, and per range the viewer fetches
+SHEET_RANGE_MAX_ROWS = 1000   # most rows one /api/sheet request returns
+# In-memory buffer behind the real-time views
+RECENT_ACTIVITY_CAPACITY = 10000
+RECENT_ACTIVITY_MAX_BYTES = 32 * 1024 * 1024
+RECENT_ACTIVITY_PAGE_SIZE = 1000  # default number of events /api/logs returns
+# Server-Sent Events push stream (/api/stream)
+STREAM_BUFFER_SIZE = 256          # events held per subscriber before the oldest are dropped
+STREAM_MAX_SUBSCRIBERS = 100      # beyond this, clients fall back to polling
+STREAM_KEEPALIVE_SECONDS = 15
+STREAM_RETRY_MS = 3000            # client reconnect delay
+# Monthly activity partitions older than this are compressed, then deleted
+ACTIVITY_ARCHIVE_AFTER_MONTHS = 6
+ACTIVITY_DELETE_AFTER_MONTHS = 36
+# Multi-process serving: serve.py sets these for every worker it starts
+WORKER_ID = os.environ.get('WATERMARK_WORKER_ID')
+WORKER_COUNT = int(os.environ.get('WATERMARK_WORKERS', '1'))
+MULTIPROCESS = WORKER_ID is not None
+LEADER_LOCK_FILE = 'watermark_leader.lock'  # held by the one process running the system monitor
+ACTIVITY_TAIL_INTERVAL_MS = 250             # how soon a worker sees the others' activities
+# Each worker journals to a directory of its own
+ACTIVITY_JOURNAL_PATH = (os.path.join(ACTIVITY_JOURNAL_DIR, f"worker-{WORKER_ID}") if MULTIPROCESS
+                         else ACTIVITY_JOURNAL_DIR)
 
-# Ensure directories exist
-os.makedirs(EXCEL_FILES_DIR, exist_ok=True)
+# Services behind the routes, set up by create_app(); importing this module
+# starts no threads and opens no files
+system_monitor = None
+catalog = None
+file_tracking = None
+leader = None
+db = None
+journal = None
+ingest = None
+activity_feed = None
+recent_activity = None
+broadcaster = None
+admission = None
 
-# Initialize database
-db = ActivityDatabase()
-
-# Activity tracking storage (for backward compatibility)
-activity_logs = []
+# ETag / If-None-Match handling for the polled read APIs
+validator = ResponseValidator(os.environ.get('WATERMARK_INSTANCE'))
+
+# Shared by every route that reads sheet data; a rewritten file is parsed again
+workbook_cache = WorkbookCache(WORKBOOK_CACHE_MAX_BYTES)
+# Sheet names, sizes and properties for the file lists, read from the zip without parsing
+workbook_metadata = WorkbookMetadataCache()
+
+def start_system_monitor():
+    global system_monitor
+    # Loads watchdog and the win32 modules, so only the monitoring process pays for them
+    from system_file_monitor import start_file_monitoring
+    print("🔍 Starting system-level file monitoring...")
+    system_monitor = start_file_monitoring()
+    print("✅ System file monitoring active")
+
+def echo_activity(event):
+    if ACTIVITY_CONSOLE_ECHO:
+        print(f"Activity logged: {event['activity']} for {event['file_name']} by session {event['session_id']}")
 
+def stream_history(since):
+    """Events after since for a resuming stream, or None if the buffer no longer holds them all"""
+    delta = recent_activity.since(since)
+    if delta['truncated'] or delta['reset']:
+        return None
+    return delta['activities']
+
+def record_suppressed(summary):
+    """Store one "N events suppressed" record for events admission control shed"""
+    ingest.submit(
+        timestamp=datetime.now().isoformat(),
+        session_id=summary['session_id'] or 'unknown',
+        activity='MONITORING_EVENTS_SUPPRESSED',
+        file_name=summary['file_name'] or 'unknown',
+        ip_address=summary['ip_address'],
+        additional_info=summary
+    )
+
+def create_app(start_monitor=False):
+    """Set up activity storage and its background threads, and return the app.
+
+    Called once by each server process; later calls return the same app.
+    The system file monitor is only started with start_monitor, and then
+    in exactly one process, the holder of the leader lock; another takes
+    over if it exits.
+    """
+    global catalog, file_tracking, leader, db, journal, ingest, activity_feed, recent_activity, broadcaster, admission
+    if db is not None:
+        return app
+
+    # Listing of EXCEL_FILES_DIR (created if missing), kept current in the background
+    catalog = FileCatalog(EXCEL_FILES_DIR, reconcile_interval=FILE_CATALOG_RECONCILE_SECONDS)
+    catalog.add_listener(forget_workbook)
+    catalog.start()
+
+    # Downloads are registered from any process through the shared tracking database
+    file_tracking = FileTrackingClient()
+    leader = LeaderElection(LEADER_LOCK_FILE, start_system_monitor if start_monitor else (lambda: None))
+    leader.start()
+
+    # Initialize database; workers draw sequence numbers from one counter in it
+    db = ActivityDatabase(retention=RetentionPolicy(archive_after_months=ACTIVITY_ARCHIVE_AFTER_MONTHS,
+                                                    delete_after_months=ACTIVITY_DELETE_AFTER_MONTHS),
+                          shared_sequence=MULTIPROCESS)
+
+    # Append-only journal every activity is written to before it is queued
+    journal = ActivityJournal(ACTIVITY_JOURNAL_PATH, fsync=ACTIVITY_JOURNAL_FSYNC,
+                              fsync_interval_ms=ACTIVITY_JOURNAL_FSYNC_INTERVAL_MS)
+
+    # Background writer that batches activity inserts off the request path
+    ingest = ActivityIngestQueue(db, batch_size=500, flush_interval_ms=50, max_queue_size=10000,
+                                 journal=journal, number_events=not MULTIPROCESS,
+                                 durability=ACTIVITY_DURABILITY,
+                                 durability_by_type=ACTIVITY_DURABILITY_BY_TYPE,
+                                 wait_timeout=ACTIVITY_COMMIT_TIMEOUT_SECONDS,
+                                 coalescer=ActivityCoalescer(ACTIVITY_COALESCE_RULES) if ACTIVITY_COALESCE_RULES else None)
+    ingest.add_listener(echo_activity)
+
+    # Source of activities for the real-time views, in sequence order: this
+    # process's ingest queue, or with several workers the database they share
+    if MULTIPROCESS:
+        activity_feed = ActivityTailer(db, poll_interval_ms=ACTIVITY_TAIL_INTERVAL_MS,
+                                       backfill=RECENT_ACTIVITY_PAGE_SIZE)
+    else:
+        activity_feed = ingest
+
+    # Most recent activities for the real-time views
+    recent_activity = RecentActivityBuffer(RECENT_ACTIVITY_CAPACITY, max_bytes=RECENT_ACTIVITY_MAX_BYTES)
+    activity_feed.add_listener(recent_activity.append)
+
+    # Pushes every activity to the dashboards subscribed to /api/stream
+    broadcaster = ActivityBroadcaster(STREAM_BUFFER_SIZE, STREAM_MAX_SUBSCRIBERS, history=stream_history)
+    activity_feed.add_listener(broadcaster.publish)
+    if MULTIPROCESS:
+        activity_feed.start()
+
+    # Token buckets that keep one noisy client from flooding the activity pipeline
+    admission = AdmissionController(ADMISSION_SESSION_BUDGETS, ADMISSION_IP_BUDGETS,
+                                    summary_interval=ADMISSION_SUMMARY_INTERVAL_SECONDS)
+    admission.start(record_suppressed)
+    return app
+
+def forget_workbook(name, entry):
+    """Drop cached data of a workbook that was rewritten or removed"""
+    path = os.path.join(catalog.root, *name.split('/'))
+    workbook_cache.invalidate(path)
+    workbook_metadata.invalidate(path)
+
+def files_version():
+    """Changes when a file in EXCEL_FILES_DIR is added, removed, renamed or rewritten"""
+    return catalog.version
+
+def workbook_path(filename):
+    """Path on disk of a served workbook, or None if there is no such file under EXCEL_FILES_DIR"""
+    entry = catalog.get(filename)
+    return entry.path if entry else None
+
+def workbook_version():
+    """Size and mtime of the workbook a file route names, for conditional responses"""
+    path = workbook_path(request.view_args['filename'])
+    try:
+        return WorkbookCache.key(path)[1:] if path else None
+    except OSError:
+        return None
+
+def sheet_page(sheet_data, sheet_name, start=0, end=None):
+    """Rows [start, end) of a sheet as lists of cells, with the sheet's column names"""
+    rows = sheet_data.iloc[start:end]
+    return {
+        'sheet': sheet_name,
+        'columns': [str(column) for column in sheet_data.columns],
+        'rows': rows.astype(object).where(rows.notna(), None).values.tolist(),
+        'start': start,
+        'total_rows': len(sheet_data)
+    }
+
+def first_sheet_page(file_path):
+    """Sheet names and the first page of the first sheet, without parsing the whole workbook"""
+    cached = workbook_cache.cached(file_path)
+    metadata = None if cached else workbook_metadata.get(file_path)
+    if cached is None and metadata is None:
+        # Not an xlsx package (legacy .xls): names only come from parsing it
+        cached = workbook_cache.get(file_path)
+    if cached is not None:
+        sheet_names = list(cached.sheets)
+        if not sheet_names:
+            return sheet_names, None
+        page = sheet_page(cached.sheets[sheet_names[0]], sheet_names[0], end=VIEWER_PAGE_ROWS)
+        return sheet_names, page
+    sheet_names = metadata['sheet_names']
+    if not sheet_names:
+        return sheet_names, None
+    # One row more than the page tells whether the sheet goes on
+    head = read_sheet_head(file_path, sheet_names[0], VIEWER_PAGE_ROWS + 1)
+    page = sheet_page(head, sheet_names[0], end=VIEWER_PAGE_ROWS)
+    if len(head) > VIEWER_PAGE_ROWS:
+        page['total_rows'] = None  # unknown until the sheet is loaded
+    return sheet_names, page
+
+def metrics_version():
+    """Rollup version, plus the hour, since the metrics cover a window ending now"""
+    return db.rollups.version, db.data_version, datetime.now().strftime('%Y-%m-%dT%H')
+
 def log_activity(user_session, activity_type, file_name, additional_info=None):
-    """Log user activity with timestamp to both JSON and database"""
-    activity = {
-        'timestamp': datetime.now().isoformat(),
-        'session_id': user_session,
-        'activity': activity_type,
-        'file_name': file_name,
-        'ip_address': request.remote_addr,
-        'user_agent': request.headers.get('User-Agent', ''),
-        'additional_info': additional_info or {}
-    }
-    
-    # Add to memory (for real-time display)
-    activity_logs.append(activity)
-    
-    # Add to database (for historical tracking)
-    db.add_activity(
-        timestamp=activity['timestamp'],
-        session_id=activity['session_id'],
-        activity=activity['activity'],
-        file_name=activity['file_name'],
-        ip_address=activity['ip_address'],
-        user_agent=activity['user_agent'],
-        additional_info=activity['additional_info']
+    """Log user activity without waiting on storage.
+
+    Only the request-derived fields are captured here. The ingest pipeline
+    journals the event, stores it (for historical tracking) and hands it to
+    the recent buffer and the stream (for real-time display) in the
+    background; types in ACTIVITY_DURABILITY_BY_TYPE wait for their commit.
+    """
+    ingest.submit(
+        timestamp=datetime.now().isoformat(),
+        session_id=user_session,
+        activity=activity_type,
+        file_name=file_name,
+        ip_address=request.remote_addr,
+        user_agent=request.headers.get('User-Agent', ''),
+        additional_info=additional_info or {}
     )
-    
-    # Save to file for persistence
-    try:
-        with open(ACTIVITY_LOG_FILE, 'w') as f:
-            json.dump(activity_logs, f, indent=2)
-    except Exception as e:
-        print(f"Error saving activity log: {e}")
-    
-    print(f"Activity logged: {activity_type} for {file_name} by session {user_session}")
+
+def suppressed_response():
+    """429 for a client event shed by admission control; it still counts towards a summary record"""
+    response = jsonify({'status': 'suppressed'})
+    response.status_code = 429
+    response.headers['Retry-After'] = '1'
+    return response
+
+def is_iso_timestamp(value):
+    """Whether a client-supplied timestamp is one the activity store can parse"""
+    try:
+        parse_timestamps([value])
+    except ValueError:
+        return False
+    return True
 
 def generate_session_id():
     """Generate unique session ID"""
@@ -85,93 +317,72 @@ def index():
     if 'session_id' not in session:
         session['session_id'] = generate_session_id()
     
-    # List available Excel files with metadata
+    # List available Excel files with metadata, from the catalog
     excel_files = []
-    if os.path.exists(EXCEL_FILES_DIR):
-        for file in os.listdir(EXCEL_FILES_DIR):
-            if file.endswith(('.xlsx', '.xls')):
-                file_path = os.path.join(EXCEL_FILES_DIR, file)
-                try:
-                    # Get file stats
-                    stat = os.stat(file_path)
-                    file_size = stat.st_size
-                    modified_time = datetime.fromtimestamp(stat.st_mtime)
-                    
-                    # Get sheet count
-                    sheets_count = 0
-                    try:
-                        wb = openpyxl.load_workbook(file_path, read_only=True)
-                        sheets_count = len(wb.sheetnames)
-                        wb.close()
-                    except:
-                        sheets_count = 1  # Default to 1 if can't read
-                    
-                    # Format file size
-                    if file_size < 1024:
-                        size_str = f"{file_size} B"
-                    elif file_size < 1024 * 1024:
-                        size_str = f"{file_size / 1024:.1f} KB"
-                    else:
-                        size_str = f"{file_size / (1024 * 1024):.1f} MB"
-                    
-                    excel_files.append({
-                        'name': file,
-                        'filename': file,
-                        'modified': modified_time.strftime('%Y-%m-%d %H:%M'),
-                        'size': size_str,
-                        'sheets_count': sheets_count
-                    })
-                except Exception as e:
-                    # If there's an error reading file metadata, add basic info
-                    excel_files.append({
-                        'name': file,
-                        'filename': file,
-                        'modified': 'Unknown',
-                        'size': 'Unknown',
-                        'sheets_count': 1
-                    })
+    for entry in catalog.files():
+        try:
+            file_size = entry.size
+            modified_time = datetime.fromtimestamp(entry.mtime_ns / 1e9)
+            
+            # Get sheet count
+            metadata = workbook_metadata.get(entry.path, (entry.size, entry.mtime_ns))
+            sheets_count = len(metadata['sheets']) if metadata else 1  # Default to 1 if can't read
+            
+            # Format file size
+            if file_size < 1024:
+                size_str = f"{file_size} B"
+            elif file_size < 1024 * 1024:
+                size_str = f"{file_size / 1024:.1f} KB"
+            else:
+                size_str = f"{file_size / (1024 * 1024):.1f} MB"
+            
+            excel_files.append({
+                'name': entry.name,
+                'filename': entry.name,
+                'modified': modified_time.strftime('%Y-%m-%d %H:%M'),
+                'size': size_str,
+                'sheets_count': sheets_count
+            })
+        except Exception as e:
+            # If there's an error reading file metadata, add basic info
+            excel_files.append({
+                'name': entry.name,
+                'filename': entry.name,
+                'modified': 'Unknown',
+                'size': 'Unknown',
+                'sheets_count': 1
+            })
     
     log_activity(session['session_id'], 'PAGE_VISIT', 'index', {'files_available': len(excel_files)})
     
     return render_template('index.html', files=excel_files)
 
-@app.route('/view/<filename>')
+@app.route('/view/<path:filename>')
 def view_file(filename):
     """Secure file viewer"""
     if 'session_id' not in session:
         session['session_id'] = generate_session_id()
     
-    file_path = os.path.join(EXCEL_FILES_DIR, filename)
+    file_path = workbook_path(filename)
     
-    if not os.path.exists(file_path):
+    if file_path is None:
         log_activity(session['session_id'], 'FILE_NOT_FOUND', filename)
         return "File not found", 404
     
     try:
-        # Read Excel file
-        df = pd.read_excel(file_path, sheet_name=None)  # Read all sheets
-        
-        # Convert to JSON format for the template
-        sheets_data = {}
-        for sheet_name, sheet_data in df.items():
-            # Convert DataFrame to list of dictionaries
-            sheets_data[sheet_name] = sheet_data.to_dict('records')
+        # Only the first page is sent with the page; the viewer fetches each sheet from /api/sheet
+        sheet_names, first_page = first_sheet_page(file_path)
         
         log_activity(session['session_id'], 'FILE_OPENED', filename, {
-            'sheets_count': len(sheets_data),
-            'sheet_names': list(sheets_data.keys())
+            'sheets_count': len(sheet_names),
+            'sheet_names': sheet_names
         })
         
-        # Convert to JSON string for template
-        import json
-        excel_data_json = json.dumps(sheets_data)
-        
-        print(f"DEBUG: Sending data for {filename} with {len(sheets_data)} sheets")
-        print(f"DEBUG: Sheet names: {list(sheets_data.keys())}")
-
         return render_template('viewer.html',
                              filename=filename,
-                             excel_data=excel_data_json,
+                             sheet_names=htmlsafe_json_dumps(sheet_names),
+                             first_page=htmlsafe_json_dumps(first_page, default=str),
+                             page_rows=VIEWER_PAGE_ROWS,
                              session_id=session['session_id'],
                              timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
     
@@ -192,30 +403,33 @@ def track_activity():
     activity_type = data.get('activity')
     filename = data.get('filename')
     additional_info = data.get('info', {})
+    
+    threat_level = analyze_threat_level(activity_type or '', additional_info)
+    if not admission.admit(session['session_id'], request.remote_addr, threat_level, activity_type, filename):
+        return suppressed_response()
     
     log_activity(session['session_id'], activity_type, filename, additional_info)
     
     return jsonify({'status': 'logged'})
 
-@app.route('/print/<filename>')
+@app.route('/print/<path:filename>')
 def print_file(filename):
     """Generate print-friendly version"""
     if 'session_id' not in session:
         session['session_id'] = generate_session_id()
     
-    file_path = os.path.join(EXCEL_FILES_DIR, filename)
+    file_path = workbook_path(filename)
     
-    if not os.path.exists(file_path):
+    if file_path is None:
         return "File not found", 404
     
     try:
-        df = pd.read_excel(file_path, sheet_name=None)
-        sheets_html = {}
-        
-        for sheet_name, sheet_data in df.items():
-            sheets_html[sheet_name] = sheet_data.to_html(classes='print-table', 
-                                                        table_id=f'print-sheet-{sheet_name}',
-                                                        escape=False)
+        sheets_html = workbook_cache.derive(file_path, 'print_html', lambda sheets: {
+            sheet_name: sheet_data.to_html(classes='print-table',
+                                           table_id=f'print-sheet-{sheet_name}',
+                                           escape=False)
+            for sheet_name, sheet_data in sheets.items()
+        })
         
         log_activity(session['session_id'], 'PRINT_REQUESTED', filename, {
             'sheets_count': len(sheets_html)
@@ -232,9 +446,9 @@ def print_file(filename):
 @app.route('/admin/logs')
 def admin_logs():
     """View activity logs (admin only)"""
-    return render_template('admin.html', logs=activity_logs)
+    return render_template('admin.html', logs=recent_activity.recent(RECENT_ACTIVITY_PAGE_SIZE))
 
-@app.route('/generate-token/<filename>')
+@app.route('/generate-token/<path:filename>')
 def generate_token(filename):
     """Generate a temporary download token"""
     if 'session_id' not in session:
@@ -244,7 +458,7 @@ def generate_token(filename):
     log_activity(session['session_id'], 'TOKEN_GENERATED', filename, {'token': token, 'allowed_email': email})
     return jsonify({'token': token, 'expires_in_minutes': 10})
 
-@app.route('/download-secure/<filename>')
+@app.route('/download-secure/<path:filename>')
 def download_secure(filename):
     """Generate encrypted, edit-only Excel file for download"""
     if 'session_id' not in session:
@@ -256,14 +470,15 @@ def download_secure(filename):
         log_activity(session['session_id'], 'DOWNLOAD_UNAUTHORIZED', filename, {'token': token, 'email': user_email})
         return "Unauthorized or expired token", 403
 
-    file_path = os.path.join(EXCEL_FILES_DIR, filename)
+    file_path = workbook_path(filename)
     
-    if not os.path.exists(file_path):
+    if file_path is None:
         log_activity(session['session_id'], 'DOWNLOAD_FILE_NOT_FOUND', filename)
         return "File not found", 404
     
     try:
         # Create a protected version of the Excel file with enhanced tracking
+        from excel_protection import create_macro_protected_excel
         protected_filename = create_macro_protected_excel(
             file_path, 
             filename, 
@@ -289,15 +504,14 @@ def download_secure(filename):
         })
         
         # Register the protected file with the system monitor for tracking
-        if system_monitor:
-            try:
-                system_monitor.register_download(protected_filename, filename, session['session_id'])
-                print(f"📋 Registered protected file for system monitoring: {filename}")
-            except Exception as e:
-                print(f"Warning: Could not register file with system monitor: {e}")
+        try:
+            file_tracking.register_download(protected_filename, filename, session['session_id'])
+            print(f"📋 Registered protected file for system monitoring: {filename}")
+        except Exception as e:
+            print(f"Warning: Could not register file with system monitor: {e}")
         
         # Get the proper filename for download - use .xlsx for compatibility
-        base_name = os.path.splitext(filename)[0]  # Remove any extension
+        base_name = os.path.splitext(os.path.basename(filename))[0]  # Remove any folder and extension
         download_name = f"secure_{base_name}.xlsx"
         
         print(f"DEBUG: Original filename: {filename}")
@@ -329,27 +543,28 @@ def download_secure(filename):
         log_activity(session['session_id'], 'DOWNLOAD_ERROR', filename, {'error': str(e)})
         return f"Error creating secure file: {str(e)}", 500
 
-@app.route('/test-download/<filename>')
+@app.route('/test-download/<path:filename>')
 def test_download(filename):
     """Simple test download route"""
-    file_path = os.path.join(EXCEL_FILES_DIR, filename)
+    file_path = workbook_path(filename)
     
-    if not os.path.exists(file_path):
+    if file_path is None:
         return "File not found", 404
     
     # Send original file directly
     return send_file(file_path, as_attachment=True)
 
-@app.route('/test-protected/<filename>')
+@app.route('/test-protected/<path:filename>')
 def test_protected_download(filename):
     """Test protected file creation and download"""
-    file_path = os.path.join(EXCEL_FILES_DIR, filename)
+    file_path = workbook_path(filename)
     
-    if not os.path.exists(file_path):
+    if file_path is None:
         return "File not found", 404
     
     try:
         # Create protected version
+        from excel_protection import create_macro_protected_excel
         protected_file = create_macro_protected_excel(file_path, filename)
         
         if protected_file and os.path.exists(protected_file):
@@ -372,9 +587,109 @@ def test_protected_download(filename):
 
 @app.route('/api/logs')
 def api_logs():
-    """API endpoint for activity logs (real-time)"""
-    return jsonify(activity_logs)
+    """API endpoint for recent activity logs (real-time).
+
+    Optional session_id or file_name narrow the result using the buffer's
+    indexes; limit caps how many of the newest events are returned. With
+    since=<seq> only events numbered above seq come back, oldest first,
+    together with the high_water to send as since next time.
+    """
+    limit = min(request.args.get('limit', RECENT_ACTIVITY_PAGE_SIZE, type=int), RECENT_ACTIVITY_CAPACITY)
+    session_id = request.args.get('session_id')
+    file_name = request.args.get('file_name')
+    since = request.args.get('since', type=int)
+    if since is not None:
+        return jsonify(recent_activity.since(since, limit, session_id=session_id, file_name=file_name))
+    if session_id:
+        return jsonify(recent_activity.for_session(session_id, limit))
+    if file_name:
+        return jsonify(recent_activity.for_file(file_name, limit))
+    return jsonify(recent_activity.recent(limit))
+
+@app.route('/api/logs/buffer')
+def api_logs_buffer():
+    """Capacity, fill level and memory use of the recent activity buffer"""
+    return jsonify(recent_activity.stats())
+
+def _arg_list(name):
+    """Values of a query parameter given repeatedly and/or comma-separated"""
+    return [value for arg in request.args.getlist(name) for value in arg.split(',') if value]
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events stream of new activities.
+
+    Optional file, session and severity parameters (repeatable or
+    comma-separated) filter the events. A reconnecting client resumes after
+    its Last-Event-ID header (or last_event_id parameter); a 'reset' event
+    means that was not possible and the client should reload, a 'dropped'
+    event that it fell behind and lost some. Returns 503 when too many
+    clients are connected, so they keep polling instead.
+    """
+    topics = TopicFilter(files=_arg_list('file'), sessions=_arg_list('session'),
+                         severities=_arg_list('severity'))
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    try:
+        subscription = broadcaster.subscribe(topics, last_event_id=last_event_id)
+    except TooManySubscribers as e:
+        return jsonify({'error': str(e)}), 503
+
+    def generate():
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            if subscription.reset:
+                yield format_sse({'since': last_event_id}, event='reset')
+            while not subscription.closed:
+                events, dropped = subscription.get(timeout=STREAM_KEEPALIVE_SECONDS)
+                if dropped:
+                    yield format_sse({'dropped': dropped}, event='dropped')
+                for event in events:
+                    yield format_sse(event, event='activity', event_id=event.get('seq'))
+                if not events and not dropped:
+                    # Keeps proxies from timing out and notices clients that went away
+                    yield ": keepalive\n\n"
+        finally:
+            subscription.close()
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/stream/stats')
+def api_stream_stats():
+    """Subscriber count and totals of the push stream"""
+    return jsonify(broadcaster.stats())
 
+@app.route('/api/admission/stats')
+def api_admission_stats():
+    """Admitted and shed client events, and the budgets in force"""
+    return jsonify(admission.stats())
+
+@app.route('/api/coalescing/stats')
+def api_coalescing_stats():
+    """Periodic events folded into coalesced rows, and the rules in force"""
+    if ingest.coalescer is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(ingest.coalescer.stats(), enabled=True))
+
+@app.route('/api/workbook-cache/stats')
+def api_workbook_cache_stats():
+    """Hits, misses and evictions of the parsed workbook cache, and of the metadata cache"""
+    return jsonify(dict(workbook_cache.stats(), metadata=workbook_metadata.stats()))
+
+@app.route('/api/file-catalog/stats')
+def api_file_catalog_stats():
+    """Files in the catalog, its version, and how it is kept current"""
+    return jsonify(catalog.stats())
+
+@app.route('/api/cache-stats')
+def api_cache_stats():
+    """304 vs 200 responses of the conditional read APIs, and the bytes saved"""
+    return jsonify(validator.stats())
+
 @app.route('/api/historical-logs')
 def api_historical_logs():
     """API endpoint for historical activity logs with filtering"""
@@ -384,6 +699,43 @@ def api_historical_logs():
     activity_type = request.args.get('activity_type')
     session_id = request.args.get('session_id')
     limit = int(request.args.get('limit', 1000))
+    # match=exact filters on whole file/activity names and can use the indexes
+    exact_match = request.args.get('match') == 'exact'
+
+    # Delta fetch: only activities numbered above since, plus the new high_water
+    since = request.args.get('since', type=int)
+    if since is not None:
+        return jsonify(db.get_activities_since(
+            since,
+            file_name=file_name,
+            start_date=start_date,
+            end_date=end_date,
+            activity_type=activity_type,
+            session_id=session_id,
+            limit=min(limit, 5000),
+            exact_match=exact_match
+        ))
+
+    # Keyset pagination: page_size and/or cursor return one page plus cursors
+    if 'page_size' in request.args or 'cursor' in request.args:
+        page_size = min(int(request.args.get('page_size', 100)), 5000)
+        # Read before the page, so a delta fetch from here misses nothing
+        high_water = db.high_water
+        try:
+            page = db.get_activities_page(
+                file_name=file_name,
+                start_date=start_date,
+                end_date=end_date,
+                activity_type=activity_type,
+                session_id=session_id,
+                page_size=page_size,
+                cursor=request.args.get('cursor'),
+                exact_match=exact_match
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        page['high_water'] = high_water
+        return jsonify(page)
     
     activities = db.get_activities(
         file_name=file_name,
@@ -391,47 +743,95 @@ def api_historical_logs():
         end_date=end_date,
         activity_type=activity_type,
         session_id=session_id,
-        limit=limit
+        limit=limit,
+        exact_match=exact_match
     )
     
     return jsonify(activities)
+
+@app.route('/api/search')
+def api_search():
+    """Full-text search over activity records with highlighted snippets"""
+    text = request.args.get('q', '')
+    limit = min(int(request.args.get('limit', 50)), 500)
+    
+    try:
+        results = db.search_activities(
+            text,
+            limit=limit,
+            file_name=request.args.get('file_name'),
+            start_date=request.args.get('start_date'),
+            end_date=request.args.get('end_date')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'query': text, 'count': len(results), 'results': results})
 
 @app.route('/api/file-names')
+@validator.conditional(lambda: db.data_version)
 def api_file_names():
     """API endpoint to get available file names"""
     file_names = db.get_file_names()
     return jsonify(file_names)
 
 @app.route('/api/files')
+@validator.conditional(files_version)
 def api_files():
     """API endpoint to get available files with metadata"""
     excel_files = []
-    if os.path.exists(EXCEL_FILES_DIR):
-        for file in os.listdir(EXCEL_FILES_DIR):
-            if file.endswith(('.xlsx', '.xls')):
-                file_path = os.path.join(EXCEL_FILES_DIR, file)
-                try:
-                    stat = os.stat(file_path)
-                    excel_files.append({
-                        'name': file,
-                        'size': stat.st_size,
-                        'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
-                    })
-                except Exception as e:
-                    excel_files.append({
-                        'name': file,
-                        'size': 0,
-                        'modified': datetime.now().isoformat()
-                    })
+    for entry in catalog.files():
+        try:
+            metadata = workbook_metadata.get(entry.path, (entry.size, entry.mtime_ns)) or {}
+            excel_files.append({
+                'name': entry.name,
+                'size': entry.size,
+                'modified': datetime.fromtimestamp(entry.mtime_ns / 1e9).isoformat(),
+                'sheets': metadata.get('sheets', []),
+                'properties': metadata.get('properties', {}),
+                'content_hash': metadata.get('content_hash')
+            })
+        except Exception as e:
+            excel_files.append({
+                'name': entry.name,
+                'size': 0,
+                'modified': datetime.now().isoformat()
+            })
     return jsonify(excel_files)
+
+@app.route('/api/sheet/<path:filename>/<sheet>')
+@validator.conditional(workbook_version)
+def api_sheet(filename, sheet):
+    """API endpoint to get rows [start, end) of one sheet for the viewer"""
+    file_path = workbook_path(filename)
+    if file_path is None:
+        return jsonify({'error': 'File not found'}), 404
+    
+    start = request.args.get('start', 0, type=int)
+    end = request.args.get('end', start + VIEWER_PAGE_ROWS, type=int)
+    if start < 0 or end < start:
+        return jsonify({'error': 'Invalid row range'}), 400
+    end = min(end, start + SHEET_RANGE_MAX_ROWS)
+    
+    try:
+        sheets = workbook_cache.get(file_path).sheets
+        if sheet not in sheets:
+            return jsonify({'error': 'Sheet not found'}), 404
+        # Sliced from the cached DataFrame, so a request costs the rows it returns
+        payload = json.dumps(sheet_page(sheets[sheet], sheet, start, end), default=str)
+        return Response(payload, mimetype='application/json')
+    except Exception as e:
+        return jsonify({'error': f'Error reading file: {str(e)}'}), 500
 
 @app.route('/api/activity-types')
+@validator.conditional(lambda: db.data_version)
 def api_activity_types():
     """API endpoint to get available activity types"""
     activity_types = db.get_activity_types()
     return jsonify(activity_types)
 
 @app.route('/api/statistics')
+@validator.conditional(lambda: (db.data_version, db.rollups.version))
 def api_statistics():
     """API endpoint for activity statistics"""
     start_date = request.args.get('start_date')
@@ -453,6 +853,9 @@ def security_monitor():
 @app.route('/api/file-monitoring', methods=['POST'])
 def api_file_monitoring():
     """API endpoint to receive file monitoring events from client-side"""
+    if 'session_id' not in session:
+        session['session_id'] = generate_session_id()
+    
     try:
         data = request.get_json()
         
@@ -465,10 +868,22 @@ def api_file_monitoring():
         event_type = data.get('eventType', 'UNKNOWN_EVENT')
         event_data = data.get('eventData', {})
         timestamp = data.get('timestamp', datetime.now().isoformat())
+        if not is_iso_timestamp(timestamp):
+            return jsonify({'error': 'Invalid timestamp'}), 400
         
-        # Log the monitoring event to database
-        db.add_activity(
-            timestamp=timestamp,
+        # Analyze for security threats
+        threat_level = analyze_threat_level(event_type, event_data)
+        
+        # A flood of events from one session or address is shed, except HIGH threats.
+        # The session bucket is keyed on the server-side session, not the reported one
+        if not admission.admit(session['session_id'], request.remote_addr, threat_level,
+                               f"CLIENT_MONITOR_{event_type}", file_id):
+            return suppressed_response()
+        
+        # Queue the monitoring event for the database. It is stored (and partitioned)
+        # at the time it was received; the client's own time is kept alongside
+        ingest.submit(
+            timestamp=datetime.now().isoformat(),
             session_id=session_id,
             activity=f"CLIENT_MONITOR_{event_type}",
             file_name=file_id,
@@ -478,16 +893,14 @@ def api_file_monitoring():
                 'monitoring_event': True,
                 'event_type': event_type,
                 'event_data': event_data,
+                'threat_level': threat_level,
                 'client_timestamp': timestamp
             }
         )
         
-        # Analyze for security threats
-        threat_level = analyze_threat_level(event_type, event_data)
-        
         if threat_level == 'HIGH':
             # Log high-priority security event
-            db.add_activity(
+            ingest.submit(
                 timestamp=datetime.now().isoformat(),
                 session_id=session_id,
                 activity="SECURITY_THREAT_DETECTED",
@@ -521,15 +934,28 @@ def api_security_events():
         end_date = request.args.get('end_date')
         threat_level = request.args.get('threat_level', 'ALL')
         limit = int(request.args.get('limit', 500))
+        since = request.args.get('since', type=int)
         
-        # Get monitoring events from database
-        activities = db.get_activities(
-            file_name=file_name,
-            start_date=start_date,
-            end_date=end_date,
-            activity_type="CLIENT_MONITOR_%",  # SQL LIKE pattern
-            limit=limit
-        )
+        # Get monitoring events from database, or only those numbered above since
+        delta = None
+        if since is not None:
+            delta = db.get_activities_since(
+                since,
+                file_name=file_name,
+                start_date=start_date,
+                end_date=end_date,
+                activity_prefix="CLIENT_MONITOR_",
+                limit=limit
+            )
+            activities = delta['activities']
+        else:
+            activities = db.get_activities(
+                file_name=file_name,
+                start_date=start_date,
+                end_date=end_date,
+                activity_prefix="CLIENT_MONITOR_",
+                limit=limit
+            )
         
         # Filter by threat level if specified
         if threat_level != 'ALL':
@@ -545,6 +971,9 @@ def api_security_events():
                 event_data = activity['additional_info'].get('event_data', {})
                 activity['threat_analysis'] = analyze_threat_level(event_type, event_data)
         
+        if delta is not None:
+            delta['activities'] = activities
+            return jsonify(delta)
         return jsonify(activities)
         
     except Exception as e:
@@ -632,82 +1061,84 @@ def api_log_activity():
         return jsonify({'error': 'Failed to log activity'}), 500
 
 @app.route('/api/security-metrics')
+@validator.conditional(metrics_version)
 def api_security_metrics():
     """API endpoint for security dashboard metrics"""
     try:
-        # Get recent activities for metrics
-        activities = db.get_activities(limit=1000)
-        
-        # Calculate metrics
-        total_views = len([a for a in activities if a.get('activity') == 'FILE_OPENED'])
-        download_attempts = len([a for a in activities if 'DOWNLOAD' in a.get('activity', '')])
-        security_alerts = len([a for a in activities if a.get('activity') == 'SECURITY_THREAT_DETECTED'])
-        
-        # Get unique sessions for active sessions count
-        unique_sessions = len(set(a.get('session_id') for a in activities if a.get('session_id')))
-        
-        # Prepare timeline data (last 24 hours)
-        now = datetime.now()
-        hours = []
-        views_data = []
-        events_data = []
-        
-        for i in range(24):
-            hour_start = now - timedelta(hours=i+1)
-            hour_end = now - timedelta(hours=i)
-            hours.append(hour_start.strftime('%H:00'))
-            
-            hour_views = len([a for a in activities 
-                            if a.get('activity') == 'FILE_OPENED' 
-                            and hour_start <= datetime.fromisoformat(a.get('timestamp', '')) < hour_end])
-            hour_events = len([a for a in activities 
-                             if hour_start <= datetime.fromisoformat(a.get('timestamp', '')) < hour_end])
-            
-            views_data.append(hour_views)
-            events_data.append(hour_events)
+        # Metrics come from the hourly rollups over the last N hours
+        window_hours = max(1, min(int(request.args.get('hours', 24)), 24 * 31))
+        now = datetime.now()
+        bucket_hours = [now - timedelta(hours=i) for i in range(window_hours - 1, -1, -1)]
+        start_bucket = bucket_hours[0].strftime('%Y-%m-%dT%H')
+        end_bucket = bucket_hours[-1].strftime('%Y-%m-%dT%H')
+        
+        def rollup_total(**filters):
+            rows = db.rollups.summarize('hour', start_bucket, end_bucket, **filters)
+            return rows[0] if rows else {'events': 0, 'unique_sessions': 0}
         
-        # Reverse to show chronological order
-        hours.reverse()
-        views_data.reverse()
-        events_data.reverse()
+        overall = rollup_total()
+        total_views = rollup_total(category='open')['events']
+        download_attempts = rollup_total(category='download')['events']
+        security_alerts = rollup_total(category='security', threat_level='HIGH')['events']
+        unique_sessions = overall['unique_sessions']
         
-        # Get recent events
+        # Timeline data, one point per hour in chronological order
+        per_hour = {row['bucket']: row['events'] for row in
+                    db.rollups.summarize('hour', start_bucket, end_bucket, group_by=('bucket',))}
+        views_per_hour = {row['bucket']: row['events'] for row in
+                          db.rollups.summarize('hour', start_bucket, end_bucket,
+                                               group_by=('bucket',), category='open')}
+        hours = [hour.strftime('%H:00') for hour in bucket_hours]
+        bucket_keys = [hour.strftime('%Y-%m-%dT%H') for hour in bucket_hours]
+        views_data = [views_per_hour.get(key, 0) for key in bucket_keys]
+        events_data = [per_hour.get(key, 0) for key in bucket_keys]
+        
+        # Get recent events, newest first. With since=<seq> only newer ones,
+        # unless more than fit arrived: then reset tells the client to replace them all.
+        since = request.args.get('since', type=int)
+        high_water = db.high_water
+        reset = True
+        if since is not None:
+            delta = db.get_activities_since(since, limit=10)
+            reset = delta['reset'] or len(delta['activities']) == 10
+            if not reset:
+                high_water = delta['high_water']
+        if reset:
+            event_source = db.get_activities(limit=10)
+        else:
+            event_source = reversed(delta['activities'])
         recent_events = []
-        for activity in activities[:10]:
+        for activity in event_source:
             recent_events.append({
                 'type': activity.get('activity', 'Unknown'),
                 'description': f"User accessed {activity.get('file_name', 'system')}",
                 'timestamp': activity.get('timestamp', ''),
                 'user': activity.get('session_id', 'unknown')[:8],
+                'seq': activity.get('seq'),
                 'ip': '127.0.0.1',  # Placeholder
                 'severity': 'info'
             })
         
         # Get alerts (high threat activities)
         alerts = []
-        for activity in activities:
-            if activity.get('activity') == 'SECURITY_THREAT_DETECTED':
-                alerts.append({
-                    'title': 'Security Threat Detected',
-                    'message': f"Threat detected in {activity.get('file_name', 'unknown file')}",
-                    'timestamp': activity.get('timestamp', ''),
-                    'severity': 'danger'
-                })
+        for activity in db.get_activities(activity_type='SECURITY_THREAT_DETECTED',
+                                          exact_match=True, limit=5):
+            alerts.append({
+                'title': 'Security Threat Detected',
+                'message': f"Threat detected in {activity.get('file_name', 'unknown file')}",
+                'timestamp': activity.get('timestamp', ''),
+                'severity': 'danger'
+            })
         
         # Get file access summary
-        file_access = {}
-        for activity in activities:
-            if activity.get('activity') == 'FILE_OPENED':
-                filename = activity.get('file_name', 'unknown')
-                if filename not in file_access:
-                    file_access[filename] = {
-                        'name': filename,
-                        'views': 0,
-                        'lastAccess': activity.get('timestamp', '')
-                    }
-                file_access[filename]['views'] += 1
-                if activity.get('timestamp', '') > file_access[filename]['lastAccess']:
-                    file_access[filename]['lastAccess'] = activity.get('timestamp', '')
+        file_rows = db.rollups.summarize('hour', start_bucket, end_bucket,
+                                         group_by=('file_name',), category='open')
+        file_rows.sort(key=lambda row: row['events'], reverse=True)
+        file_access = [{
+            'name': row['file_name'],
+            'views': row['events'],
+            'lastAccess': f"{row['last_bucket']}:00:00"
+        } for row in file_rows[:10]]
         
         return jsonify({
             'totalViews': total_views,
@@ -720,8 +1151,10 @@ def api_security_metrics():
                 'events': events_data
             },
             'events': recent_events,
-            'alerts': alerts[:5],  # Limit to 5 most recent
-            'fileAccess': list(file_access.values())[:10]  # Limit to 10 most accessed
+            'high_water': high_water,
+            'reset': reset,
+            'alerts': alerts,  # 5 most recent
+            'fileAccess': file_access  # 10 most accessed
         })
         
     except Exception as e:
@@ -759,6 +1192,8 @@ def handle_system_monitor_incident(data):
         process_name = data.get('processName', 'unknown')
         severity = data.get('severity', 'MEDIUM')
         timestamp = data.get('timestamp', datetime.now().isoformat())
+        if not is_iso_timestamp(timestamp):
+            return jsonify({'error': 'Invalid timestamp'}), 400
         
         # Create activity data
         activity_data = {
@@ -768,15 +1203,16 @@ def handle_system_monitor_incident(data):
             'destination_path': destination_path,
             'process_name': process_name,
             'source': 'SYSTEM_MONITOR',
-            'severity': severity
+            'severity': severity,
+            'client_timestamp': timestamp
         }
         
         # Determine activity type
         activity_type = f"SYSTEM_{operation}" if operation != 'UNKNOWN_OPERATION' else 'SYSTEM_FILE_OPERATION'
         
-        # Log to database
-        db.add_activity(
-            timestamp=timestamp,
+        # Queue for the database at the time received; this also pushes it to the dashboards
+        ingest.submit(
+            timestamp=datetime.now().isoformat(),
             session_id='SYSTEM_MONITOR',
             activity=activity_type,
             file_name=original_file,
@@ -834,14 +1270,15 @@ def handle_vba_incident(data):
             'details': details,
             'source': 'PROTECTED_FILE_VBA',
             'severity': 'HIGH',
-            'file_origin': filename
+            'file_origin': filename,
+            'client_timestamp': timestamp
         }
         # Determine the appropriate activity type based on incident
         activity_type = map_incident_to_activity(incident_type)
         
-        # Log to database
-        db.add_activity(
-            timestamp=timestamp,
+        # Queue for the database at the time received; this also pushes it to the dashboards
+        ingest.submit(
+            timestamp=datetime.now().isoformat(),
             session_id=session_id,
             activity=activity_type,
             file_name=filename,
@@ -891,32 +1328,85 @@ def api_system_monitor_report():
     try:
         hours = request.args.get('hours', 24, type=int)
         
-        if system_monitor:
-            report = system_monitor.get_security_report(hours=hours)
-            return jsonify(report)
-        else:
-            return jsonify({
-                'summary': {
-                    'total_incidents': 0,
-                    'high_severity': 0,
-                    'medium_severity': 0
-                },
-                'incidents': [],
-                'message': 'System monitor not available'
-            })
+        # Incidents are in the shared tracking database, whichever process runs the monitor
+        report = file_tracking.get_security_report(hours=hours)
+        return jsonify(report)
     
     except Exception as e:
         print(f"Error getting system monitor report: {e}")
         return jsonify({'error': 'Failed to get system monitor report'}), 500
 
-if __name__ == '__main__':
-    # Migrate existing JSON logs to database on startup
-    if os.path.exists(ACTIVITY_LOG_FILE):
-        try:
-            db.migrate_json_logs(ACTIVITY_LOG_FILE)
-            print("[SUCCESS] Migrated existing logs to database")
-        except Exception as e:
-            print(f"[WARNING] Could not migrate logs: {e}")
+def orphaned_journal_dirs():
+    """Journal directories no running process writes to.
+
+    Worker journals when serving from one process; with several workers,
+    the single-process journal and those of workers beyond WORKER_COUNT.
+    """
+    dirs = [ACTIVITY_JOURNAL_DIR] if MULTIPROCESS and os.path.isdir(ACTIVITY_JOURNAL_DIR) else []
+    first_orphan = WORKER_COUNT if MULTIPROCESS else 0
+    if os.path.isdir(ACTIVITY_JOURNAL_DIR):
+        for name in sorted(os.listdir(ACTIVITY_JOURNAL_DIR)):
+            number = name[len('worker-'):]
+            if name.startswith('worker-') and number.isdigit() and int(number) >= first_orphan:
+                dirs.append(os.path.join(ACTIVITY_JOURNAL_DIR, name))
+    return dirs
+
+def prepare_activity_storage():
+    """Bring the database up to date before serving requests.
+
+    Every process replays its own journal. The leader also imports the
+    legacy JSON log, replays orphaned journals and applies retention.
+    """
+    # Import the legacy JSON log, then replay journaled events that never
+    # reached the database (e.g. after a crash)
+    sources = [ACTIVITY_JOURNAL_PATH]
+    if leader.is_leader:
+        sources = [ACTIVITY_LOG_FILE] + sources + orphaned_journal_dirs()
+    for source in sources:
+        if os.path.exists(source):
+            try:
+                migrated = db.migrate_json_logs(source)
+                print(f"[SUCCESS] Migrated {migrated} new log records from {source} to database")
+            except Exception as e:
+                print(f"[WARNING] Could not migrate logs: {e}")
+
+    # Journal segments that are fully in the database are no longer needed
+    checkpoint = db.journal_checkpoint(ACTIVITY_JOURNAL_PATH)
+    if checkpoint:
+        journal.prune(checkpoint[0])
+
+    # Archive and drop old activity partitions before serving requests
+    if leader.is_leader:
+        try:
+            retention = db.apply_retention()
+            if retention['archived'] or retention['deleted']:
+                print(f"[SUCCESS] Archived partitions {retention['archived']}, deleted {retention['deleted']}")
+        except Exception as e:
+            print(f"[WARNING] Could not apply activity retention: {e}")
+
+def shutdown():
+    """End open streams, write out queued activities and stop the system monitor"""
+    if db is None:
+        return  # create_app() was never called
+    catalog.close()
+    broadcaster.close()
+    admission.close()
+    if MULTIPROCESS:
+        activity_feed.close()
+    ingest.close()
+    journal.close()
+
+    # Clean up system monitor on shutdown
+    if system_monitor:
+        from system_file_monitor import stop_file_monitoring
+        print("🛑 Stopping system file monitor...")
+        stop_file_monitoring()
+        print("✅ System monitor stopped")
+    leader.close()
+
+if __name__ == '__main__':
+    create_app(start_monitor=True)
+    prepare_activity_storage()
     
     print("Starting Secure Excel Viewer...")
     print("Upload your Excel files to the 'secure_files' directory")
@@ -929,9 +1419,5 @@ if __name__ == '__main__':
     except Exception as e:
         print(f"Error starting server: {e}")
     finally:
-        # Clean up system monitor on shutdown
-        if system_monitor:
-            print("🛑 Stopping system file monitor...")
-            stop_file_monitoring()
-            print("✅ System monitor stopped")
+        shutdown()
         input("Press Enter to exit...")
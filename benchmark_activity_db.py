@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Activity Database Benchmark
+Measures sustained events/sec for the activity store with concurrent
+writers while a dashboard-style reader polls statistics and history.
+
+Usage: python benchmark_activity_db.py [--events N] [--writers N] [--readers N]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from activity_database import ActivityDatabase
+from activity_ingest import ActivityIngestQueue
+
+
+# The original flat activities schema, one row holding every string
+LEGACY_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS activities (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        session_id TEXT NOT NULL,
+        activity TEXT NOT NULL,
+        file_name TEXT NOT NULL,
+        ip_address TEXT,
+        user_agent TEXT,
+        additional_info TEXT,
+        created_date DATE NOT NULL,
+        created_time TIME NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_file_name ON activities(file_name)',
+    'CREATE INDEX IF NOT EXISTS idx_activity ON activities(activity)',
+    'CREATE INDEX IF NOT EXISTS idx_created_date ON activities(created_date)',
+    'CREATE INDEX IF NOT EXISTS idx_session_id ON activities(session_id)',
+)
+
+
+class LegacyActivityDatabase:
+    """Baseline: the original schema, a new connection per call in rollback-journal mode"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        conn = sqlite3.connect(db_path)
+        for statement in LEGACY_SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        conn.close()
+
+    def add_activity(self, timestamp, session_id, activity, file_name,
+                     ip_address=None, user_agent=None, additional_info=None):
+        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            INSERT INTO activities
+            (timestamp, session_id, activity, file_name, ip_address, user_agent, additional_info, created_date, created_time)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (timestamp, session_id, activity, file_name, ip_address, user_agent,
+              json.dumps(additional_info) if additional_info else None,
+              dt.date().isoformat(), dt.time().isoformat()))
+        conn.commit()
+        conn.close()
+
+    def poll(self):
+        conn = sqlite3.connect(self.db_path)
+        _run_dashboard_queries(conn)
+        conn.close()
+
+    def close(self):
+        pass
+
+
+class QueuedActivityDatabase:
+    """Routes writes through the write-behind ingest queue"""
+
+    def __init__(self, db_path):
+        self.db = ActivityDatabase(db_path)
+        self.pool = self.db.pool
+        self.ingest = ActivityIngestQueue(self.db)
+
+    def add_activity(self, **kwargs):
+        self.ingest.submit(**kwargs)
+
+    def flush(self):
+        self.ingest.flush()
+
+    def close(self):
+        self.ingest.close()
+        self.db.close()
+
+
+def _run_dashboard_queries(conn):
+    """The reads a dashboard poll issued against the original activity table"""
+    conn.execute("SELECT COUNT(*), COUNT(DISTINCT session_id) FROM activities").fetchone()
+    conn.execute("SELECT * FROM activities ORDER BY timestamp DESC LIMIT 100").fetchall()
+
+
+def _poll(db):
+    if isinstance(db, LegacyActivityDatabase):
+        db.poll()
+    else:
+        store = getattr(db, 'db', db)
+        store.get_statistics()
+        store.get_activities(limit=100)
+
+
+def run_benchmark(db, events, writers, readers):
+    """Return (events/sec, reader polls completed) for one database"""
+    per_writer = events // writers
+    stop = threading.Event()
+    polls = [0]
+
+    def writer(worker_id):
+        for i in range(per_writer):
+            db.add_activity(
+                timestamp=datetime.now().isoformat(),
+                session_id=f"bench_session_{worker_id}",
+                activity="CLIENT_MONITOR_HEARTBEAT",
+                file_name=f"bench_file_{i % 10}.xlsx",
+                ip_address="127.0.0.1",
+                user_agent="benchmark",
+                additional_info={'seq': i}
+            )
+
+    def reader():
+        while not stop.is_set():
+            _poll(db)
+            polls[0] += 1
+
+    reader_threads = [threading.Thread(target=reader, daemon=True) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+
+    for t in reader_threads:
+        t.start()
+    start = time.perf_counter()
+    for t in writer_threads:
+        t.start()
+    for t in writer_threads:
+        t.join()
+    if hasattr(db, 'flush'):
+        db.flush()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for t in reader_threads:
+        t.join()
+
+    return (per_writer * writers) / elapsed, polls[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=1)
+    args = parser.parse_args()
+
+    print("📊 Activity database benchmark")
+    print(f"   {args.events} events, {args.writers} writer threads, {args.readers} reader threads")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, factory in [
+            ('before (connect per call, rollback journal)', LegacyActivityDatabase),
+            ('after (pooled connections, WAL)', ActivityDatabase),
+            ('after + write-behind batching', QueuedActivityDatabase),
+        ]:
+            db = factory(os.path.join(tmp, f"{factory.__name__}.db"))
+            rate, polls = run_benchmark(db, args.events, args.writers, args.readers)
+            db.close()
+            results[label] = rate
+            print(f"   {label}: {rate:,.0f} events/sec ({polls} reader polls)")
+
+    before = next(iter(results.values()))
+    for label, rate in list(results.items())[1:]:
+        print(f"✅ {label}: {rate / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Activity Journal Benchmark
+Compares the old persistence path (rewrite the whole activity list as JSON
+on every event) with appending to the segmented journal under each fsync
+policy.
+
+Usage: python benchmark_activity_journal.py [--events N] [--threads N]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from activity_journal import FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_OS, ActivityJournal
+from benchmark_activity_storage import generate_activities
+
+
+def rewrite_json(path, events):
+    """The old log_activity: append to a list and dump all of it"""
+    logs = []
+    for event in events:
+        logs.append(event)
+        with open(path, 'w') as f:
+            json.dump(logs, f, indent=2)
+
+
+def append_journal(directory, events, threads, fsync):
+    journal = ActivityJournal(directory, fsync=fsync)
+    share = len(events) // threads
+
+    def writer(part):
+        for event in part:
+            journal.append(event)
+
+    workers = [threading.Thread(target=writer, args=(events[i * share:(i + 1) * share],))
+               for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    journal.close()
+    return journal.fsyncs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+    events = list(generate_activities(args.events))
+
+    print("📓 Activity journal benchmark")
+    print(f"   {args.events:,} events, {args.threads} writer threads for the journal")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        rewrite_json(os.path.join(tmp, "activity_logs.json"), events)
+        elapsed = time.perf_counter() - start
+        print(f"   {'JSON rewrite per event':<28} {args.events / elapsed:>10,.0f} events/sec")
+
+        for fsync in (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_OS):
+            start = time.perf_counter()
+            fsyncs = append_journal(os.path.join(tmp, f"journal_{fsync}"), events, args.threads, fsync)
+            elapsed = time.perf_counter() - start
+            print(f"   {'journal, fsync=' + fsync:<28} {args.events / elapsed:>10,.0f} events/sec"
+                  f"   ({fsyncs} fsyncs)")
+
+
+if __name__ == "__main__":
+    main()
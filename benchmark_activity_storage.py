@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Activity Storage Benchmark
+Compares on-disk size and query latency of the flat activities table with
+the dictionary-encoded layout (activity_log + dimension tables, split into
+monthly partition files) on a generated dataset.
+
+Usage: python benchmark_activity_storage.py [--rows N] [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from activity_database import (ActivityDatabase, ConnectionPool, _chunked, classify_activity,
+                               date_to_ts_us_range, parse_timestamps)
+
+# The flat layout this benchmark compares against: every row repeats its strings
+FLAT_SCHEMA = (
+    '''CREATE TABLE activities (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        session_id TEXT NOT NULL,
+        activity TEXT NOT NULL,
+        file_name TEXT NOT NULL,
+        ip_address TEXT,
+        user_agent TEXT,
+        additional_info TEXT,
+        created_date DATE NOT NULL,
+        created_time TIME NOT NULL,
+        category TEXT,
+        ts_us INTEGER
+    )''',
+    'CREATE INDEX idx_ts ON activities(ts_us)',
+    'CREATE INDEX idx_file_ts ON activities(file_name, ts_us)',
+    'CREATE INDEX idx_activity_ts ON activities(activity, ts_us)',
+    'CREATE INDEX idx_session_ts ON activities(session_id, ts_us)',
+    'CREATE INDEX idx_category ON activities(category, created_date)',
+    'CREATE INDEX idx_stats_cover ON activities(created_date, category, session_id)',
+)
+
+ACTIVITY_MIX = [
+    ('CLIENT_MONITOR_HEARTBEAT', 40), ('PAGE_VISIT', 15), ('FILE_OPENED', 12),
+    ('CLIENT_MONITOR_WINDOW_FOCUS_LOST', 8), ('CLIENT_MONITOR_VISIBILITY_CHANGE', 8),
+    ('CLIENT_MONITOR_SECURITY_CHECK', 6), ('SECURE_DOWNLOAD', 3), ('PRINT_ATTEMPT', 3),
+    ('CLIENT_MONITOR_CLIPBOARD_COPY_ATTEMPT', 2), ('SECURITY_THREAT_DETECTED', 2),
+    ('DOWNLOAD_UNAUTHORIZED', 1),
+]
+
+BROWSERS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/{v}.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/{v}.0.0.0 Safari/537.36 Edg/{v}.0.0.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+    "Version/17.{v} Safari/605.1.15",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:{v}.0) Gecko/20100101 Firefox/{v}.0",
+]
+
+
+def generate_activities(rows, days=90, seed=7):
+    """Yield activity dicts shaped like the ones app.py logs"""
+    rng = random.Random(seed)
+    names = [name for name, _ in ACTIVITY_MIX]
+    weights = [weight for _, weight in ACTIVITY_MIX]
+    user_agents = [browser.format(v=v) for browser in BROWSERS for v in range(110, 125)]
+    files = [f"{dept}_{kind}_{n:03d}.xlsx"
+             for dept in ('finance', 'hr', 'sales', 'ops') for kind in ('report', 'plan')
+             for n in range(25)]
+    sessions = ['%032x' % rng.getrandbits(128) for _ in range(max(1, rows // 50))]
+    ips = [f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}" for _ in range(1000)]
+
+    start = datetime(2024, 1, 1)
+    step = timedelta(days=days) / max(1, rows)
+    for i in range(rows):
+        timestamp = (start + step * i).isoformat()
+        activity = rng.choices(names, weights)[0]
+        if activity.startswith('CLIENT_MONITOR_'):
+            event_type = activity[len('CLIENT_MONITOR_'):]
+            additional_info = {
+                'monitoring_event': True,
+                'event_type': event_type,
+                'event_data': {'url': '/view/' + rng.choice(files), 'visible': rng.random() < 0.8},
+                'threat_level': 'HIGH' if 'ATTEMPT' in event_type else 'LOW',
+                'client_timestamp': timestamp
+            }
+        else:
+            additional_info = {'files_available': rng.randrange(1, 40)}
+        yield {
+            'timestamp': timestamp,
+            'session_id': rng.choice(sessions),
+            'activity': activity,
+            'file_name': rng.choice(files),
+            'ip_address': rng.choice(ips),
+            'user_agent': rng.choice(user_agents),
+            'additional_info': additional_info
+        }
+
+
+def load_flat(path, rows):
+    """Build the flat layout, loading rows before indexing them"""
+    pool = ConnectionPool(path)
+    with pool.connection() as conn:
+        conn.execute(FLAT_SCHEMA[0])
+    for chunk in _chunked(generate_activities(rows), 10000):
+        parsed = parse_timestamps([a['timestamp'] for a in chunk])
+        with pool.connection() as conn:
+            conn.executemany(
+                "INSERT INTO activities (timestamp, session_id, activity, file_name, ip_address, "
+                "user_agent, additional_info, created_date, created_time, category, ts_us) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(a['timestamp'], a['session_id'], a['activity'], a['file_name'], a['ip_address'],
+                  a['user_agent'], json.dumps(a['additional_info']), created_date, created_time,
+                  classify_activity(a['activity']), ts_us)
+                 for a, (created_date, created_time, ts_us) in zip(chunk, parsed)]
+            )
+    with pool.connection() as conn:
+        for statement in FLAT_SCHEMA[1:]:
+            conn.execute(statement)
+        conn.execute("ANALYZE")
+    return pool
+
+
+def load_normalized(path, rows):
+    """Build the dictionary-encoded layout through the normal write path"""
+    db = ActivityDatabase(path)
+    db.add_activities(generate_activities(rows), chunk_size=10000)
+    for partition in db.live_partitions():
+        with partition.pool.connection() as conn:
+            conn.execute("ANALYZE")
+    return db
+
+
+def storage_breakdown(pools):
+    """Bytes used per table across database files, counting indexes with their table"""
+    rows = []
+    for pool in pools:
+        with pool.connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            rows += conn.execute('''
+                SELECT m.tbl_name, SUM(s.pgsize) FROM dbstat s
+                JOIN sqlite_master m ON m.name = s.name
+                GROUP BY m.tbl_name
+            ''').fetchall()
+    groups = {}
+    for table, size in rows:
+        if table in ('activities', 'activity_log'):
+            group = 'activity rows + indexes'
+        elif table.startswith('dim_'):
+            group = 'dimension tables'
+        elif table.startswith('activities_fts'):
+            group = 'full-text index'
+        elif table.startswith('activity_rollup'):
+            group = 'rollups'
+        else:
+            group = 'other'
+        groups[group] = groups.get(group, 0) + size
+    return groups
+
+
+def query_cases():
+    """(label, flat SQL, params, ActivityDatabase call) for equivalent reads"""
+    start_date, end_date = "2024-02-01", "2024-02-07"
+    low, high = date_to_ts_us_range(start_date, end_date)
+    session = next(generate_activities(1))['session_id']
+    return [
+        ("latest 100",
+         "SELECT * FROM activities ORDER BY ts_us DESC, id DESC LIMIT 100", [],
+         lambda db: db.get_activities(limit=100)),
+        ("one file, one week",
+         "SELECT * FROM activities WHERE file_name = ? AND ts_us >= ? AND ts_us < ? "
+         "AND created_date BETWEEN ? AND ? ORDER BY ts_us DESC, id DESC LIMIT 100",
+         ["finance_report_001.xlsx", low, high, start_date, end_date],
+         lambda db: db.get_activities(file_name="finance_report_001.xlsx", exact_match=True,
+                                      start_date=start_date, end_date=end_date, limit=100)),
+        ("activity substring",
+         "SELECT * FROM activities WHERE activity LIKE ? ORDER BY ts_us DESC, id DESC LIMIT 100",
+         ["%UNAUTHORIZED%"],
+         lambda db: db.get_activities(activity_type="UNAUTHORIZED", limit=100)),
+        ("session history",
+         "SELECT * FROM activities WHERE session_id = ? ORDER BY ts_us DESC, id DESC LIMIT 100",
+         [session],
+         lambda db: db.get_activities(session_id=session, limit=100)),
+        ("raw statistics, one week",
+         "SELECT COUNT(*), COUNT(DISTINCT session_id), SUM(category = 'open'), "
+         "SUM(category = 'download'), SUM(category = 'print') "
+         "FROM activities INDEXED BY idx_stats_cover WHERE created_date BETWEEN ? AND ?",
+         [start_date, end_date],
+         lambda db: db.get_statistics(start_date, end_date, use_rollups=False)),
+        ("file name list",
+         "SELECT DISTINCT file_name FROM activities ORDER BY file_name", [],
+         lambda db: db.get_file_names()),
+    ]
+
+
+def fetch_flat(pool, sql, params):
+    """Run a flat-layout query and decode rows the way ActivityDatabase does"""
+    with pool.connection() as conn:
+        cursor = conn.execute(sql, params)
+        columns = [description[0] for description in cursor.description]
+        records = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    for record in records:
+        if record.get('additional_info'):
+            record['additional_info'] = json.loads(record['additional_info'])
+    return records
+
+
+def median_ms(fn, repeat):
+    fn()  # warm the page cache
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print("📊 Activity storage benchmark")
+    print(f"   {args.rows:,} generated activities")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        flat = load_flat(os.path.join(tmp, "flat.db"), args.rows)
+        print(f"   flat layout loaded in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        db = load_normalized(os.path.join(tmp, "normalized.db"), args.rows)
+        print(f"   normalized layout loaded in {time.perf_counter() - start:.1f}s")
+
+        print("\n💾 Storage (MB)")
+        flat_sizes = storage_breakdown([flat])
+        normalized_sizes = storage_breakdown([db.pool] + [p.pool for p in db.live_partitions()])
+        for group in sorted(set(flat_sizes) | set(normalized_sizes)):
+            print(f"   {group:<26} flat {flat_sizes.get(group, 0) / 1e6:>9.1f}"
+                  f"   normalized {normalized_sizes.get(group, 0) / 1e6:>9.1f}")
+        key = 'activity rows + indexes'
+        shared = normalized_sizes.get(key, 0) + normalized_sizes.get('dimension tables', 0)
+        print(f"✅ activity data: {flat_sizes[key] / shared:.1f}x smaller")
+
+        print("\n⏱️  Median query latency (ms)")
+        for label, sql, params, call in query_cases():
+            flat_ms = median_ms(lambda: fetch_flat(flat, sql, params), args.repeat)
+            normalized_ms = median_ms(lambda: call(db), args.repeat)
+            print(f"   {label:<26} flat {flat_ms:>9.2f}   normalized {normalized_ms:>9.2f}")
+
+        flat.close_all()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+File Catalog Benchmark
+Creates a tree of empty workbooks spread over subdirectories and compares
+what a file-list request costs when it walks and stats the tree itself
+with what it costs to read the in-memory catalog, plus the cost of the
+catalog's startup scan and of a periodic rescan.
+
+Usage: python benchmark_file_catalog.py [--files N] [--per-dir N]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from file_catalog import FileCatalog
+
+
+def walk_and_stat(root):
+    """What a request did before: list the tree and stat every workbook"""
+    files = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.lower().endswith(('.xlsx', '.xls')):
+                stat = os.stat(os.path.join(directory, name))
+                files.append((name, stat.st_size, stat.st_mtime_ns))
+    return files
+
+
+def timed(function, repeats=1):
+    """Best of ``repeats`` runs, in milliseconds"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=20000)
+    parser.add_argument('--per-dir', type=int, default=200, help="files per subdirectory")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="catalog_bench_")
+    try:
+        print(f"🗃️  File catalog benchmark: {args.files:,} files, {args.per_dir} per directory")
+        for i in range(args.files):
+            directory = os.path.join(root, f"dept-{i // (args.per_dir * 10):03d}", f"batch-{i // args.per_dir:04d}")
+            if i % args.per_dir == 0:
+                os.makedirs(directory, exist_ok=True)
+            open(os.path.join(directory, f"report-{i:06d}.xlsx"), 'wb').close()
+
+        catalog = FileCatalog(root)
+        print(f"   Startup scan           {timed(catalog.reconcile):9.1f} ms")
+        print(f"   Rescan, no changes     {timed(catalog.reconcile, 3):9.1f} ms")
+        print(f"   Request: walk + stat   {timed(lambda: walk_and_stat(root), 3):9.1f} ms")
+        print(f"   Request: catalog       {timed(catalog.files, 3):9.3f} ms")
+        print(f"   Request: version       {timed(lambda: catalog.version, 3):9.3f} ms")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
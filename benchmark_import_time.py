@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Import Time Benchmark
+Imports app.py in fresh interpreters under ``python -X importtime`` and
+checks the result against a regression budget: the median cumulative
+import time must stay under IMPORT_BUDGET_MS, and none of the heavy
+modules the routes load on first use may be imported. The deferred
+modules are timed on their own, to show what every import is spared.
+
+Each import runs in a scratch directory, so a stray side effect (a
+database or journal created at import time) fails the check too.
+
+Usage: python benchmark_import_time.py [--runs N] [--budget MS]
+Exits with status 1 when the budget is exceeded.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Cumulative import time of app allowed, in milliseconds (Flask itself is most of it)
+IMPORT_BUDGET_MS = 600
+
+# Loaded on first use by the routes and the system monitor, never by the import
+DEFERRED_MODULES = ('pandas', 'openpyxl', 'cryptography', 'excel_protection', 'system_file_monitor',
+                    'watchdog', 'win32file', 'win32con', 'psutil', 'requests')
+
+
+def import_time(module, cwd, setup=''):
+    """Cumulative import time of ``module`` in microseconds, and the modules it loaded"""
+    code = f"import sys; sys.path.insert(0, {HERE!r}); {setup}import {module}; print(' '.join(sys.modules))"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=cwd,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    cumulative = None
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module and not fields[2].startswith('  '):
+            cumulative = int(fields[1])
+    return cumulative, set(result.stdout.split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument('--budget', type=float, default=IMPORT_BUDGET_MS, help="allowed milliseconds")
+    args = parser.parse_args()
+
+    print("📦 Import time benchmark")
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        samples = []
+        loaded = set()
+        for _ in range(args.runs):
+            micros, modules = import_time('app', workdir)
+            samples.append(micros / 1000)
+            loaded |= modules
+        median = statistics.median(samples)
+        print(f"   import app: median {median:.0f} ms, best {min(samples):.0f} ms"
+              f" over {args.runs} runs (budget {args.budget:.0f} ms)")
+        if median > args.budget:
+            failures.append(f"import app took {median:.0f} ms, over the {args.budget:.0f} ms budget")
+
+        eager = sorted(module for module in DEFERRED_MODULES if module in loaded)
+        if eager:
+            failures.append(f"imported eagerly: {', '.join(eager)}")
+        created = sorted(os.listdir(workdir))
+        if created:
+            failures.append(f"files created at import: {', '.join(created)}")
+
+        print("   Deferred to first use:")
+        for module in ('pandas', 'openpyxl', 'cryptography.fernet'):
+            try:
+                micros, _ = import_time(module, workdir)
+                print(f"     {module:<22} {micros / 1000:7.0f} ms")
+            except RuntimeError:
+                print(f"     {module:<22} not installed")
+
+    for failure in failures:
+        print(f"   ❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("   ✅ Within budget")
+
+
+if __name__ == "__main__":
+    main()
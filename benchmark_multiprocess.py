@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Multi-Process Serving Benchmark
+Starts serve.py with 1, 2, 4, ... workers (up to the core count) and
+measures /view and /track throughput against each, from several client
+processes on keep-alive connections. With the work spread over processes,
+requests per second should grow close to linearly with the worker count
+until the cores (or SQLite's single writer, for /track) run out.
+
+The server runs in a scratch directory with copies of the sample
+workbooks, so its databases and journals are thrown away afterwards.
+
+Usage: python benchmark_multiprocess.py [--workers 1,2,4] [--clients N] [--seconds S]
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def wait_until_up(port, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/file-names')
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+
+def client(port, path, body, seconds, results):
+    """Send requests back to back on one connection for ``seconds``; report how many succeeded"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            if body is not None:
+                conn.request('POST', path, body=body, headers=headers)
+            else:
+                conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            cookie = response.getheader('Set-Cookie')
+            if cookie:
+                # Keep one session, as a browser would
+                headers['Cookie'] = cookie.split(';', 1)[0]
+            if response.status == 200:
+                done += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    results.put((done, errors))
+
+
+def measure(port, path, body, clients, seconds):
+    """Requests per second and error count over ``clients`` concurrent connections"""
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=client, args=(port, path, body, seconds, results))
+                 for _ in range(clients)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    totals = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+    done = sum(d for d, _ in totals)
+    errors = sum(e for _, e in totals)
+    return done / elapsed, errors
+
+
+def start_server(workdir, workers, port):
+    command = [sys.executable, os.path.join(HERE, 'serve.py'), '--workers', str(workers),
+               '--port', str(port)]
+    if os.name == 'nt':
+        return subprocess.Popen(command, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+    return subprocess.Popen(command, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+
+
+def stop_server(server):
+    if os.name == 'nt':
+        server.send_signal(signal.CTRL_BREAK_EVENT)
+    else:
+        os.killpg(server.pid, signal.SIGINT)
+    try:
+        server.wait(30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def main():
+    cores = os.cpu_count() or 1
+    default_workers = []
+    count = 1
+    while count <= cores:
+        default_workers.append(count)
+        count *= 2
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', default=','.join(map(str, default_workers)),
+                        help="comma-separated worker counts to compare")
+    parser.add_argument('--clients', type=int, default=2 * cores, help="concurrent client processes")
+    parser.add_argument('--seconds', type=float, default=10.0, help="duration of each measurement")
+    parser.add_argument('--file', default='employee_data.xlsx', help="workbook requested from /view")
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+    worker_counts = [int(n) for n in args.workers.split(',')]
+
+    print("🚦 Multi-process serving benchmark")
+    print(f"   {cores} cores, {args.clients} client processes, {args.seconds:.0f}s per measurement")
+
+    requests = [(f"/view/{args.file}", None),
+                ('/track', json.dumps({'activity': 'HEARTBEAT', 'filename': args.file, 'info': {}}))]
+    baseline = {}  # path -> (workers, req/s) of the first worker count
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copytree(os.path.join(HERE, 'secure_files'), os.path.join(workdir, 'secure_files'))
+        for workers in worker_counts:
+            server = start_server(workdir, workers, args.port)
+            try:
+                if not wait_until_up(args.port):
+                    print(f"   ❌ Server with {workers} workers did not come up")
+                    continue
+                for path, body in requests:
+                    rate, errors = measure(args.port, path, body, args.clients, args.seconds)
+                    base_workers, base_rate = baseline.setdefault(path, (workers, rate))
+                    speedup = rate / base_rate if base_rate else 0.0
+                    # Linear scaling would multiply the rate by the worker ratio
+                    efficiency = speedup / (workers / base_workers)
+                    print(f"   {workers:>3} workers  {path:<28} {rate:>9,.0f} req/s"
+                          f"   x{speedup:.2f}  ({efficiency:.0%} of linear)"
+                          + (f"   {errors} errors" if errors else ""))
+            finally:
+                stop_server(server)
+
+
+if __name__ == "__main__":
+    main()
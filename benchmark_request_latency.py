@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Request Latency Benchmark
+Measures p50/p99 latency of / and /view with activity logging waiting for
+the database commit on every request (the old, synchronous path) and with
+the default asynchronous pipeline, through Flask's test client so only
+server-side time is counted.
+
+The app runs in a scratch directory with copies of the sample workbooks,
+so its databases and journals are thrown away afterwards.
+
+Usage: python benchmark_request_latency.py [--requests N] [--threads N]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(flask_app, path, requests, threads):
+    """Latencies in milliseconds of ``requests`` GETs of ``path`` spread over ``threads`` clients"""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(count):
+        test_client = flask_app.test_client()
+        own = []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = test_client.get(path)
+            own.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, f"{path} returned {response.status_code}"
+        with lock:
+            latencies.extend(own)
+
+    workers = [threading.Thread(target=client, args=(requests // threads,)) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=400, help="requests per path and mode")
+    parser.add_argument('--threads', type=int, default=4, help="concurrent clients")
+    parser.add_argument('--file', default='employee_data.xlsx', help="workbook requested from /view")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="latency_bench_")
+    shutil.copytree(os.path.join(HERE, 'secure_files'), os.path.join(workdir, 'secure_files'))
+    os.chdir(workdir)
+    sys.path.insert(0, HERE)
+    import app
+    from activity_ingest import DURABILITY_ASYNC, DURABILITY_COMMIT
+
+    app.ACTIVITY_CONSOLE_ECHO = False
+    app.create_app()
+
+    print("⏱️  Request latency benchmark")
+    print(f"   {args.requests} requests per path, {args.threads} concurrent clients")
+    try:
+        for label, durability in (("wait for commit (before)", DURABILITY_COMMIT),
+                                  ("async pipeline (after)", DURABILITY_ASYNC)):
+            app.ingest.durability = durability
+            for path in ('/', f"/view/{args.file}"):
+                measure(app.app, path, args.threads * 5, args.threads)  # warm-up
+                latencies = measure(app.app, path, args.requests, args.threads)
+                print(f"   {label:<26} {path:<26} p50 {percentile(latencies, 0.50):7.2f} ms"
+                      f"   p99 {percentile(latencies, 0.99):7.2f} ms")
+            app.ingest.flush(timeout=30)
+    finally:
+        app.shutdown()
+        os.chdir(HERE)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
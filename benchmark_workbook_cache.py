@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Workbook Cache Benchmark
+Generates a large workbook and times /view, a row range from its sheet
+API and /print for it: the first request that needs every row parses it, repeats are
+answered from the parsed workbook cache. The workbook is written in
+openpyxl's write-only mode, which leaves out the <dimension> element, so
+the first /view has to scan the sheet to read its first page.
+Timed through Flask's test client, so only server-side time is counted.
+
+The app runs in a scratch directory, so the generated workbook and the
+databases are thrown away afterwards.
+
+Usage: python benchmark_workbook_cache.py [--rows N] [--repeats N]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def generate_workbook(path, rows):
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Transactions")
+    sheet.append(["ID", "Date", "Account", "Description", "Region", "Quantity", "Price", "Total"])
+    start = datetime(2024, 1, 1)
+    for i in range(rows):
+        quantity = i % 17 + 1
+        price = round(10 + (i * 7919) % 1000 / 10, 2)
+        sheet.append([i, (start + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M'), f"ACC-{i % 5000:05d}",
+                      f"Order {i} for customer {i * 31 % 9973}", ("North", "South", "East", "West")[i % 4],
+                      quantity, price, round(quantity * price, 2)])
+    workbook.save(path)
+
+
+def timed_get(client, path):
+    start = time.perf_counter()
+    response = client.get(path)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert response.status_code == 200, f"{path} returned {response.status_code}"
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000, help="rows in the generated workbook")
+    parser.add_argument('--repeats', type=int, default=10, help="cached requests timed per path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        sys.path.insert(0, HERE)
+        os.makedirs('secure_files')
+        path = os.path.join('secure_files', 'large.xlsx')
+        print(f"🧮 Generating a workbook with {args.rows:,} rows...")
+        generate_workbook(path, args.rows)
+        print(f"   {os.path.getsize(path) / (1024 * 1024):.1f} MB")
+
+        import app
+        app.ACTIVITY_CONSOLE_ECHO = False
+        app.create_app()
+        client = app.app.test_client()
+        try:
+            # In the order a browser sends them: the viewer fetches the sheet right after the page
+            middle = args.rows // 2
+            urls = ('/view/large.xlsx', f'/api/sheet/large.xlsx/Transactions?start={middle}&end={middle + 100}',
+                    '/print/large.xlsx')
+            cold = {url: timed_get(client, url) for url in urls}
+            for url in urls:
+                warm = [timed_get(client, url) for _ in range(args.repeats)]
+                print(f"   {url:<58} first {cold[url]:9.0f} ms   repeat median {statistics.median(warm):7.1f} ms")
+            stats = app.workbook_cache.stats()
+            print(f"   Cache: {stats['hits']} hits, {stats['misses']} misses,"
+                  f" {stats['bytes'] / (1024 * 1024):.0f} MB held")
+        finally:
+            app.shutdown()
+            os.chdir(HERE)
+
+
+if __name__ == "__main__":
+    main()
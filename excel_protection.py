@@ -375,7 +375,7 @@ def create_macro_protected_excel(source_path, filename, session_id=None, enhance
     
     # Create temporary file - use .xlsx for better compatibility
     temp_dir = tempfile.gettempdir()
-    base_name = os.path.splitext(filename)[0]  # Remove extension
+    base_name = os.path.splitext(os.path.basename(filename))[0]  # Remove folder and extension
     protected_path = os.path.join(temp_dir, f"secure_{base_name}.xlsx")
     
     print(f"DEBUG excel_protection: Creating protected file: {protected_path}")
@@ -0,0 +1,233 @@
+"""
+In-memory catalog of the served workbooks
+Lists EXCEL_FILES_DIR and its subdirectories once at startup and keeps the
+listing current from filesystem events (watchdog, when installed) and a
+periodic full rescan that catches anything the events missed. Requests
+read the catalog instead of listing and stat'ing the directory.
+
+Files are named by their path relative to the root with '/' separators,
+e.g. 'finance/2024/q1.xlsx'. The catalog's version is derived from the
+names, sizes and mtimes it holds, so server processes with the same files
+agree on it and it can key conditional responses.
+"""
+
+import hashlib
+import os
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+class CatalogEntry(NamedTuple):
+    name: str       # path relative to the root, '/'-separated
+    path: str       # path on disk
+    size: int
+    mtime_ns: int
+
+
+def _entry_hash(entry: CatalogEntry) -> int:
+    digest = hashlib.blake2b(f"{entry.name}\0{entry.size}\0{entry.mtime_ns}".encode('utf-8'), digest_size=8)
+    return int.from_bytes(digest.digest(), 'big')
+
+
+class FileCatalog:
+    """Current listing of the workbooks under ``root``.
+
+    The version is (file count, XOR of a hash per entry), updated in
+    constant time per change. Listeners are called with (name, entry) for
+    every added or changed file and (name, None) for a removed one.
+    """
+
+    def __init__(self, root: str, extensions: Tuple[str, ...] = ('.xlsx', '.xls'),
+                 reconcile_interval: float = 60.0):
+        self.root = os.path.abspath(root)
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.reconcile_interval = reconcile_interval
+        self._entries = {}   # name -> CatalogEntry
+        self._digest = 0
+        self._listing = None  # sorted entries, rebuilt after a change
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._observer = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.reconciles = 0
+        self.events = 0
+
+    def add_listener(self, callback: Callable[[str, Optional[CatalogEntry]], None]):
+        self._listeners.append(callback)
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        with self._lock:
+            return len(self._entries), self._digest
+
+    def name_for(self, path: str) -> Optional[str]:
+        """Catalog name of a path on disk, or None if it is outside the root or not a workbook"""
+        path = os.path.abspath(path)
+        if not path.startswith(self.root + os.sep) or not path.lower().endswith(self.extensions):
+            return None
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def _path_for(self, name: str) -> Optional[str]:
+        """Path on disk of a catalog name, or None if it would leave the root"""
+        parts = name.replace('\\', '/').split('/')
+        if not name or any(part in ('', '.', '..') for part in parts) or os.path.isabs(name):
+            return None
+        path = os.path.join(self.root, *parts)
+        return path if self.name_for(path) == '/'.join(parts) else None
+
+    def _set(self, name: str, entry: Optional[CatalogEntry]) -> bool:
+        """Record one file's state; returns whether it changed. Caller holds the lock."""
+        old = self._entries.get(name)
+        if old == entry:
+            return False
+        if old is not None:
+            self._digest ^= _entry_hash(old)
+            del self._entries[name]
+        if entry is not None:
+            self._digest ^= _entry_hash(entry)
+            self._entries[name] = entry
+        self._listing = None
+        return True
+
+    def _stat(self, name: str, path: str) -> Optional[CatalogEntry]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        return CatalogEntry(name, path, stat.st_size, stat.st_mtime_ns)
+
+    def _notify(self, changes: List[Tuple[str, Optional[CatalogEntry]]]):
+        for name, entry in changes:
+            for listener in self._listeners:
+                try:
+                    listener(name, entry)
+                except Exception as e:
+                    print(f"Error in file catalog listener: {e}")
+
+    def refresh(self, name: str) -> Optional[CatalogEntry]:
+        """Re-stat one file by catalog name and record what is there now"""
+        path = self._path_for(name)
+        if path is None:
+            return None
+        entry = self._stat(name, path)
+        with self._lock:
+            changed = self._set(name, entry)
+        if changed:
+            self._notify([(name, entry)])
+        return entry
+
+    def _walk(self) -> Dict[str, CatalogEntry]:
+        found = {}
+        pending = [self.root]
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for item in entries:
+                        try:
+                            if item.is_dir(follow_symlinks=False):
+                                pending.append(item.path)
+                            elif item.name.lower().endswith(self.extensions) and item.is_file():
+                                stat = item.stat()
+                                name = os.path.relpath(item.path, self.root).replace(os.sep, '/')
+                                found[name] = CatalogEntry(name, item.path, stat.st_size, stat.st_mtime_ns)
+                        except OSError:
+                            continue  # removed while listing
+            except OSError:
+                continue
+        return found
+
+    def reconcile(self) -> int:
+        """Rescan the whole tree and apply the differences; returns how many files changed"""
+        found = self._walk()
+        with self._lock:
+            changes = [(name, None) for name in self._entries if name not in found]
+            changes += [(name, entry) for name, entry in found.items() if self._entries.get(name) != entry]
+            for name, entry in changes:
+                self._set(name, entry)
+            self.reconciles += 1
+        self._notify(changes)
+        return len(changes)
+
+    def get(self, name: str) -> Optional[CatalogEntry]:
+        """Entry for a catalog name; a file the catalog has not seen yet is looked up on disk"""
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None:
+            entry = self.refresh(name)
+        return entry
+
+    def files(self) -> List[CatalogEntry]:
+        """Every file, sorted by name"""
+        with self._lock:
+            if self._listing is None:
+                self._listing = sorted(self._entries.values())
+            return self._listing
+
+    def start(self):
+        """Scan the tree, then follow filesystem events and rescan every reconcile_interval seconds"""
+        os.makedirs(self.root, exist_ok=True)
+        self.reconcile()
+        self._start_watcher()
+        self._thread = threading.Thread(target=self._run, name="file-catalog", daemon=True)
+        self._thread.start()
+
+    def _start_watcher(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            print(f"⚠️  watchdog not installed - file list rescanned every {self.reconcile_interval:.0f}s")
+            return
+
+        catalog = self
+
+        class CatalogEventHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = [event.src_path, getattr(event, 'dest_path', None)]
+                if event.is_directory and event.event_type in ('moved', 'deleted'):
+                    # A whole subtree came or went
+                    threading.Thread(target=catalog.reconcile, daemon=True).start()
+                    return
+                for path in filter(None, paths):
+                    name = catalog.name_for(path)
+                    if name is not None:
+                        catalog.events += 1
+                        catalog.refresh(name)
+
+        try:
+            self._observer = Observer()
+            self._observer.schedule(CatalogEventHandler(), self.root, recursive=True)
+            self._observer.start()
+        except Exception as e:
+            self._observer = None
+            print(f"⚠️  Could not watch {self.root}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.reconcile_interval):
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"Error rescanning {self.root}: {e}")
+
+    def close(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(5)
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'files': len(self._entries),
+                'version': f"{len(self._entries)}-{self._digest:016x}",
+                'watching': self._observer is not None,
+                'events': self.events,
+                'reconciles': self.reconciles,
+                'reconcile_interval_seconds': self.reconcile_interval,
+            }
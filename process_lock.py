@@ -0,0 +1,107 @@
+"""
+Inter-process lock files
+An exclusive, non-blocking lock on a file, held until released or until the
+holding process exits (the OS drops it even after a crash). Used to elect
+the one server process that runs singleton work such as the system file
+monitor.
+"""
+
+import os
+import threading
+from typing import Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class ProcessLock:
+    """Exclusive lock on ``path``; the holder's pid is written into the file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        """Take the lock if no other process (or ProcessLock) holds it"""
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+        # Overwrite from the start, without truncating the byte locked on Windows
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, f"{os.getpid():<12}\n".encode('ascii'))
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class LeaderElection:
+    """Runs ``on_elected`` in exactly one process: the one holding the lock file.
+
+    A process that loses keeps trying every ``retry_seconds`` in the
+    background, so another takes over when the leader exits.
+    """
+
+    def __init__(self, path: str, on_elected: Callable[[], None], retry_seconds: float = 5.0):
+        self.lock = ProcessLock(path)
+        self.on_elected = on_elected
+        self.retry_seconds = retry_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.lock.held
+
+    def start(self) -> bool:
+        """Try to become the leader now; returns whether this process is it"""
+        if self._try():
+            return True
+        self._thread = threading.Thread(target=self._retry, name="leader-election", daemon=True)
+        self._thread.start()
+        return False
+
+    def _try(self) -> bool:
+        if not self.lock.acquire():
+            return False
+        try:
+            self.on_elected()
+        except Exception as e:
+            print(f"⚠️  Elected leader, but starting its work failed: {e}")
+        return True
+
+    def _retry(self):
+        while not self._stop.wait(self.retry_seconds):
+            if self._try():
+                return
+
+    def close(self):
+        """Stop trying and give up leadership"""
+        self._stop.set()
+        self.lock.release()
@@ -0,0 +1,83 @@
+"""
+Conditional responses for the read APIs
+An endpoint declares a cheap version token (a data high-water mark, a
+directory mtime, a rollup version) and the validator turns it into an ETag.
+A request whose If-None-Match carries the current tag gets a 304 without
+the endpoint running its queries. Counts of 304 and 200 responses show
+what this saves.
+"""
+
+import functools
+import hashlib
+import threading
+import uuid
+from typing import Callable, Dict
+
+from flask import Response, make_response, request
+
+
+class ResponseValidator:
+    """Issues and checks ETags derived from version tokens"""
+
+    def __init__(self, instance: str = None):
+        # Part of every tag, so tags handed out before a restart never match.
+        # Worker processes of one server share theirs, so any of them can answer a 304
+        self.instance = instance or uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def etag(self, *parts) -> str:
+        """Tag for a set of version parts (unquoted)"""
+        return hashlib.sha1(repr((self.instance,) + parts).encode('utf-8')).hexdigest()[:24]
+
+    def conditional(self, version: Callable[[], object], max_age: int = 0):
+        """Decorate a view with a version function.
+
+        The tag covers the path, the query string and ``version()``. The
+        version is read before the view runs, so a change that races with
+        the view can only make the next request a 200, never a stale 304.
+        With ``max_age`` the client may reuse a response for that many
+        seconds without asking again.
+        """
+        cache_control = f"private, max-age={max_age}" if max_age else "private, no-cache"
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                tag = self.etag(request.full_path, version())
+                if request.if_none_match.contains_weak(tag):
+                    self._count(view.__name__, 304)
+                    response = Response(status=304)
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    self._count(view.__name__, 200, response.calculate_content_length() or 0)
+                response.set_etag(tag, weak=True)
+                response.headers['Cache-Control'] = cache_control
+                return response
+            return wrapper
+        return decorator
+
+    def _count(self, endpoint: str, status: int, size: int = 0):
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, {'200': 0, '304': 0, 'bytes_sent': 0,
+                                                        'bytes_saved': 0, 'last_size': 0})
+            counts[str(status)] += 1
+            if status == 200:
+                counts['bytes_sent'] += size
+                counts['last_size'] = size
+            else:
+                # What the body would have cost, going by the last full response
+                counts['bytes_saved'] += counts['last_size']
+
+    def stats(self) -> Dict:
+        """304/200 counts and bytes per endpoint, plus totals"""
+        with self._lock:
+            endpoints = {name: {key: value for key, value in counts.items() if key != 'last_size'}
+                         for name, counts in self._counts.items()}
+        totals = {key: sum(counts[key] for counts in endpoints.values())
+                  for key in ('200', '304', 'bytes_sent', 'bytes_saved')}
+        answered = totals['200'] + totals['304']
+        totals['not_modified_ratio'] = round(totals['304'] / answered, 3) if answered else 0.0
+        return {'endpoints': endpoints, 'totals': totals}
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Multi-process server
+Starts N worker processes (one per CPU core by default) that accept
+connections from one shared listening socket, so rendering workbooks and
+logging activities are no longer serialized on one interpreter's GIL.
+
+Workers share state through the SQLite databases: activity sequence
+numbers come from one counter, and every worker's recent buffer and event
+stream follow the activities all of them write. The session cookie is
+signed with the same secret key everywhere, so any worker can serve any
+request. One worker, elected through a lock file, runs the system file
+monitor and the startup maintenance; it is started and made ready before
+the others. A worker that exits unexpectedly is restarted.
+
+Usage: python serve.py [--workers N] [--host HOST] [--port PORT]
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+
+RESTART_DELAY_SECONDS = 1.0
+
+
+def worker_main(worker_id, workers, instance, listener, host, port, ready):
+    """Body of one worker process: set up the app, then serve from the shared socket"""
+    os.environ['WATERMARK_WORKER_ID'] = str(worker_id)
+    os.environ['WATERMARK_WORKERS'] = str(workers)
+    os.environ['WATERMARK_INSTANCE'] = instance
+
+    from werkzeug.serving import make_server
+    import app as application
+
+    application.create_app(start_monitor=True)
+    application.prepare_activity_storage()
+    server = make_server(host, port, application.app, threaded=True, fd=listener.fileno())
+    ready.set()
+    print(f"✅ Worker {worker_id} (pid {os.getpid()}) serving")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        application.shutdown()
+
+
+def start_worker(context, worker_id, workers, instance, listener, host, port):
+    ready = context.Event()
+    process = context.Process(target=worker_main, name=f"watermark-worker-{worker_id}",
+                              args=(worker_id, workers, instance, listener, host, port, ready))
+    process.start()
+    return process, ready
+
+
+def serve(workers: int, host: str, port: int):
+    listener = socket.create_server((host, port), backlog=128 * workers)
+    # Every worker is a fresh interpreter, so none inherits another's threads or connections
+    context = multiprocessing.get_context('spawn')
+    # Shared by the workers' ETags, so a tag from one is valid at all of them
+    instance = uuid.uuid4().hex[:8]
+
+    print(f"🚀 Starting {workers} workers on http://{host}:{port}")
+    processes = {}
+    # The first worker becomes the leader and runs the startup maintenance alone
+    processes[0], ready = start_worker(context, 0, workers, instance, listener, host, port)
+    while not ready.wait(1.0):
+        if not processes[0].is_alive():
+            raise SystemExit("First worker exited during startup")
+    for worker_id in range(1, workers):
+        processes[worker_id], _ = start_worker(context, worker_id, workers, instance, listener, host, port)
+
+    try:
+        while True:
+            time.sleep(RESTART_DELAY_SECONDS)
+            for worker_id, process in processes.items():
+                if not process.is_alive():
+                    print(f"⚠️  Worker {worker_id} exited with code {process.exitcode}, restarting")
+                    processes[worker_id], _ = start_worker(context, worker_id, workers, instance,
+                                                           listener, host, port)
+    except KeyboardInterrupt:
+        print("🛑 Stopping workers...")
+    finally:
+        for process in processes.values():
+            process.join(10)
+            if process.is_alive():
+                process.terminate()
+        listener.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per CPU core)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+    serve(max(1, args.workers), args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,15 @@
 import os
-import hashlib
 import time
-import json
 import threading
-import sqlite3
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import win32file
 import win32con
 import psutil
 import logging
+from file_tracking import FileTrackingClient
 
 # Import browser upload monitor
 try:
@@ -21,130 +19,6 @@ except ImportError:
     BROWSER_MONITOR_AVAILABLE = False
     print("⚠️  Browser upload monitoring not available - install pywin32 for full functionality")
 
-class FileTrackingDatabase:
-    def __init__(self, db_path='file_tracking.db'):
-        self.db_path = db_path
-        self.init_database()
-    
-    def init_database(self):
-        """Initialize the file tracking database"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Table for tracking protected files
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS protected_files (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    file_hash TEXT UNIQUE NOT NULL,
-                    original_name TEXT NOT NULL,
-                    download_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    download_session TEXT,
-                    file_size INTEGER,
-                    fingerprint TEXT
-                )
-            ''')
-            
-            # Table for tracking file copies and movements
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS file_operations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    operation_type TEXT NOT NULL,
-                    source_path TEXT,
-                    destination_path TEXT,
-                    file_hash TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    detected_by TEXT,
-                    process_name TEXT,
-                    severity TEXT DEFAULT 'MEDIUM'
-                )
-            ''')
-            
-            # Table for file access attempts
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS file_access_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    file_path TEXT NOT NULL,
-                    file_hash TEXT,
-                    access_type TEXT NOT NULL,
-                    process_name TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    blocked BOOLEAN DEFAULT FALSE
-                )
-            ''')
-            
-            conn.commit()
-    
-    def register_protected_file(self, file_path, original_name, session_id, file_hash=None):
-        """Register a newly downloaded protected file"""
-        if not file_hash:
-            file_hash = self.calculate_file_hash(file_path)
-        
-        file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
-        fingerprint = self.generate_file_fingerprint(file_path)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO protected_files 
-                (file_hash, original_name, download_session, file_size, fingerprint)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (file_hash, original_name, session_id, file_size, fingerprint))
-            conn.commit()
-        
-        return file_hash
-    
-    def log_file_operation(self, operation_type, source_path, destination_path=None, 
-                          detected_by='FILE_MONITOR', process_name=None, severity='MEDIUM'):
-        """Log file copy, move, or access operations"""
-        file_hash = self.calculate_file_hash(source_path) if os.path.exists(source_path) else None
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO file_operations 
-                (operation_type, source_path, destination_path, file_hash, detected_by, process_name, severity)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (operation_type, source_path, destination_path, file_hash, detected_by, process_name, severity))
-            conn.commit()
-    
-    def is_protected_file(self, file_path):
-        """Check if a file is a protected file based on hash"""
-        file_hash = self.calculate_file_hash(file_path)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT original_name FROM protected_files WHERE file_hash = ?', (file_hash,))
-            result = cursor.fetchone()
-            return result[0] if result else None
-    
-    def calculate_file_hash(self, file_path):
-        """Calculate SHA256 hash of a file"""
-        if not os.path.exists(file_path):
-            return None
-        
-        sha256_hash = hashlib.sha256()
-        try:
-            with open(file_path, "rb") as f:
-                for byte_block in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(byte_block)
-            return sha256_hash.hexdigest()
-        except:
-            return None
-    
-    def generate_file_fingerprint(self, file_path):
-        """Generate a unique fingerprint for the file"""
-        if not os.path.exists(file_path):
-            return None
-        
-        stat = os.stat(file_path)
-        fingerprint_data = {
-            'size': stat.st_size,
-            'created': stat.st_ctime,
-            'modified': stat.st_mtime,
-            'hash_preview': self.calculate_file_hash(file_path)[:16]  # First 16 chars
-        }
-        return json.dumps(fingerprint_data, sort_keys=True)
-
 class ProtectedFileHandler(FileSystemEventHandler):
     def __init__(self, tracking_db, server_url='http://127.0.0.1:5000', logger=None):
         self.tracking_db = tracking_db
@@ -251,10 +125,10 @@ class ProtectedFileHandler(FileSystemEventHandler):
             )
         except:
             pass  # Fail silently if server is not available
-
-class SystemFileMonitor:
+
+class SystemFileMonitor(FileTrackingClient):
     def __init__(self, server_url='http://127.0.0.1:5000'):
-        self.tracking_db = FileTrackingDatabase()
+        super().__init__()
         self.server_url = server_url
         self.observer = Observer()
         self.running = False
@@ -375,26 +249,6 @@ class SystemFileMonitor:
         except Exception as e:
             self.logger.debug(f"Error checking command for protected files: {e}")
     
-    def register_download(self, file_path, original_name, session_id):
-        """Register a newly downloaded protected file for monitoring"""
-        file_hash = self.tracking_db.register_protected_file(file_path, original_name, session_id)
-        # Log the download as an operation for complete audit trail
-        try:
-            self.tracking_db.log_file_operation(
-                operation_type='FILE_DOWNLOADED',
-                source_path=file_path,
-                detected_by='DOWNLOAD',
-                process_name='SYSTEM',
-                severity='LOW'
-            )
-        except Exception as e:
-            self.logger.debug(f"Failed to log download operation: {e}")
-
-        self.logger.info(
-            f"Protected file downloaded: {original_name} | Path: {file_path} | Session: {session_id}"
-        )
-        return file_hash
-    
     def stop_monitoring(self):
         """Stop the file monitoring system"""
         self.running = False
@@ -411,52 +265,6 @@ class SystemFileMonitor:
                 self.logger.error(f"❌ Error stopping browser monitoring: {e}")
         
         self.logger.info("🛑 File monitoring system stopped")
-    
-    def get_security_report(self, hours=24):
-        """Get security incidents from the last N hours"""
-        with sqlite3.connect(self.tracking_db.db_path) as conn:
-            cursor = conn.cursor()
-            
-            since_time = datetime.now() - timedelta(hours=hours)
-            cursor.execute('''
-                SELECT operation_type, source_path, destination_path, 
-                       timestamp, detected_by, process_name, severity
-                FROM file_operations 
-                WHERE timestamp > ?
-                ORDER BY timestamp DESC
-            ''', (since_time,))
-            
-            operations = cursor.fetchall()
-            
-            cursor.execute('''
-                SELECT COUNT(*) as total_incidents,
-                       COUNT(CASE WHEN severity = 'HIGH' THEN 1 END) as high_severity,
-                       COUNT(CASE WHEN severity = 'MEDIUM' THEN 1 END) as medium_severity
-                FROM file_operations 
-                WHERE timestamp > ?
-            ''', (since_time,))
-            
-            summary = cursor.fetchone()
-            
-            return {
-                'summary': {
-                    'total_incidents': summary[0],
-                    'high_severity': summary[1],
-                    'medium_severity': summary[2]
-                },
-                'incidents': [
-                    {
-                        'operation': op[0],
-                        'source': op[1],
-                        'destination': op[2],
-                        'timestamp': op[3],
-                        'detected_by': op[4],
-                        'process': op[5],
-                        'severity': op[6]
-                    }
-                    for op in operations
-                ]
-            }
 
 # Global monitor instance
 file_monitor = None
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Recent Activity Buffer Test
+Exercises the in-memory ring of recent activities
+"""
+
+from activity_buffer import RecentActivityBuffer
+
+
+def test_recent_activity_buffer():
+    """The recent-activity ring stays bounded and its indexes follow evictions"""
+    print("🔁 Testing recent activity buffer...")
+    buffer = RecentActivityBuffer(capacity=50)
+    for i in range(120):
+        buffer.append({'timestamp': f"2024-05-01T10:00:{i % 60:02d}", 'session_id': f"s{i % 3}",
+                       'activity': "PAGE_VISIT", 'file_name': f"file_{i % 4}.xlsx",
+                       'additional_info': {'seq': i}})
+    assert len(buffer) == 50
+    assert [a['additional_info']['seq'] for a in buffer.recent()] == list(range(70, 120))
+    assert [a['additional_info']['seq'] for a in buffer.recent(3)] == [117, 118, 119]
+    assert [a['additional_info']['seq'] for a in buffer.for_session("s1", 3)] == [112, 115, 118]
+    assert len(buffer.for_file("file_0.xlsx", 100)) == 12
+    assert buffer.for_session("missing") == []
+    stats = buffer.stats()
+    assert (stats['size'], stats['evicted'], stats['indexed_sessions']) == (50, 70, 3)
+
+    small = RecentActivityBuffer(capacity=1000, max_bytes=stats['estimated_bytes'] // 10)
+    for activity in buffer.recent():
+        small.append(activity)
+    assert 1 <= len(small) < 50
+    print(f"   ✅ Bounded at {stats['size']} events, ~{stats['estimated_bytes'] // 1024} KB")
+
+
+if __name__ == "__main__":
+    test_recent_activity_buffer()
+    print("✅ All recent activity buffer tests passed")
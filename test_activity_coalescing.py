@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Activity Coalescing Test
+Exercises coalescing of periodic events in front of the ingest queue
+"""
+
+from activity_coalescing import ActivityCoalescer
+from activity_ingest import ActivityIngestQueue
+from activity_testing import drop_db, make_db
+
+
+def test_coalescing_folds_periodic_events():
+    """The first event of a group is written at once; its repeats become one summary row per window"""
+    print("🧺 Testing event coalescing...")
+    db = make_db()
+    now = [0.0]
+    coalescer = ActivityCoalescer({'CLIENT_MONITOR_SECURITY_CHECK': (300, ('event_data.devtools',))},
+                                  tick_interval=3600, clock=lambda: now[0])
+    ingest = ActivityIngestQueue(db, batch_size=100, flush_interval_ms=20, coalescer=coalescer)
+
+    def check(second, session="s1", devtools=False, threat_level='LOW'):
+        return ingest.submit(timestamp=f"2024-05-01T10:{second // 60:02d}:{second % 60:02d}", session_id=session,
+                             activity="CLIENT_MONITOR_SECURITY_CHECK", file_name="employee_data.xlsx",
+                             additional_info={'threat_level': threat_level, 'event_data': {'devtools': devtools}})
+
+    try:
+        for second in range(0, 600, 30):
+            check(second)
+        check(5, session="s2")
+        now[0] = 100
+        check(10, devtools=True)
+        check(40, devtools=True)
+        assert check(15, threat_level='HIGH') > 0
+        ingest.submit(timestamp="2024-05-01T10:00:20", session_id="s1", activity="PAGE_VISIT", file_name="f")
+        ingest.flush(timeout=10)
+
+        # Every first event is stored before its window closes; only repeats are held
+        visible = db.get_activities()
+        assert len(visible) == 5
+        assert not [a for a in visible if 'coalesced_count' in (a['additional_info'] or {})]
+        assert "2024-05-01T10:00:00" in [a['timestamp'] for a in visible if a['session_id'] == "s1"]
+        assert coalescer.stats()['coalesced'] == 20 and coalescer.stats()['open_windows'] == 3
+
+        # Windows close on the clock; a window without repeats writes nothing
+        now[0] = 300
+        assert coalescer.flush_due() == 1
+        ingest.close()
+        rows = [a for a in db.get_activities() if (a['additional_info'] or {}).get('coalesced_count')]
+        counts = sorted((a['session_id'], a['additional_info']['event_data']['devtools'],
+                         a['additional_info']['coalesced_count']) for a in rows)
+        assert counts == [("s1", False, 19), ("s1", True, 1)]
+        folded = next(a for a in rows if a['additional_info']['coalesced_count'] == 19)
+        assert folded['timestamp'] == "2024-05-01T10:09:30"
+        assert folded['additional_info']['first_seen'] == "2024-05-01T10:00:00"
+        assert folded['additional_info']['last_seen'] == "2024-05-01T10:09:30"
+        assert len(db.get_activities()) == 7 and coalescer.stats()['open_windows'] == 0
+        print(f"   ✅ 24 security checks stored as {len(visible) - 2} first events and {len(rows)} summaries")
+    finally:
+        ingest.close()
+        drop_db(db)
+
+
+if __name__ == "__main__":
+    test_coalescing_folds_periodic_events()
+    print("✅ All activity coalescing tests passed")
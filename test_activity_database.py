@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""
+Activity Database Test
+Exercises the activity store against a throwaway database file
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+from activity_database import (ACTIVITY_COLUMNS, DIMENSIONS, ActivityDatabase, classify_activity,
+                               encode_cursor, iter_json_array, parse_timestamps)
+from activity_buffer import RecentActivityBuffer
+from activity_ingest import ActivityIngestQueue
+from activity_partitions import RetentionPolicy
+from activity_rollups import register_sketch_functions, sketch_count, sketch_merge
+from activity_testing import add_sample, drop_db, make_db
+
+def current_partition(db):
+    """The partition add_sample writes to when no timestamp is given"""
+    return db.partition(datetime.now().strftime('%Y-%m'))
+
+
+def test_pooled_connections_use_wal():
+    """Every pooled connection runs in WAL mode and is reused"""
+    print("🗄️  Testing connection pool...")
+    db = make_db()
+    try:
+        with db.pool.connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+            first = conn
+
+        add_sample(db)
+        with db.pool.connection() as conn:
+            assert conn is first
+        print("   ✅ WAL mode and connection reuse working")
+    finally:
+        drop_db(db)
+
+
+def test_concurrent_writers():
+    """Concurrent writers and readers share the pool without losing rows"""
+    print("🧵 Testing concurrent writers...")
+    db = make_db(max_connections=4)
+    try:
+        def writer(worker_id):
+            for i in range(50):
+                add_sample(db, session_id=f"session_{worker_id}", seq=i)
+                db.get_statistics()
+
+        threads = [threading.Thread(target=writer, args=(w,)) for w in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = db.get_statistics()
+        assert stats['total_activities'] == 400
+        assert stats['unique_sessions'] == 8
+        print("   ✅ 400 rows written by 8 threads")
+    finally:
+        drop_db(db)
+
+
+def test_download_tokens():
+    """Download tokens validate once and can be revoked"""
+    print("🔑 Testing download tokens...")
+    db = make_db()
+    try:
+        token = db.create_download_token("employee_data.xlsx", allowed_email="a@example.com")
+        assert db.validate_download_token(token, "employee_data.xlsx", "A@example.com")
+        assert not db.validate_download_token(token, "employee_data.xlsx", "b@example.com")
+        db.revoke_download_token(token)
+        assert not db.validate_download_token(token, "employee_data.xlsx", "a@example.com")
+        print("   ✅ Token lifecycle working")
+    finally:
+        drop_db(db)
+
+
+def test_sequence_numbers_and_delta_fetch():
+    """Events are numbered in submit order and can be fetched from a high-water mark"""
+    print("🔢 Testing sequence numbers and delta fetch...")
+    db = make_db()
+    buffer = RecentActivityBuffer(capacity=20)
+    ingest = ActivityIngestQueue(db, batch_size=8, flush_interval_ms=20)
+    ingest.add_listener(buffer.append)
+    try:
+        # A late event for April lands in another partition but keeps its place in the sequence
+        for i in range(30):
+            month = "04" if i == 12 else "05"
+            ingest.submit(timestamp=f"2024-{month}-01T10:00:{i:02d}", session_id=f"s{i % 2}",
+                          activity="PAGE_VISIT", file_name="employee_data.xlsx")
+        assert ingest.flush(timeout=10)
+        assert db.high_water == 30
+
+        first = db.get_activities_since(0, limit=10)
+        assert [a['seq'] for a in first['activities']] == list(range(1, 11))
+        assert first['high_water'] == 10
+        rest = db.get_activities_since(first['high_water'], session_id="s0")
+        assert [a['seq'] for a in rest['activities']] == list(range(11, 30, 2))
+        assert rest['high_water'] == 30
+        assert db.get_activities_since(30)['activities'] == []
+        assert db.get_activities_since(99)['reset']
+
+        # A reserved but unwritten number holds the high-water mark back
+        reserved = db.allocate_seq()
+        add_sample(db, timestamp="2024-05-02T10:00:00")
+        assert db.high_water == reserved - 1
+        assert db.get_activities_since(30)['activities'] == []
+        db.release_seqs([reserved])
+        assert [a['seq'] for a in db.get_activities_since(30)['activities']] == [reserved + 1]
+
+        # Numbering continues across restarts
+        ingest.close()
+        db.close()
+        db = ActivityDatabase(db.db_path)
+        db._test_dir = os.path.dirname(db.db_path)
+        assert db.allocate_seq() == reserved + 2
+
+        delta = buffer.since(25)
+        assert [a['seq'] for a in delta['activities']] == [26, 27, 28, 29, 30]
+        assert not delta['truncated'] and not delta['reset']
+        assert [a['seq'] for a in buffer.since(25, session_id="s1")['activities']] == [26, 28, 30]
+        assert buffer.since(2)['truncated']
+        assert buffer.since(40)['reset']
+        print(f"   ✅ {db.high_water} events numbered, deltas fetched from the high-water mark")
+    finally:
+        ingest.close()
+        drop_db(db)
+
+
+def write_json_logs(path, count, start=0):
+    logs = [{
+        'timestamp': f"2024-05-01T10:{i // 60 % 60:02d}:{i % 60:02d}.{i:06d}",
+        'session_id': f"session_{i % 3}",
+        'activity': "FILE_OPENED",
+        'file_name': "employee_data.xlsx",
+        'ip_address': "127.0.0.1",
+        'user_agent': "pytest \u00e9",
+        'additional_info': {'seq': i}
+    } for i in range(start, start + count)]
+    with open(path, 'w') as f:
+        json.dump(logs, f, indent=2)
+
+
+def test_parse_timestamps_matches_fromisoformat():
+    """The batch timestamp parser agrees with datetime.fromisoformat"""
+    print("🕒 Testing timestamp parsing...")
+    samples = [
+        "2024-05-01T10:11:12",
+        "2024-05-01T10:11:12.5",
+        "2024-05-01T10:11:12.000000",
+        "2024-05-01T10:11:12.123Z",
+        "2024-05-01T10:11:12.123456+02:00",
+        "2024-05-01 10:11:12",
+        "2024-05-01",
+        "2024-01-15T23:30:00-05:30",
+    ]
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    expected = []
+    for ts in samples:
+        dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+        aware = dt if dt.tzinfo else dt.astimezone()
+        expected.append((dt.date().isoformat(), dt.time().isoformat(),
+                         (aware - epoch) // timedelta(microseconds=1)))
+    assert parse_timestamps(samples) == expected
+    print("   ✅ Timestamp parsing matches")
+
+
+def test_iter_json_array_streams_and_resumes():
+    """The streaming reader yields every element and resumable offsets"""
+    print("📜 Testing streaming JSON reader...")
+    tmp = tempfile.mkdtemp(prefix="activity_test_")
+    try:
+        path = os.path.join(tmp, "activity_logs.json")
+        write_json_logs(path, 50)
+        items = list(iter_json_array(path, chunk_size=37))
+        assert [item['additional_info']['seq'] for item, _ in items] == list(range(50))
+
+        resume_at = items[19][1]
+        rest = [item for item, _ in iter_json_array(path, start_offset=resume_at, chunk_size=11)]
+        assert [item['additional_info']['seq'] for item in rest] == list(range(20, 50))
+        print("   ✅ Streaming and resume working")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def test_migrate_json_logs_checkpoints():
+    """Migration resumes from its checkpoint instead of re-importing rows"""
+    print("🚚 Testing JSON log migration...")
+    db = make_db()
+    try:
+        path = os.path.join(db._test_dir, "activity_logs.json")
+        write_json_logs(path, 120)
+        assert db.migrate_json_logs(path, chunk_size=50) == 120
+        assert db.migrate_json_logs(path, chunk_size=50) == 0
+
+        # The application rewrites the file with more records appended
+        write_json_logs(path, 130)
+        assert db.migrate_json_logs(path) == 10
+        assert db.get_statistics()['total_activities'] == 130
+
+        # A replaced file is migrated from the start
+        write_json_logs(path, 5, start=1000)
+        assert db.migrate_json_logs(path) == 5
+        assert db.get_statistics()['total_activities'] == 135
+
+        # A crash after a chunk is written but before its checkpoint is saved
+        crash_path = os.path.join(db._test_dir, "crash_logs.json")
+        write_json_logs(crash_path, 60, start=2000)
+        save_checkpoint = db._save_checkpoint
+
+        def crash_after_write(source, offset, prefix_hash, records):
+            if offset:
+                raise RuntimeError("killed")
+            save_checkpoint(source, offset, prefix_hash, records)
+
+        db._save_checkpoint = crash_after_write
+        db.migrate_json_logs(crash_path, chunk_size=40)
+        del db._save_checkpoint
+        assert db.get_statistics()['total_activities'] == 175
+        assert db.migrate_json_logs(crash_path, chunk_size=40) == 60
+        assert db.get_statistics()['total_activities'] == 195
+        print("   ✅ Checkpointed migration working")
+    finally:
+        drop_db(db)
+
+
+def test_statistics_use_categories():
+    """Category counters match the old LIKE-based statistics"""
+    print("📈 Testing categorized statistics...")
+    db = make_db()
+    try:
+        names = ["FILE_OPENED", "SECURE_DOWNLOAD", "DOWNLOAD_UNAUTHORIZED", "PRINT_REQUESTED",
+                 "UNAUTHORIZED_PRINT_ATTEMPT", "PAGE_VISIT", "CLIENT_MONITOR_HEARTBEAT",
+                 "SECURITY_THREAT_DETECTED"]
+        for i, name in enumerate(names):
+            add_sample(db, activity=name, session_id=f"s{i % 3}",
+                       timestamp=f"2024-05-0{i % 2 + 1}T10:00:00")
+
+        stats = db.get_statistics()
+        assert stats == {'total_activities': 8, 'unique_sessions': 3,
+                         'file_opens': 1, 'downloads': 2, 'prints': 2}
+        assert db.get_statistics(start_date="2024-05-02")['total_activities'] == 4
+
+        with db.partition("2024-05").pool.connection() as conn:
+            plan = " ".join(row[3] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT COUNT(DISTINCT a.session_ref), SUM(t.category = 'open') "
+                "FROM activity_log a INDEXED BY idx_stats_cover "
+                "JOIN dim_activity_types t ON t.id = a.activity_ref "
+                "WHERE a.created_date >= ?", ("2024-05-01",)))
+        assert "COVERING INDEX idx_stats_cover" in plan
+        print("   ✅ Single-pass statistics working")
+    finally:
+        drop_db(db)
+
+
+def test_category_backfill_for_existing_database():
+    """Opening a database from an older version backfills categories"""
+    print("🧱 Testing category backfill...")
+    tmp = tempfile.mkdtemp(prefix="activity_test_")
+    path = os.path.join(tmp, "activity_audit.db")
+    try:
+        conn = sqlite3.connect(path)
+        conn.execute('''
+            CREATE TABLE activities (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL,
+                session_id TEXT NOT NULL, activity TEXT NOT NULL, file_name TEXT NOT NULL,
+                ip_address TEXT, user_agent TEXT, additional_info TEXT,
+                created_date DATE NOT NULL, created_time TIME NOT NULL)
+        ''')
+        conn.executemany(
+            "INSERT INTO activities (timestamp, session_id, activity, file_name, created_date, created_time) "
+            "VALUES ('2024-05-01T10:00:00', 's', ?, 'f.xlsx', '2024-05-01', '10:00:00')",
+            [("FILE_OPENED",), ("PRINT_ERROR",), ("SYSTEM_FILE_COPIED",)]
+        )
+        conn.commit()
+        conn.close()
+
+        db = ActivityDatabase(path)
+        with db.partition("2024-05").pool.connection() as conn:
+            categories = [row[0] for row in conn.execute("SELECT category FROM activities ORDER BY id")]
+        with db.pool.connection() as conn:
+            legacy = conn.execute("SELECT name FROM sqlite_master WHERE name = 'activities'").fetchone()
+        indexed = len(db.search_activities("opened"))
+        ids = [a['id'] for a in db.get_activities()]
+        add_sample(db)
+        newest = db.get_activities(limit=1)[0]['id']
+        db.close()
+        assert legacy is None
+        assert indexed == 1
+        assert len(ids) == 3 and ids == sorted(ids, reverse=True) and newest > ids[0]
+        assert categories == ["open", "print", "system"]
+        assert classify_activity("CLIENT_MONITOR_CLIPBOARD_COPY_ATTEMPT") == "monitor"
+        print("   ✅ Existing rows classified")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _query_plan(db, **filters):
+    query, params = db._activities_query(**filters)
+    query += " ORDER BY a.ts_us DESC, a.id DESC LIMIT ?"
+    with db.partition("2024-05").pool.connection() as conn:
+        return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params + [100])]
+
+
+def test_activity_queries_avoid_scan_and_sort():
+    """Historical-log and security-event filters never scan and then sort"""
+    print("🧭 Testing get_activities query plans...")
+    db = make_db()
+    try:
+        for i in range(200):
+            add_sample(db, activity="CLIENT_MONITOR_HEARTBEAT" if i % 2 else "FILE_OPENED",
+                       file_name=f"file_{i % 7}.xlsx", session_id=f"session_{i % 11}",
+                       timestamp=f"2024-05-{i % 28 + 1:02d}T10:00:00")
+        with db.partition("2024-05").pool.connection() as conn:
+            conn.execute("ANALYZE")
+
+        dates = {'start_date': "2024-05-03", 'end_date': "2024-05-10"}
+        patterns = [
+            # /api/historical-logs
+            {},
+            dates,
+            dict(dates, file_name="file_1.xlsx", exact_match=True),
+            dict(dates, activity_type="FILE_OPENED", exact_match=True),
+            dict(dates, session_id="session_3"),
+            dict(dates, session_id="session_3", file_name="file_1.xlsx", exact_match=True),
+            dict(dates, file_name="file_1"),
+            dict(dates, activity_type="OPENED"),
+            # /api/security-events
+            dict(activity_prefix="CLIENT_MONITOR_"),
+            dict(dates, activity_prefix="CLIENT_MONITOR_"),
+            dict(dates, activity_prefix="CLIENT_MONITOR_", file_name="file_1"),
+        ]
+        for filters in patterns:
+            plan = _query_plan(db, **filters)
+            assert not any("TEMP B-TREE" in step for step in plan), (filters, plan)
+            assert "SCAN a" not in plan, (filters, plan)
+        print(f"   ✅ {len(patterns)} filter patterns use an ordered index")
+    finally:
+        drop_db(db)
+
+
+def test_get_activities_orders_mixed_timestamps():
+    """Naive, 'Z' and offset timestamps sort by real instant"""
+    print("🔀 Testing epoch ordering...")
+    db = make_db()
+    try:
+        add_sample(db, activity="A", timestamp="2024-05-01T12:00:00+02:00")  # 10:00 UTC
+        add_sample(db, activity="B", timestamp="2024-05-01T11:00:00Z")
+        add_sample(db, activity="C", timestamp="2024-05-01T09:30:00.5-00:00")
+        ordered = [a['activity'] for a in db.get_activities()]
+        assert ordered == ["B", "A", "C"]
+        assert [a['activity'] for a in db.get_activities(activity_prefix="B")] == ["B"]
+        print("   ✅ Mixed timestamp formats ordered correctly")
+    finally:
+        drop_db(db)
+
+
+def test_keyset_pagination_both_directions():
+    """Cursors walk every row exactly once, forwards and backwards"""
+    print("📑 Testing keyset pagination...")
+    db = make_db()
+    try:
+        # Duplicate timestamps exercise the id tie-breaker
+        for i in range(25):
+            add_sample(db, activity=f"EVENT_{i}", timestamp=f"2024-05-01T10:00:{i // 2:02d}")
+        expected = [a['id'] for a in db.get_activities()]
+
+        pages = []
+        page = db.get_activities_page(page_size=10)
+        assert page['prev_cursor'] is None
+        while True:
+            pages.append([a['id'] for a in page['activities']])
+            if not page['next_cursor']:
+                break
+            page = db.get_activities_page(page_size=10, cursor=page['next_cursor'])
+        assert [len(p) for p in pages] == [10, 10, 5]
+        assert sum(pages, []) == expected
+
+        # Walk back from the last page
+        page = db.get_activities_page(page_size=10, cursor=page['prev_cursor'])
+        assert [a['id'] for a in page['activities']] == pages[1]
+        page = db.get_activities_page(page_size=10, cursor=page['prev_cursor'])
+        assert [a['id'] for a in page['activities']] == pages[0]
+        assert page['prev_cursor'] is None
+
+        query, params = db._activities_query(session_id="test_session")
+        query += " AND a.ts_us <= ? AND (a.ts_us < ? OR a.id < ?) ORDER BY a.ts_us DESC, a.id DESC LIMIT 11"
+        with db.partition("2024-05").pool.connection() as conn:
+            cursor_plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params + [1, 1, 1])]
+        assert not any("TEMP B-TREE" in step for step in cursor_plan), cursor_plan
+
+        try:
+            db.get_activities_page(cursor="not-a-cursor")
+            assert False, "invalid cursor accepted"
+        except ValueError:
+            pass
+        assert db.get_activities_page(cursor=encode_cursor(0, 0, 'next'))['activities'] == []
+        print("   ✅ Pagination walks forward and back")
+    finally:
+        drop_db(db)
+
+
+def test_full_text_search():
+    """Search finds words inside additional_info and stays in sync"""
+    print("🔎 Testing full-text search...")
+    db = make_db()
+    try:
+        add_sample(db, activity="SYSTEM_FILE_COPIED", file_name="financial_report.xlsx",
+                   source_path="C:\\Users\\bob\\Desktop\\quarterly_numbers.xlsx",
+                   process_name="explorer.exe", error="Permission <denied>")
+        add_sample(db, activity="FILE_OPENED", file_name="employee_data.xlsx")
+
+        assert [r['activity'] for r in db.search_activities("explorer")] == ["SYSTEM_FILE_COPIED"]
+        assert len(db.search_activities("quart*")) == 1
+        assert len(db.search_activities('"permission denied"')) == 1
+        assert len(db.search_activities("employee")) == 1
+        assert db.search_activities("denied")[0]['snippet'] == \
+            "C:\\Users\\bob\\Desktop\\quarterly_numbers.xlsx explorer.exe Permission &lt;<mark>denied</mark>&gt;"
+        # FTS5 syntax in user input is treated as text, not operators
+        assert db.search_activities("NEAR(explorer") == []
+
+        with current_partition(db).pool.connection() as conn:
+            conn.execute("DELETE FROM activities WHERE activity = 'FILE_OPENED'")
+        assert db.search_activities("employee") == []
+        print("   ✅ Search and trigger sync working")
+    finally:
+        drop_db(db)
+
+
+def test_dimension_tables_intern_strings():
+    """Repeated strings are stored once and rolled-back ids never reach the cache"""
+    print("🗜️  Testing dimension tables...")
+    db = make_db()
+    try:
+        for i in range(20):
+            add_sample(db, session_id=f"session_{i % 2}")
+        partition = current_partition(db)
+        with partition.pool.connection() as conn:
+            counts = [conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table, _ in DIMENSIONS.values()]
+        assert counts == [2, 1, 1, 1]
+        assert tuple(db.get_activities(limit=1)[0]) == ACTIVITY_COLUMNS
+
+        try:
+            with partition.pool.connection():
+                add_sample(db, file_name="rolled_back.xlsx")
+                raise RuntimeError("abort")
+        except RuntimeError:
+            pass
+        assert "rolled_back.xlsx" not in partition.interned['file_name']
+        assert db.get_statistics()['total_activities'] == 20
+        add_sample(db, file_name="rolled_back.xlsx")
+        assert [a['file_name'] for a in db.get_activities(file_name="rolled_back.xlsx")] == \
+            ["rolled_back.xlsx"]
+        assert "rolled_back.xlsx" in db.get_file_names()
+        print("   ✅ Strings interned once, rollbacks leave no stale ids")
+    finally:
+        drop_db(db)
+
+
+def test_session_sketch_accuracy():
+    """Session sketches are exact when small and within a few percent when large"""
+    print("🔢 Testing session sketches...")
+    conn = sqlite3.connect(":memory:")
+    register_sketch_functions(conn)
+    conn.execute("CREATE TABLE s (v TEXT)")
+    conn.executemany("INSERT INTO s VALUES (?)", [(f"session_{i % 100}",) for i in range(500)])
+    small = conn.execute("SELECT hll_sketch(v) FROM s").fetchone()[0]
+    assert sketch_count(small) == 100
+
+    conn.executemany("INSERT INTO s VALUES (?)", [(f"session_{i}",) for i in range(20000)])
+    large = conn.execute("SELECT hll_sketch(v) FROM s").fetchone()[0]
+    assert abs(sketch_count(large) - 20000) / 20000 < 0.1
+    assert sketch_count(sketch_merge(small, large)) == sketch_count(large)
+    conn.close()
+    print(f"   ✅ 100 counted exactly, 20000 estimated as {sketch_count(large)}")
+
+
+def test_rollups_match_raw_statistics():
+    """Rollups agree with the raw table, including rows inserted behind their back"""
+    print("📈 Testing activity rollups...")
+    db = make_db()
+    try:
+        for day in (1, 2):
+            for i in range(30):
+                add_sample(db, activity=("FILE_OPENED", "SECURE_DOWNLOAD", "PRINT_ATTEMPT")[i % 3],
+                           file_name=f"file_{i % 2}.xlsx", session_id=f"session_{i % 4}",
+                           timestamp=f"2024-05-0{day}T{10 + i % 3:02d}:15:00")
+        add_sample(db, activity="SECURITY_THREAT_DETECTED", timestamp="2024-05-02T11:00:00",
+                   threat_level="HIGH")
+
+        # Rows written without going through add_activities are caught up lazily
+        with db.partition("2024-05").pool.connection() as conn:
+            conn.execute('''
+                INSERT INTO activities (timestamp, session_id, activity, file_name, created_date,
+                                        created_time, category, ts_us)
+                SELECT timestamp, 'late_session', activity, file_name, created_date, created_time,
+                       category, ts_us
+                FROM activities WHERE created_date = '2024-05-02' AND created_time LIKE '10:%'
+            ''')
+        assert not db.rollups.is_current()
+
+        for dates in ((None, None), ("2024-05-02", None), ("2024-05-01", "2024-05-01")):
+            assert db.get_statistics(*dates) == db.get_statistics(*dates, use_rollups=False)
+        assert db.rollups.is_current()
+
+        hourly = db.rollups.summarize('hour', "2024-05-02T10", "2024-05-02T11", group_by=('bucket',))
+        assert [(r['bucket'], r['events']) for r in hourly] == [("2024-05-02T10", 20),
+                                                                ("2024-05-02T11", 11)]
+        threats = db.rollups.summarize('day', category='security', threat_level='HIGH')
+        assert threats[0]['events'] == 1
+        by_file = db.rollups.summarize('day', "2024-05-01", "2024-05-01",
+                                       group_by=('file_name',), category='open')
+        assert {r['file_name']: r['events'] for r in by_file} == {"file_0.xlsx": 5, "file_1.xlsx": 5}
+        print("   ✅ Rollups match raw statistics")
+    finally:
+        drop_db(db)
+
+
+def test_monthly_partitions_and_retention():
+    """Old months are archived, read on demand and restored by a late write"""
+    print("🗃️  Testing monthly partitions and retention...")
+    db = make_db(retention=RetentionPolicy(archive_after_months=1, delete_after_months=12))
+    try:
+        for month in ("2023-01", "2024-03", "2024-04", "2024-05"):
+            for i in range(5):
+                add_sample(db, activity=f"EVENT_{i}", session_id=f"s{i % 2}",
+                           timestamp=f"{month}-10T10:00:0{i}")
+
+        assert db.apply_retention(today=date(2024, 5, 20)) == {'archived': ["2024-03"],
+                                                                'deleted': ["2023-01"]}
+        assert os.path.exists(db.catalog.archive_path("2024-03"))
+        assert not os.path.exists(db.catalog.live_path("2024-03"))
+        assert not os.path.exists(db.catalog.live_path("2023-01"))
+
+        # Default reads stay on live months; an explicit range unpacks the archive
+        assert len(db.get_activities()) == 10
+        assert len(db.get_activities(start_date="2024-03-01")) == 15
+        assert db.partition("2024-03").read_only
+        # Rollups keep counting archived and deleted months
+        assert db.get_statistics()['total_activities'] == 20
+
+        ids, page = [], db.get_activities_page(start_date="2024-03-01", page_size=4)
+        while True:
+            ids += [a['id'] for a in page['activities']]
+            if not page['next_cursor']:
+                break
+            page = db.get_activities_page(start_date="2024-03-01", page_size=4, cursor=page['next_cursor'])
+        assert ids == [a['id'] for a in db.get_activities(start_date="2024-03-01")]
+
+        add_sample(db, timestamp="2024-03-11T09:00:00")
+        assert db.catalog.get("2024-03")['state'] == "live"
+        assert not os.path.exists(db.catalog.archive_path("2024-03"))
+        assert len(db.get_activities()) == 16
+        print("   ✅ Archived, queried on demand and restored")
+    finally:
+        drop_db(db)
+
+
+if __name__ == "__main__":
+    test_pooled_connections_use_wal()
+    test_concurrent_writers()
+    test_download_tokens()
+    test_sequence_numbers_and_delta_fetch()
+    test_parse_timestamps_matches_fromisoformat()
+    test_iter_json_array_streams_and_resumes()
+    test_migrate_json_logs_checkpoints()
+    test_statistics_use_categories()
+    test_category_backfill_for_existing_database()
+    test_activity_queries_avoid_scan_and_sort()
+    test_get_activities_orders_mixed_timestamps()
+    test_keyset_pagination_both_directions()
+    test_full_text_search()
+    test_dimension_tables_intern_strings()
+    test_session_sketch_accuracy()
+    test_rollups_match_raw_statistics()
+    test_monthly_partitions_and_retention()
+    print("✅ All activity database tests passed")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Activity Ingest Test
+Exercises the write-behind ingest queue and the shared-sequence tailer
+against throwaway databases
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from activity_database import ActivityDatabase
+from activity_ingest import (DURABILITY_COMMIT, DURABILITY_JOURNAL, ActivityIngestQueue,
+                             ActivityTailer)
+from activity_journal import FSYNC_OS, ActivityJournal
+from activity_testing import add_sample, drop_db, make_db
+
+
+def test_ingest_queue_batches_and_flushes():
+    """Queued events are written in batches and visible after flush()"""
+    print("📥 Testing write-behind ingest queue...")
+    db = make_db()
+    ingest = ActivityIngestQueue(db, batch_size=100, flush_interval_ms=20)
+    try:
+        for i in range(250):
+            ingest.submit(
+                timestamp=datetime.now().isoformat(),
+                session_id="queued_session",
+                activity="CLIENT_MONITOR_HEARTBEAT",
+                file_name="employee_data.xlsx",
+                additional_info={'seq': i}
+            )
+        assert ingest.flush(timeout=10)
+        assert ingest.pending() == 0
+        assert db.get_statistics()['total_activities'] == 250
+        assert ingest.batches < 250
+        print(f"   ✅ 250 events written in {ingest.batches} batches")
+    finally:
+        ingest.close()
+        drop_db(db)
+
+
+def test_ingest_queue_survives_bad_event():
+    """A bad timestamp is refused on submit; an event the writer rejects is dropped alone"""
+    print("🧯 Testing ingest error isolation...")
+    db = make_db()
+    ingest = ActivityIngestQueue(db, batch_size=10, flush_interval_ms=20)
+    try:
+        for timestamp in ("not-a-timestamp", "2024-13-01T10:00:00", None):
+            try:
+                ingest.submit(timestamp=timestamp, session_id="s", activity="BAD", file_name="f")
+                raise AssertionError(f"{timestamp!r} was accepted")
+            except ValueError:
+                pass
+        assert ingest.pending() == 0
+        ingest.submit(timestamp=datetime.now().isoformat(), session_id="s", activity="BAD", file_name="f",
+                      additional_info={'blob': object()})
+        ingest.submit(timestamp=datetime.now().isoformat(), session_id="s", activity="GOOD", file_name="f")
+        ingest.flush(timeout=10)
+        assert ingest.failed == 1
+        assert [a['activity'] for a in db.get_activities()] == ["GOOD"]
+        print("   ✅ Bad event isolated")
+    finally:
+        ingest.close()
+        drop_db(db)
+
+
+def test_ingest_retry_skips_committed_months():
+    """A batch whose second month fails is retried without writing the first month again"""
+    print("🔁 Testing ingest retry across months...")
+    db = make_db()
+    ingest = ActivityIngestQueue(db, batch_size=10, flush_interval_ms=200)
+    write_partition = db._write_partition
+    failures = []
+
+    def flaky_write(month, items, progress=None):
+        if month == "2024-06" and not failures:
+            failures.append(month)
+            raise sqlite3.OperationalError("disk I/O error")
+        return write_partition(month, items, progress)
+
+    db._write_partition = flaky_write
+    try:
+        for month in (5, 6):
+            for i in range(3):
+                ingest.submit(timestamp=f"2024-{month:02d}-01T10:00:0{i}", session_id="s",
+                              activity="PAGE_VISIT", file_name="f")
+        assert ingest.flush(timeout=10)
+        seqs = sorted(a['seq'] for a in db.get_activities())
+        assert failures and ingest.failed == 0 and ingest.batches == 1
+        assert seqs == list(range(1, 7)) and db.high_water == 6
+        print("   ✅ 6 events written once after a failed month")
+    finally:
+        ingest.close()
+        drop_db(db)
+
+
+def test_ingest_durability_levels():
+    """Async submits return before anything is stored; commit-level types wait for the row"""
+    print("🛡️  Testing ingest durability levels...")
+    db = make_db()
+    journal = ActivityJournal(os.path.join(db._test_dir, "journal"), fsync=FSYNC_OS)
+    ingest = ActivityIngestQueue(db, batch_size=100, flush_interval_ms=300, journal=journal,
+                                 durability_by_type={'SECURE_DOWNLOAD': DURABILITY_COMMIT})
+    sink_threads = set()
+    ingest.add_listener(lambda event: sink_threads.add(threading.current_thread().name))
+    try:
+        ingest.submit(timestamp="2024-05-01T10:00:00", session_id="s", activity="PAGE_VISIT", file_name="f")
+        assert db.get_activities() == []
+        seq = ingest.submit(timestamp="2024-05-01T10:00:01", session_id="s", activity="PAGE_VISIT",
+                            file_name="f", durability=DURABILITY_JOURNAL)
+        assert journal.appends == 2
+
+        # Waiting for one event's commit also covers everything queued before it
+        ingest.submit(timestamp="2024-05-01T10:00:02", session_id="s", activity="SECURE_DOWNLOAD", file_name="f")
+        assert [a['activity'] for a in db.get_activities()] == ["SECURE_DOWNLOAD", "PAGE_VISIT", "PAGE_VISIT"]
+        assert db.high_water == seq + 1
+        assert sink_threads == {"activity-sink"}
+        assert ingest.wait_timeouts == 0
+        print("   ✅ Async, journal and commit durability honoured")
+    finally:
+        ingest.close()
+        journal.close()
+        drop_db(db)
+
+
+def test_journal_failure_is_not_reported_durable():
+    """A journal-level submit whose journal write fails waits for the database instead"""
+    print("🩹 Testing journal failure handling...")
+    db = make_db()
+    journal = ActivityJournal(os.path.join(db._test_dir, "journal"), fsync=FSYNC_OS)
+    ingest = ActivityIngestQueue(db, batch_size=100, flush_interval_ms=300, journal=journal)
+
+    def broken_append(event, wait=True):
+        raise OSError("No space left on device")
+
+    journal.append = broken_append
+    try:
+        ingest.submit(timestamp="2024-05-01T10:00:00", session_id="s", activity="PAGE_VISIT", file_name="f",
+                      durability=DURABILITY_JOURNAL)
+        assert ingest.journal_failures == 1 and ingest._journaled == 0
+        assert [a['activity'] for a in db.get_activities()] == ["PAGE_VISIT"]
+        assert ingest.wait_timeouts == 0
+        print("   ✅ Unjournaled event waited for its commit")
+    finally:
+        ingest.close()
+        journal.close()
+        drop_db(db)
+
+
+def test_shared_sequence_across_processes():
+    """Two databases on one file (as two workers) number from one sequence and tail each other"""
+    print("👥 Testing shared sequence across worker processes...")
+    first = make_db(shared_sequence=True)
+    second = ActivityDatabase(first.db_path, shared_sequence=True)
+    try:
+        add_sample(first)
+        tailer = ActivityTailer(second, backfill=10)
+        seen = []
+        tailer.add_listener(seen.append)
+
+        ingest = ActivityIngestQueue(first, batch_size=4, flush_interval_ms=10, number_events=False)
+        for i in range(10):
+            assert ingest.submit(timestamp=f"2024-05-01T10:00:{i:02d}", session_id="s1",
+                                 activity="PAGE_VISIT", file_name="employee_data.xlsx") == 0
+            second.add_activities([{'timestamp': f"2024-05-01T11:00:{i:02d}", 'session_id': "s2",
+                                    'activity': "HEARTBEAT", 'file_name': "employee_data.xlsx"}])
+        assert ingest.flush(timeout=10)
+        ingest.close()
+        seqs = sorted(a['seq'] for a in first.get_activities(limit=100))
+        assert seqs == list(range(1, 22))
+        assert first.high_water == second.high_water == 21
+
+        # One worker's open reservation holds back what the other reports as readable
+        reserved = first.allocate_seqs(3)
+        add_sample(second)
+        assert second.high_water == reserved[0] - 1
+        first.release_seqs(reserved)
+        assert second.high_water == 25
+
+        # The tailer backfilled from before its start and follows both writers, in order
+        assert tailer.poll() == 22
+        assert [e['seq'] for e in seen] == [s for s in range(1, 26) if s not in reserved]
+        assert set(seen[0]) == {'timestamp', 'session_id', 'activity', 'file_name', 'ip_address',
+                                'user_agent', 'additional_info', 'seq'}
+        assert tailer.poll() == 0
+        print(f"   ✅ {second.high_water} events numbered by two writers, tailed in order")
+    finally:
+        second.close()
+        drop_db(first)
+
+
+if __name__ == "__main__":
+    test_ingest_queue_batches_and_flushes()
+    test_ingest_queue_survives_bad_event()
+    test_ingest_retry_skips_committed_months()
+    test_ingest_durability_levels()
+    test_journal_failure_is_not_reported_durable()
+    test_shared_sequence_across_processes()
+    print("✅ All activity ingest tests passed")
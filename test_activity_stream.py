@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Activity Stream Test
+Exercises the live-activity broadcaster and its server-sent event format
+"""
+
+from activity_buffer import RecentActivityBuffer
+from activity_stream import ActivityBroadcaster, TooManySubscribers, TopicFilter, format_sse
+
+
+def test_activity_stream_fanout():
+    """Subscribers get matching events, drop their oldest when behind and resume from history"""
+    print("📡 Testing activity stream broadcaster...")
+    buffer = RecentActivityBuffer(capacity=100)
+
+    def history(since):
+        delta = buffer.since(since)
+        return None if delta['truncated'] or delta['reset'] else delta['activities']
+
+    broadcaster = ActivityBroadcaster(buffer_size=5, max_subscribers=3, history=history)
+
+    def publish(i, **info):
+        event = {'seq': i, 'timestamp': f"2024-05-01T10:00:{i % 60:02d}", 'session_id': f"s{i % 2}",
+                 'activity': "CLIENT_MONITOR_EVENT", 'file_name': "employee_data.xlsx",
+                 'additional_info': info}
+        buffer.append(event)
+        broadcaster.publish(event)
+
+    everything = broadcaster.subscribe()
+    high_only = broadcaster.subscribe(TopicFilter(severities=["high"]))
+    session_one = broadcaster.subscribe(TopicFilter(sessions=["s1"], files=["employee_data.xlsx"]))
+    try:
+        broadcaster.subscribe()
+        assert False, "subscriber limit not enforced"
+    except TooManySubscribers:
+        pass
+
+    for i in range(1, 11):
+        publish(i, threat_level="HIGH" if i in (3, 8) else "LOW")
+    events, dropped = everything.get(timeout=0)
+    assert [e['seq'] for e in events] == [6, 7, 8, 9, 10] and dropped == 5
+    assert [e['seq'] for e in high_only.get(timeout=0)[0]] == [3, 8]
+    assert [e['seq'] for e in session_one.get(timeout=0)[0]] == [1, 3, 5, 7, 9]
+    assert everything.get(timeout=0.01) == ([], 0)
+
+    # Resume after event 7: history and live delivery overlap without duplicates
+    everything.close()
+    resumed = broadcaster.subscribe(last_event_id=7)
+    publish(11)
+    assert [e['seq'] for e in resumed.get(timeout=0)[0]] == [8, 9, 10, 11]
+    resumed.close()
+    assert broadcaster.subscribe(last_event_id=99).reset
+    assert format_sse({'a': 1}, event='activity', event_id=4) == 'id: 4\nevent: activity\ndata: {"a":1}\n\n'
+
+    broadcaster.close()
+    assert broadcaster.stats()['subscribers'] == 0 and high_only.closed
+    print(f"   ✅ {broadcaster.stats()['published']} events fanned out")
+
+
+if __name__ == "__main__":
+    test_activity_stream_fanout()
+    print("✅ All activity stream tests passed")
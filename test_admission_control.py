@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Admission Control Test
+Exercises the per-session and per-IP token buckets on a fake clock
+"""
+
+from admission_control import AdmissionController
+
+
+def test_admission_control_budgets():
+    """Token buckets shed floods per session and IP, never HIGH, and summarize what they shed"""
+    print("🚧 Testing admission control...")
+    now = [0.0]
+    admission = AdmissionController({'LOW': (1.0, 3), 'MEDIUM': (1.0, 3)}, {'LOW': (10.0, 5)},
+                                    clock=lambda: now[0])
+
+    def admit(session, level='LOW', activity='KEY_PRESS', ip='10.0.0.1'):
+        return admission.admit(session, ip, level, activity, 'employee_data.xlsx')
+
+    assert [admit('s1') for _ in range(5)] == [True, True, True, False, False]
+    # Each threat class has its own budget, and HIGH has none to run out of
+    assert all(admit('s1', 'MEDIUM') for _ in range(3))
+    assert all(admit('s1', 'HIGH', 'CLIPBOARD_COPY_ATTEMPT') for _ in range(50))
+    # A second session behind the same address runs into the IP's budget
+    assert [admit('s2') for _ in range(3)] == [True, True, False]
+    assert admit('s3', ip='10.0.0.2')
+
+    now[0] += 1.0
+    assert admit('s1') and not admit('s1', activity='HEARTBEAT')
+
+    summaries = {s['session_id']: s for s in admission.drain_suppressed()}
+    assert summaries['s1']['suppressed'] == 3
+    assert summaries['s1']['event_types'] == {'KEY_PRESS': 2, 'HEARTBEAT': 1}
+    assert summaries['s1']['threat_class'] == 'LOW'
+    assert summaries['s2']['suppressed'] == 1
+    assert admission.drain_suppressed() == []
+
+    stats = admission.stats()
+    assert stats['admitted'] == 3 + 3 + 50 + 2 + 1 + 1
+    assert stats['rejected'] == 4
+    # Idle buckets are forgotten once they have refilled
+    now[0] += 60
+    admission.drain_suppressed()
+    assert admission.stats()['active_buckets'] == 0
+    print(f"   ✅ {stats['admitted']} admitted, {stats['rejected']} shed into {len(summaries)} summaries")
+
+
+if __name__ == "__main__":
+    test_admission_control_budgets()
+    print("✅ All admission control tests passed")
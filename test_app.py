@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+App Test
+Exercises the Flask app's import and factory in a separate interpreter
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+
+def test_app_import_is_side_effect_free():
+    """Importing app starts nothing; create_app() sets up storage without the system monitor"""
+    print("📦 Testing app import and factory...")
+    workdir = tempfile.mkdtemp(prefix="app_import_test_")
+    code = f"""
+import sys, threading
+sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})
+import app
+deferred = ('pandas', 'openpyxl', 'cryptography', 'system_file_monitor', 'watchdog', 'psutil')
+assert not [m for m in deferred if m in sys.modules], [m for m in deferred if m in sys.modules]
+assert threading.active_count() == 1 and app.db is None
+import os; assert os.listdir('.') == []
+assert app.create_app() is app.app and app.create_app() is app.app
+assert app.leader.is_leader and app.system_monitor is None
+assert 'system_file_monitor' not in sys.modules and 'pandas' not in sys.modules
+app.prepare_activity_storage()
+app.shutdown()
+"""
+    try:
+        result = subprocess.run([sys.executable, '-c', code], cwd=workdir, capture_output=True, text=True,
+                                timeout=60)
+        assert result.returncode == 0, result.stderr[-2000:]
+        assert os.path.exists(os.path.join(workdir, "activity_audit.db"))
+        print("   ✅ Import is lazy; services start only in create_app()")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_app_import_is_side_effect_free()
+    print("✅ All app tests passed")
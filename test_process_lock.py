@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Process Lock Test
+Exercises the leader election that picks one server process for background work
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+
+from process_lock import LeaderElection, ProcessLock
+
+
+def test_leader_election_hands_over():
+    """Exactly one process holds the leader lock; the next takes over once it lets go"""
+    print("👑 Testing leader election...")
+    tmp = tempfile.mkdtemp(prefix="process_lock_test_")
+    lock_path = os.path.join(tmp, "leader.lock")
+    elected = []
+    leader = LeaderElection(lock_path, lambda: elected.append("a"))
+    follower = LeaderElection(lock_path, lambda: elected.append("b"), retry_seconds=0.05)
+    try:
+        assert leader.start() and not follower.start()
+        assert not ProcessLock(lock_path).acquire()
+        leader.close()
+        for _ in range(100):
+            if follower.is_leader:
+                break
+            threading.Event().wait(0.05)
+        follower.close()
+        assert elected == ["a", "b"]
+        print("   ✅ Leadership handed over once the leader let go")
+    finally:
+        leader.close()
+        follower.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_leader_election_hands_over()
+    print("✅ All process lock tests passed")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Response Validation Test
+Exercises ETag revalidation of read APIs on a throwaway Flask app
+"""
+
+from flask import Flask, jsonify
+
+from activity_testing import add_sample, drop_db, make_db
+from response_validation import ResponseValidator
+
+
+def test_conditional_responses():
+    """Read APIs answer 304 while their version token is unchanged"""
+    print("🏷️  Testing ETag validation...")
+    db = make_db()
+    app = Flask(__name__)
+    validator = ResponseValidator()
+    calls = []
+
+    @app.route('/api/activity-types')
+    @validator.conditional(lambda: db.data_version)
+    def api_activity_types():
+        calls.append(1)
+        return jsonify(db.get_activity_types())
+
+    try:
+        client = app.test_client()
+        first = client.get('/api/activity-types')
+        assert first.status_code == 200 and first.headers['Cache-Control'] == "private, no-cache"
+        etag = first.headers['ETag']
+        again = client.get('/api/activity-types', headers={'If-None-Match': etag})
+        assert again.status_code == 304 and again.headers['ETag'] == etag and len(calls) == 1
+        other_query = client.get('/api/activity-types?x=1', headers={'If-None-Match': etag})
+        assert other_query.status_code == 200
+
+        add_sample(db, activity="PAGE_VISIT")
+        changed = client.get('/api/activity-types', headers={'If-None-Match': etag})
+        assert changed.status_code == 200 and changed.json == ["PAGE_VISIT"]
+        assert changed.headers['ETag'] != etag
+
+        totals = validator.stats()['totals']
+        assert (totals['200'], totals['304']) == (3, 1) and totals['bytes_saved'] > 0
+        print(f"   ✅ {totals['304']} of {totals['200'] + totals['304']} requests answered with 304")
+    finally:
+        drop_db(db)
+
+
+if __name__ == "__main__":
+    test_conditional_responses()
+    print("✅ All response validation tests passed")
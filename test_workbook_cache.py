@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Workbook Cache Test
+Exercises the parsed-workbook cache, the zip metadata reader and the
+per-sheet viewer API against throwaway workbooks
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import zipfile
+
+from workbook_cache import WorkbookCache, estimate_size
+from workbook_metadata import WorkbookMetadataCache, read_workbook_metadata
+
+
+def test_workbook_cache_lru():
+    """Workbooks are parsed once per version, evicted least recently used first, and derived values go with them"""
+    print("📚 Testing workbook cache...")
+    tmp = tempfile.mkdtemp(prefix="workbook_cache_test_")
+    loads = []
+
+    def loader(path):
+        loads.append(os.path.basename(path))
+        with open(path) as f:
+            return {'Sheet1': f.read()}
+
+    paths = []
+    for name in ("a.xlsx", "b.xlsx", "c.xlsx"):
+        paths.append(os.path.join(tmp, name))
+        with open(paths[-1], 'w') as f:
+            f.write(name * 1000)
+    try:
+        one_size = estimate_size(loader(paths[0])['Sheet1'])
+        loads.clear()
+        cache = WorkbookCache(max_bytes=int(one_size * 2.5), loader=loader)
+
+        # Concurrent first views parse the file once
+        threads = [threading.Thread(target=cache.get, args=(paths[0],)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert loads == ["a.xlsx"]
+        assert cache.derive(paths[0], 'length', lambda sheets: len(sheets['Sheet1'])) == 6000
+        assert cache.derive(paths[0], 'length', lambda sheets: 1 / 0) == 6000
+
+        cache.get(paths[1])
+        cache.get(paths[0])
+        cache.get(paths[2])  # over budget: b is the least recently used
+        stats = cache.stats()
+        assert stats['evictions'] == 1 and stats['entries'] == 2 and stats['bytes'] <= stats['max_bytes']
+        cache.get(paths[0])
+        cache.get(paths[1])
+        assert loads == ["a.xlsx", "b.xlsx", "c.xlsx", "b.xlsx"]
+
+        # A rewritten file has a new key, and its old version is dropped
+        with open(paths[1], 'w') as f:
+            f.write("changed" * 100)
+        os.utime(paths[1], ns=(1, 1))
+        assert cache.get(paths[1]).sheets['Sheet1'].startswith("changed")
+        assert loads[-1] == "b.xlsx" and len(loads) == 5
+
+        # Larger than the whole budget: kept in the one oversize slot, outside the budget
+        big, bigger = os.path.join(tmp, "big.xlsx"), os.path.join(tmp, "bigger.xlsx")
+        for path, factor in ((big, 3), (bigger, 4)):
+            with open(path, 'w') as f:
+                f.write("x" * one_size * factor)
+        cache.get(big)
+        cache.get(big)
+        stats = cache.stats()
+        assert stats['oversize'] == 1 and stats['oversize_bytes'] > stats['max_bytes']
+        assert stats['entries'] == 2 and stats['bytes'] <= stats['max_bytes']
+        cache.get(bigger)  # replaces big in the slot
+        cache.get(big)
+        assert loads[-3:] == ["big.xlsx", "bigger.xlsx", "big.xlsx"]
+        cache.invalidate(big)
+        stats = cache.stats()
+        assert stats['oversize_bytes'] == 0 and stats['hits'] == 12 and stats['misses'] == 8
+        print(f"   ✅ {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def write_xlsx_package(path, sheets):
+    """Minimal xlsx zip: ``sheets`` is a list of (name, state, worksheet xml)"""
+    main = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+    rel = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('xl/workbook.xml', f'<workbook {main} {rel}><sheets>' + ''.join(
+            f'<sheet name="{name}" sheetId="{i}" state="{state}" r:id="rId{i}"/>'
+            for i, (name, state, _) in enumerate(sheets, 1)) + '</sheets></workbook>')
+        package.writestr('xl/_rels/workbook.xml.rels',
+                         '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                         + ''.join(f'<Relationship Id="rId{i}" Target="worksheets/sheet{i}.xml"/>'
+                                   for i in range(1, len(sheets) + 1)) + '</Relationships>')
+        for i, (_, _, xml) in enumerate(sheets, 1):
+            package.writestr(f'xl/worksheets/sheet{i}.xml', f'<worksheet {main}>{xml}</worksheet>')
+        package.writestr('docProps/core.xml',
+                         '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/'
+                         'core-properties" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+                         '<dc:creator>Finance</dc:creator></cp:coreProperties>')
+
+
+def test_viewer_loads_sheets_on_demand():
+    """The viewer page carries the sheet names and one page; row ranges come from /api/sheet"""
+    print("📑 Testing per-sheet viewer API...")
+    workdir = tempfile.mkdtemp(prefix="viewer_sheet_test_")
+    code = f"""
+import json, os, re, sys
+sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})
+import openpyxl
+workbook = openpyxl.Workbook()
+sheet = workbook.active
+sheet.title = 'Data'
+sheet.append(['ID', 'Note'])
+for i in range(250):
+    sheet.append([i, '</script>' if i == 1 else None])
+workbook.create_sheet('Summary').append(['Total'])
+workbook['Summary'].append([250])
+os.makedirs('secure_files/team')
+workbook.save('secure_files/team/book.xlsx')
+
+import app
+app.ACTIVITY_CONSOLE_ECHO = False
+app.VIEWER_PAGE_ROWS = 100
+app.SHEET_RANGE_MAX_ROWS = 120
+app.create_app()
+client = app.app.test_client()
+page = client.get('/view/team/book.xlsx').get_data(as_text=True)
+embedded = dict(re.findall(r'const (sheetNames|firstPage) = (.*);', page))
+assert '</script>' not in embedded['firstPage']
+first = json.loads(embedded['firstPage'])
+assert json.loads(embedded['sheetNames']) == ['Data', 'Summary']
+assert len(first['rows']) == 100 and first['total_rows'] is None and first['rows'][1] == [1, '</script>']
+assert app.workbook_cache.stats()['entries'] == 0, "the first page must not parse the workbook"
+
+response = client.get('/api/sheet/team/book.xlsx/Data')
+data = response.get_json()
+assert data['columns'] == ['ID', 'Note'] and data['total_rows'] == 250 and len(data['rows']) == 100
+tail = client.get('/api/sheet/team/book.xlsx/Data?start=240&end=300').get_json()
+assert tail['start'] == 240 and tail['rows'] == [[i, None] for i in range(240, 250)]
+assert len(client.get('/api/sheet/team/book.xlsx/Data?start=0&end=250').get_json()['rows']) == 120
+assert client.get('/api/sheet/team/book.xlsx/Data?start=10&end=5').status_code == 400
+revalidated = client.get('/api/sheet/team/book.xlsx/Data', headers={{'If-None-Match': response.headers['ETag']}})
+assert revalidated.status_code == 304
+assert client.get('/api/sheet/team/book.xlsx/Summary').get_json()['rows'] == [[250]]
+assert client.get('/api/sheet/team/book.xlsx/Missing').status_code == 404
+assert client.get('/api/sheet/team/../book.xlsx/Data').status_code == 404
+app.shutdown()
+"""
+    try:
+        result = subprocess.run([sys.executable, '-c', code], cwd=workdir, capture_output=True, text=True,
+                                timeout=120)
+        assert result.returncode == 0, result.stderr[-2000:]
+        print("   ✅ First page embedded, row ranges served on demand")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def test_workbook_metadata_from_zip():
+    """Sheet names, dimensions and properties come from the package parts, cached per file version"""
+    print("🗂️  Testing workbook metadata reader...")
+    tmp = tempfile.mkdtemp(prefix="workbook_metadata_test_")
+    rows = ''.join(f'<row r="{r}"><c r="A{r}"><v>{r}</v></c><c r="C{r}"><v>1</v></c></row>'
+                   for r in range(1, 20001))
+    path = os.path.join(tmp, "report.xlsx")
+    write_xlsx_package(path, [
+        ("Summary", "visible", '<dimension ref="B2:D11"/><sheetData/>'),
+        ("Raw", "hidden", f'<sheetData>{rows}</sheetData>'),
+        ("Small", "visible", '<sheetData><row r="1"><c r="B1"><v>1</v></c></row></sheetData>'),
+    ])
+    try:
+        metadata = read_workbook_metadata(path)
+        assert metadata['sheet_names'] == ["Summary", "Raw", "Small"]
+        summary, raw, small = metadata['sheets']
+        assert (summary['dimension'], summary['rows'], summary['columns']) == ("B2:D11", 10, 3)
+        assert raw['state'] == "hidden" and raw['rows_estimated'] and raw['columns'] == 3
+        assert 0.8 * 20000 < raw['rows'] < 1.2 * 20000
+        assert (small['rows'], small['columns'], small['rows_estimated']) == (1, 2, False)
+        assert metadata['properties'] == {'creator': "Finance"}
+
+        cache = WorkbookMetadataCache()
+        assert cache.get(path) == metadata and cache.get(path) == metadata
+        write_xlsx_package(path, [("Only", "visible", '<dimension ref="A1"/>')])
+        os.utime(path, ns=(1, 1))
+        changed = cache.get(path)
+        assert changed['sheet_names'] == ["Only"] and changed['sheets'][0]['rows'] == 1
+        assert changed['content_hash'] != metadata['content_hash']
+
+        legacy = os.path.join(tmp, "legacy.xls")
+        with open(legacy, 'wb') as f:
+            f.write(b'\xd0\xcf\x11\xe0' + b'\0' * 512)
+        assert cache.get(legacy) is None
+        cache.invalidate(legacy)
+        assert cache.stats() == {'entries': 1, 'hits': 1, 'misses': 3}
+
+        # With the version from the catalog the file is not stat'ed, so a hit survives its removal
+        stat = os.stat(path)
+        os.remove(path)
+        assert cache.get(path, (stat.st_size, stat.st_mtime_ns)) == changed
+        assert cache.stats()['hits'] == 2
+        print(f"   ✅ {len(metadata['sheets'])} sheets read, Raw estimated at {raw['rows']} rows")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_workbook_cache_lru()
+    test_viewer_loads_sheets_on_demand()
+    test_workbook_metadata_from_zip()
+    print("✅ All workbook cache tests passed")
@@ -0,0 +1,203 @@
+"""
+Parsed workbook cache
+Keeps the DataFrames pandas reads from each workbook in memory, keyed by
+(path, size, mtime_ns), so repeat views of an unchanged file skip parsing
+it. A rewritten file gets a new key and is parsed again. The least
+recently used workbooks are evicted once their estimated memory exceeds
+the byte budget.
+
+Renderings of a workbook (the viewer's JSON, the print HTML) can be cached
+alongside it with derive(); they count towards the same budget and go
+when the workbook does. Cached DataFrames are shared between requests and
+must not be modified.
+
+A workbook larger than the whole budget is kept in a single slot of its
+own, outside the budget, until another oversize workbook replaces it.
+Paging through one very large sheet then costs one parse, and memory
+stays bounded by the budget plus that one workbook.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+
+
+def read_workbook(path: str) -> Dict:
+    """Every sheet of the workbook at ``path`` as a DataFrame, by sheet name"""
+    import pandas as pd
+    return pd.read_excel(path, sheet_name=None)
+
+
+def read_sheet_head(path: str, sheet: str, rows: int):
+    """The first ``rows`` rows of one sheet, read without parsing the rest of the workbook"""
+    import pandas as pd
+    return pd.read_excel(path, sheet_name=sheet, nrows=rows)
+
+
+def estimate_size(value) -> int:
+    """Approximate memory held by a cached value, in bytes"""
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class CachedWorkbook:
+    __slots__ = ('key', 'sheets', 'nbytes', 'derived')
+
+    def __init__(self, key: Tuple, sheets: Dict, nbytes: int):
+        self.key = key
+        self.sheets = sheets
+        self.nbytes = nbytes
+        self.derived = {}
+
+
+class WorkbookCache:
+    """LRU cache of parsed workbooks under a byte budget.
+
+    A workbook larger than the whole budget is kept only in the oversize
+    slot. Concurrent requests for the same uncached workbook parse it once.
+    """
+
+    def __init__(self, max_bytes: int, loader: Callable[[str], Dict] = read_workbook):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._entries = OrderedDict()  # key -> CachedWorkbook, least recently used first
+        self._keys = {}                # path -> key of its cached version
+        self._loading = {}             # key -> lock held while it is parsed
+        self._oversize = None          # the latest workbook larger than max_bytes
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.oversize = 0
+
+    @staticmethod
+    def key(path: str) -> Tuple:
+        """Cache key of the file's current contents; raises OSError if it is gone"""
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+    def get(self, path: str) -> CachedWorkbook:
+        """The parsed workbook at ``path``, from the cache when the file is unchanged"""
+        key = self.key(path)
+        with self._lock:
+            entry = self._hit(key)
+            if entry is not None:
+                return entry
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        with loading:
+            # Whoever held the lock may have just parsed it
+            with self._lock:
+                entry = self._hit(key)
+                if entry is not None:
+                    return entry
+                self.misses += 1
+            try:
+                sheets = self.loader(path)
+                entry = CachedWorkbook(key, sheets, sum(estimate_size(df) for df in sheets.values()))
+                with self._lock:
+                    self._store(entry)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return entry
+
+    def cached(self, path: str):
+        """The parsed workbook at ``path`` if it is cached and unchanged, else None; never parses"""
+        key = self.key(path)
+        with self._lock:
+            return self._hit(key)
+
+    def derive(self, path: str, name: str, build: Callable[[Dict], object]):
+        """``build(sheets)`` for the workbook at ``path``, computed once per cached version"""
+        entry = self.get(path)
+        with self._lock:
+            if name in entry.derived:
+                return entry.derived[name]
+        value = build(entry.sheets)
+        size = estimate_size(value)
+        with self._lock:
+            if name not in entry.derived:
+                entry.derived[name] = value
+                entry.nbytes += size
+                if self._entries.get(entry.key) is entry:  # not for the oversize slot
+                    self.nbytes += size
+                    self._evict(keep=entry.key)
+        return value
+
+    def _hit(self, key: Tuple):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        elif self._oversize is not None and self._oversize.key == key:
+            entry = self._oversize
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def _store(self, entry: CachedWorkbook):
+        path = entry.key[0]
+        # An older version of the same file can never be hit again
+        stale = self._keys.pop(path, None)
+        if stale is not None and stale in self._entries:
+            self.nbytes -= self._entries.pop(stale).nbytes
+        if self._oversize is not None and self._oversize.key[0] == path:
+            self._oversize = None
+        if entry.nbytes > self.max_bytes:
+            # Kept outside the budget, so paging through it does not parse it again
+            self.oversize += 1
+            self._oversize = entry
+            return
+        self._entries[entry.key] = entry
+        self._keys[path] = entry.key
+        self.nbytes += entry.nbytes
+        self._evict(keep=entry.key)
+
+    def _evict(self, keep: Tuple):
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                self._entries.move_to_end(key)
+                key = next(iter(self._entries))
+            entry = self._entries.pop(key)
+            self._keys.pop(key[0], None)
+            self.nbytes -= entry.nbytes
+            self.evictions += 1
+
+    def invalidate(self, path: str = None):
+        """Forget the cached version of ``path``, or of every file"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._keys.clear()
+                self._oversize = None
+                self.nbytes = 0
+                return
+            if self._oversize is not None and self._oversize.key[0] == os.path.abspath(path):
+                self._oversize = None
+            key = self._keys.pop(os.path.abspath(path), None)
+            if key is not None and key in self._entries:
+                self.nbytes -= self._entries.pop(key).nbytes
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'oversize': self.oversize,
+                'oversize_bytes': self._oversize.nbytes if self._oversize is not None else 0,
+            }
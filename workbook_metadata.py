@@ -0,0 +1,193 @@
+"""
+Workbook metadata without loading workbooks
+Reads what the file list needs straight from the xlsx zip package: sheet
+names and visibility from xl/workbook.xml, document properties from
+docProps/core.xml and docProps/app.xml, and each sheet's size from the
+<dimension> element at the start of its worksheet part. Only the first
+few kilobytes of a worksheet are decompressed; sheets written without a
+dimension get a row count estimated from those bytes.
+
+The content hash covers the CRC-32 and size of every zip member, so it
+changes with the contents without reading them.
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Dict, Optional, Tuple
+
+from workbook_cache import WorkbookCache
+
+# Decompressed bytes of a worksheet read to find its dimension
+SHEET_HEAD_BYTES = 64 * 1024
+
+_NS = {
+    'main': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'rel': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+    'pkg': 'http://schemas.openxmlformats.org/package/2006/relationships',
+    'cp': 'http://schemas.openxmlformats.org/package/2006/metadata/core-properties',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'dcterms': 'http://purl.org/dc/terms/',
+    'app': 'http://schemas.openxmlformats.org/officeDocument/2006/extended-properties',
+}
+_CORE_PROPERTIES = (('title', 'dc:title'), ('subject', 'dc:subject'), ('creator', 'dc:creator'),
+                    ('last_modified_by', 'cp:lastModifiedBy'), ('created', 'dcterms:created'),
+                    ('modified', 'dcterms:modified'))
+_APP_PROPERTIES = (('application', 'app:Application'), ('company', 'app:Company'))
+
+_DIMENSION_RE = re.compile(rb'<(?:\w+:)?dimension\s+ref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"')
+_SHEET_DATA_RE = re.compile(rb'<(?:\w+:)?sheetData[\s>/]')
+_ROW_RE = re.compile(rb'<(?:\w+:)?row[\s>]')
+_CELL_COLUMN_RE = re.compile(rb'<(?:\w+:)?c\s[^>]*?r="([A-Z]+)\d+"')
+
+
+def column_number(letters: str) -> int:
+    """1 for A, 26 for Z, 27 for AA"""
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord('A') + 1
+    return number
+
+
+def _sheet_size(package: zipfile.ZipFile, member: str) -> Dict:
+    """Rows and columns of a worksheet from its dimension, or estimated from its first rows"""
+    info = package.getinfo(member)
+    head = b''
+    with package.open(info) as part:
+        while len(head) < SHEET_HEAD_BYTES:
+            chunk = part.read(8192)
+            if not chunk:
+                break
+            head += chunk
+            match = _DIMENSION_RE.search(head)
+            if match:
+                first_col, first_row, last_col, last_row = (
+                    value.decode('ascii') if value else None for value in match.groups())
+                last_col, last_row = last_col or first_col, last_row or first_row
+                return {
+                    'dimension': match.group(0).split(b'"')[1].decode('ascii'),
+                    'rows': int(last_row) - int(first_row) + 1,
+                    'columns': column_number(last_col) - column_number(first_col) + 1,
+                    'rows_estimated': False,
+                }
+            if _SHEET_DATA_RE.search(head) and _ROW_RE.search(head):
+                # Past the header without a dimension: the rows have started
+                if len(head) >= SHEET_HEAD_BYTES // 4:
+                    break
+
+    data = _SHEET_DATA_RE.search(head)
+    body = head[data.end():] if data else b''
+    rows = len(_ROW_RE.findall(body))
+    columns = max((column_number(letters.decode('ascii')) for letters in _CELL_COLUMN_RE.findall(body)),
+                  default=0)
+    complete = len(head) >= info.file_size
+    if not complete and rows:
+        # Scale the rows seen by how much of the part they took up
+        rows = round(rows * (info.file_size - data.end()) / len(body))
+    return {'dimension': None, 'rows': rows, 'columns': columns, 'rows_estimated': not complete}
+
+
+def _properties(package: zipfile.ZipFile, member: str, fields) -> Dict:
+    try:
+        root = ET.fromstring(package.read(member))
+    except (KeyError, ET.ParseError):
+        return {}
+    properties = {}
+    for name, tag in fields:
+        element = root.find(tag, _NS)
+        if element is not None and element.text:
+            properties[name] = element.text.strip()
+    return properties
+
+
+def content_hash(package: zipfile.ZipFile) -> str:
+    """Hash of every member's name, CRC-32 and size"""
+    digest = hashlib.sha256()
+    for info in sorted(package.infolist(), key=lambda info: info.filename):
+        digest.update(f"{info.filename}\0{info.CRC:08x}\0{info.file_size}\n".encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def read_workbook_metadata(path: str) -> Dict:
+    """Sheets, sizes, document properties and content hash of the xlsx at ``path``.
+
+    Raises zipfile.BadZipFile for files that are not xlsx packages (e.g.
+    legacy .xls) and KeyError when the package has no workbook part.
+    """
+    with zipfile.ZipFile(path) as package:
+        workbook = ET.fromstring(package.read('xl/workbook.xml'))
+        try:
+            relationships = ET.fromstring(package.read('xl/_rels/workbook.xml.rels'))
+        except KeyError:
+            relationships = None
+        targets = {}
+        if relationships is not None:
+            for rel in relationships.findall('pkg:Relationship', _NS):
+                target = rel.get('Target', '')
+                # Targets are relative to xl/ unless absolute within the package
+                targets[rel.get('Id')] = (target.lstrip('/') if target.startswith('/')
+                                          else posixpath.normpath(posixpath.join('xl', target)))
+
+        sheets = []
+        for sheet in workbook.findall('main:sheets/main:sheet', _NS):
+            entry = {'name': sheet.get('name'), 'state': sheet.get('state', 'visible')}
+            member = targets.get(sheet.get(f"{{{_NS['rel']}}}id"))
+            try:
+                entry.update(_sheet_size(package, member))
+            except (KeyError, TypeError, zipfile.BadZipFile):
+                entry.update({'dimension': None, 'rows': None, 'columns': None, 'rows_estimated': True})
+            sheets.append(entry)
+
+        properties = _properties(package, 'docProps/core.xml', _CORE_PROPERTIES)
+        properties.update(_properties(package, 'docProps/app.xml', _APP_PROPERTIES))
+        return {
+            'sheets': sheets,
+            'sheet_names': [sheet['name'] for sheet in sheets],
+            'properties': properties,
+            'content_hash': content_hash(package),
+        }
+
+
+class WorkbookMetadataCache:
+    """Metadata of each workbook, read again only when its size or mtime changes"""
+
+    def __init__(self, reader=read_workbook_metadata):
+        self.reader = reader
+        self._entries = {}  # path -> (key, metadata or None if unreadable)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, version: Optional[Tuple[int, int]] = None) -> Optional[Dict]:
+        """Metadata of the workbook at ``path``, or None if it cannot be read as xlsx.
+
+        ``version`` is the file's (size, mtime_ns) when the caller already
+        knows it, e.g. from the file catalog; without it the file is stat'ed.
+        """
+        key = (os.path.abspath(path),) + tuple(version) if version is not None else WorkbookCache.key(path)
+        with self._lock:
+            cached = self._entries.get(key[0])
+            if cached is not None and cached[0] == key:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        try:
+            metadata = self.reader(path)
+        except (zipfile.BadZipFile, KeyError, ET.ParseError):
+            metadata = None
+        with self._lock:
+            self._entries[key[0]] = (key, metadata)
+        return metadata
+
+    def invalidate(self, path: str):
+        """Forget the metadata of ``path``, e.g. when the catalog sees it change or go away"""
+        with self._lock:
+            self._entries.pop(os.path.abspath(path), None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}